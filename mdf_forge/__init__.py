@@ -1,2 +1,6 @@
 from .forge import Forge  # noqa: F401
+from .local_index import LocalIndex  # noqa: F401
+from .query import Query  # noqa: F401
+from .table import ResultTable  # noqa: F401
+from .transfer import TransferBatch  # noqa: F401
 from .version import __version__   # noqa: F401
@@ -0,0 +1,153 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+# Name of the cache database file in the cache directory
+CACHE_NAME = "search_cache.sqlite"
+# Default number of seconds a cached result is used before being refreshed
+DEFAULT_CACHE_TTL = 24 * 60 * 60  # 1 day, in seconds
+# Default maximum total size of cached results
+DEFAULT_CACHE_SIZE = 256 * 1024 * 1024  # 256 MiB, in bytes
+
+
+class SearchCache:
+    """A persistent cache of Search results, stored in SQLite.
+    Results are kept until they are older than the TTL, and the least-recently-used
+    results are removed when the cache grows over its maximum size.
+    Results can also be removed by the ``source_name`` of the datasets they came from.
+    Expired results are not removed immediately, so they can still be used
+    if Search cannot be reached.
+    """
+    def __init__(self, cache_dir, ttl=DEFAULT_CACHE_TTL, max_size=DEFAULT_CACHE_SIZE):
+        """Open (or create) a SearchCache.
+
+        Arguments:
+            cache_dir (str): The directory to keep the cache in.
+            ttl (int): The number of seconds a cached result is valid for.
+                    **Default:** ``DEFAULT_CACHE_TTL``.
+            max_size (int): The maximum total size, in bytes, of the cached results.
+                    **Default:** ``DEFAULT_CACHE_SIZE``.
+        """
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, CACHE_NAME)
+        self.ttl = ttl
+        self.max_size = max_size
+        self.__lock = threading.Lock()
+        self.__db = sqlite3.connect(self.path, check_same_thread=False)
+        with self.__lock, self.__db:
+            self.__db.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, "
+                              "data TEXT, size INTEGER, created REAL, used REAL)")
+            self.__db.execute("CREATE TABLE IF NOT EXISTS sources (key TEXT, source_name TEXT)")
+            self.__db.execute("CREATE INDEX IF NOT EXISTS sources_source_name "
+                              "ON sources (source_name)")
+            self.__db.execute("CREATE TABLE IF NOT EXISTS versions "
+                              "(source_name TEXT PRIMARY KEY, version TEXT)")
+
+    @staticmethod
+    def make_key(index, query):
+        """Create the cache key for a query.
+
+        Arguments:
+            index (str): The Search index UUID.
+            query (dict): The Search query, with the ``q``, ``advanced``, ``limit``,
+                    and any other parameters that change the results.
+
+        Returns:
+            str: The key.
+        """
+        query = dict(query)
+        # Whitespace does not change the results
+        query["q"] = " ".join(query["q"].split())
+        return json.dumps({"index": index, "query": query}, sort_keys=True)
+
+    def get(self, key, allow_expired=False):
+        """Get a cached result.
+
+        Arguments:
+            key (str): The cache key.
+            allow_expired (bool): If ``True``, will return the result even if it is
+                    older than the TTL. **Default:** ``False``.
+
+        Returns:
+            The cached result, or ``None`` if there is no usable result.
+        """
+        with self.__lock, self.__db:
+            row = self.__db.execute("SELECT data, created FROM results WHERE key = ?",
+                                    (key,)).fetchone()
+            if row is None or (not allow_expired and time.time() - row[1] > self.ttl):
+                return None
+            self.__db.execute("UPDATE results SET used = ? WHERE key = ?", (time.time(), key))
+        return json.loads(row[0])
+
+    def put(self, key, value, source_names=()):
+        """Cache a result.
+
+        Arguments:
+            key (str): The cache key.
+            value: The result, which must be JSON-serializable.
+            source_names (iterable of str): The ``source_name`` values of the datasets
+                    the result came from. **Default:** None.
+        """
+        data = json.dumps(value)
+        now = time.time()
+        with self.__lock, self.__db:
+            self.__db.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)",
+                              (key, data, len(data), now, now))
+            self.__db.execute("DELETE FROM sources WHERE key = ?", (key,))
+            self.__db.executemany("INSERT INTO sources VALUES (?, ?)",
+                                  [(key, src) for src in set(source_names)])
+            # Remove least-recently-used results until under the maximum size
+            total = self.__db.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+            if total > self.max_size:
+                evicted = []
+                for old_key, size in self.__db.execute("SELECT key, size FROM results "
+                                                       "ORDER BY used").fetchall():
+                    if total <= self.max_size:
+                        break
+                    evicted.append((old_key,))
+                    total -= size
+                self.__db.executemany("DELETE FROM results WHERE key = ?", evicted)
+                self.__db.executemany("DELETE FROM sources WHERE key = ?", evicted)
+
+    def invalidate(self, source_name=None):
+        """Remove cached results.
+
+        Arguments:
+            source_name (str): If given, only results containing records from this dataset,
+                    or from queries for this dataset, are removed.
+                    **Default:** ``None``, to remove all results.
+        """
+        with self.__lock, self.__db:
+            if source_name is None:
+                self.__db.execute("DELETE FROM results")
+                self.__db.execute("DELETE FROM sources")
+            else:
+                keys = self.__db.execute("SELECT DISTINCT key FROM sources WHERE source_name = ?",
+                                         (source_name,)).fetchall()
+                self.__db.executemany("DELETE FROM results WHERE key = ?", keys)
+                self.__db.executemany("DELETE FROM sources WHERE key = ?", keys)
+
+    def check_version(self, source_name, version):
+        """Record the current version of a dataset, and remove its cached results
+        if the version has changed since it was last checked.
+
+        Arguments:
+            source_name (str): The ``source_name`` of the dataset.
+            version: The current version of the dataset.
+
+        Returns:
+            bool: ``True`` if cached results were removed, ``False`` otherwise.
+        """
+        version = str(version)
+        with self.__lock, self.__db:
+            row = self.__db.execute("SELECT version FROM versions WHERE source_name = ?",
+                                    (source_name,)).fetchone()
+            self.__db.execute("INSERT OR REPLACE INTO versions VALUES (?, ?)",
+                              (source_name, version))
+        if row is not None and row[0] != version:
+            self.invalidate(source_name)
+            return True
+        return False
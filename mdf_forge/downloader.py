@@ -0,0 +1,726 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+import hashlib
+import json
+import os
+import threading
+import time
+from urllib.parse import urlparse
+
+import globus_sdk
+import requests
+from tqdm import tqdm
+
+
+# Default number of files to download at once over HTTPS
+DEFAULT_MAX_WORKERS = 8
+# Default number of bytes to read from the network and write to disk at a time
+DEFAULT_CHUNK_SIZE = 1024 * 1024  # 1 MiB
+# Suffix for files that are still being downloaded
+PARTIAL_SUFFIX = ".part"
+# Name of the sidecar file recording downloads in a destination directory
+MANIFEST_NAME = ".mdf_download_manifest.json"
+# Default limits on the requests sent to each host
+DEFAULT_RATE_LIMIT = 10  # requests per second
+DEFAULT_HOST_CONCURRENCY = 8  # requests in progress at once
+# Retry behavior when a host responds that it is overloaded
+RETRY_STATUS_CODES = (429, 503)
+DEFAULT_MAX_RETRIES = 5
+BACKOFF_START = 1  # seconds
+BACKOFF_MAX = 60  # seconds
+
+
+def file_matches(path, length=None, sha512=None):
+    """Check if a file on disk matches the expected size and checksum.
+    The checksum is only computed if the size matches (or is unknown).
+
+    Arguments:
+        path (str): The path to the file.
+        length (int): The expected size in bytes, or ``None`` to skip the check.
+                **Default:** ``None``.
+        sha512 (str): The expected SHA-512 hex digest, or ``None`` to skip the check.
+                **Default:** ``None``.
+
+    Returns:
+        bool: ``True`` if the file exists and passed every check requested.
+                ``False`` otherwise, including when no check was requested.
+    """
+    if not os.path.isfile(path) or (length is None and not sha512):
+        return False
+    if length is not None and os.path.getsize(path) != length:
+        return False
+    if sha512:
+        digest = hashlib.sha512()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(DEFAULT_CHUNK_SIZE), b""):
+                digest.update(chunk)
+        if digest.hexdigest().lower() != sha512.lower():
+            return False
+    return True
+
+
+class AsyncResults:
+    """An asynchronous iterator over results made one at a time by a coroutine function,
+    for use with ``async for``. Unlike an async generator, this works on Python 3.5.
+
+    If the consumer stops early, call ``aclose()`` (or ``close()``) to stop any work
+    still in progress. This is also done when the iterator is garbage collected.
+    """
+    def __init__(self, step, close=None):
+        """Create an AsyncResults.
+
+        Arguments:
+            step (coroutine function): Called with no arguments to get the next result.
+                    Raises ``StopAsyncIteration`` when there are no more results.
+            close (callable): Called once, when the results are finished or closed,
+                    to release any resources. **Default:** ``None``.
+        """
+        self.__step = step
+        self.__close = close
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.__step is None:
+            raise StopAsyncIteration
+        try:
+            return await self.__step()
+        except BaseException:
+            # Includes StopAsyncIteration
+            self.close()
+            raise
+
+    def close(self):
+        """Stop the results, releasing any resources."""
+        self.__step = None
+        close, self.__close = self.__close, None
+        if close is not None:
+            close()
+
+    async def aclose(self):
+        """Stop the results, releasing any resources."""
+        self.close()
+
+    def __del__(self):
+        self.close()
+
+
+def amap(func, items, max_workers=DEFAULT_MAX_WORKERS, ordered=False):
+    """Call a blocking function on every item using a thread pool, from asyncio.
+    No calls are started until the first result is requested.
+
+    **Example usage**::
+
+        async for i, result in amap(func, items):
+            ...
+
+    Arguments:
+        func (callable): The function to call with each item.
+        items (list): The items to process.
+        max_workers (int): The maximum number of calls in progress at once.
+                **Default:** ``DEFAULT_MAX_WORKERS``.
+        ordered (bool): If ``True``, results are returned in the same order as ``items``.
+                If ``False``, results are returned as soon as they are ready.
+                **Default:** ``False``.
+
+    Returns:
+        AsyncResults: The results, as tuples of the index of the item in ``items``
+        and the result of ``func``.
+    """
+    items = list(items)
+    state = {}
+
+    async def indexed(index, future):
+        return index, await future
+
+    async def step():
+        if not state:
+            # get_running_loop() is only available from Python 3.7
+            loop = getattr(asyncio, "get_running_loop", asyncio.get_event_loop)()
+            state["executor"] = ThreadPoolExecutor(max_workers=max(int(max_workers), 1))
+            state["futures"] = [loop.run_in_executor(state["executor"], func, item)
+                                for item in items]
+            state["results"] = (iter(enumerate(state["futures"])) if ordered else
+                                iter(asyncio.as_completed([indexed(i, future) for i, future
+                                                           in enumerate(state["futures"])])))
+        result = next(state["results"], None)
+        if result is None:
+            raise StopAsyncIteration
+        if ordered:
+            return result[0], await result[1]
+        return await result
+
+    def close():
+        # If the consumer stops early, do not start the remaining calls
+        for future in state.get("futures", []):
+            future.cancel()
+        if "executor" in state:
+            state["executor"].shutdown(wait=False)
+
+    return AsyncResults(step, close)
+
+
+def retry_delay(response, attempt):
+    """Determine how long to wait before retrying a request the server refused.
+    The server's ``Retry-After`` header is used if present,
+    otherwise the delay doubles with every attempt.
+
+    Arguments:
+        response (requests.Response): The refused response.
+        attempt (int): The number of attempts made so far, starting at ``0``.
+
+    Returns:
+        float: The number of seconds to wait.
+    """
+    retry_after = response.headers.get("Retry-After")
+    if retry_after:
+        try:
+            return min(max(float(retry_after), 0), BACKOFF_MAX)
+        except ValueError:
+            pass
+        try:
+            return min(max(parsedate_to_datetime(retry_after).timestamp() - time.time(), 0),
+                       BACKOFF_MAX)
+        except (TypeError, ValueError):
+            pass
+    return min(BACKOFF_START * 2 ** attempt, BACKOFF_MAX)
+
+
+class HostScheduler():
+    """Limits the requests sent to a single host.
+
+    Requests are spaced out to stay under ``rate`` requests per second, no more than
+    ``concurrency`` downloads may be in progress at once, and all requests pause
+    after the host asks clients to back off.
+    Use the scheduler as a context manager to hold one of the concurrent download slots.
+    """
+    def __init__(self, rate=DEFAULT_RATE_LIMIT, concurrency=DEFAULT_HOST_CONCURRENCY):
+        """Create a HostScheduler.
+
+        Arguments:
+            rate (float): The maximum number of requests to start per second,
+                    or ``None`` for no limit.
+                    **Default:** ``DEFAULT_RATE_LIMIT``.
+            concurrency (int): The maximum number of downloads in progress at once.
+                    **Default:** ``DEFAULT_HOST_CONCURRENCY``.
+        """
+        self.rate = rate
+        self.concurrency = concurrency
+        self.__slots = threading.BoundedSemaphore(max(int(concurrency), 1))
+        self.__lock = threading.Lock()
+        self.__next_start = 0
+
+    def __enter__(self):
+        self.__slots.acquire()
+        return self
+
+    def __exit__(self, *args):
+        self.__slots.release()
+
+    def wait(self):
+        """Block until another request may be sent to the host."""
+        with self.__lock:
+            now = time.monotonic()
+            start = max(now, self.__next_start)
+            self.__next_start = start + (1 / self.rate if self.rate else 0)
+        if start > now:
+            time.sleep(start - now)
+
+    def backoff(self, delay):
+        """Pause all requests to the host.
+
+        Arguments:
+            delay (float): The number of seconds to pause for.
+        """
+        with self.__lock:
+            self.__next_start = max(self.__next_start, time.monotonic() + delay)
+
+
+class DownloadManifest():
+    """A record of the files downloaded into a directory, stored as a JSON sidecar file.
+
+    Each entry is keyed by URL and records the file's path (relative to the directory),
+    its expected size and checksum, and whether the download completed.
+    The manifest is saved after every change, so an interrupted download
+    can be finished later.
+    """
+    def __init__(self, dest):
+        """Load the manifest for a directory, if one exists.
+
+        Arguments:
+            dest (str): The destination directory.
+        """
+        self.dest = dest
+        self.path = os.path.join(dest, MANIFEST_NAME)
+        self.__lock = threading.Lock()
+        try:
+            with open(self.path) as f:
+                self.entries = json.load(f)
+        except (IOError, OSError, ValueError):
+            self.entries = {}
+
+    def get(self, url):
+        """Return the entry for a URL.
+
+        Arguments:
+            url (str): The URL of the file.
+
+        Returns:
+            dict: The entry, with ``local_path`` made absolute, or ``None`` if the URL
+            has not been downloaded into this directory.
+        """
+        entry = self.entries.get(url)
+        if entry is None:
+            return None
+        entry = dict(entry)
+        entry["local_path"] = os.path.join(self.dest, entry["local_path"])
+        return entry
+
+    def update(self, url, local_path=None, length=None, sha512=None, complete=False,
+               save=True):
+        """Add or update the entry for a URL.
+
+        Arguments:
+            url (str): The URL of the file.
+            local_path (str): The path the file is saved to. **Default:** The existing path.
+            length (int): The expected size of the file. **Default:** ``None``.
+            sha512 (str): The expected checksum of the file. **Default:** ``None``.
+            complete (bool): Whether the file has been completely downloaded.
+                    **Default:** ``False``.
+            save (bool): If ``True``, will write the manifest to disk.
+                    **Default:** ``True``.
+        """
+        with self.__lock:
+            entry = self.entries.get(url, {})
+            if local_path is not None:
+                entry["local_path"] = os.path.relpath(local_path, self.dest)
+            entry["length"] = length if length is not None else entry.get("length")
+            entry["sha512"] = sha512 or entry.get("sha512")
+            entry["complete"] = complete
+            self.entries[url] = entry
+            if save:
+                self._save()
+
+    def save(self):
+        """Write the manifest to disk."""
+        with self.__lock:
+            self._save()
+
+    def _save(self):
+        # Write to a temporary file first, so the manifest is never left half-written
+        temp_path = self.path + PARTIAL_SUFFIX
+        with open(temp_path, "w") as f:
+            json.dump(self.entries, f, indent=1, sort_keys=True)
+        os.replace(temp_path, self.path)
+
+
+class HTTPDownloader():
+    """Fetches files over HTTPS on behalf of Forge.
+
+    One pooled ``requests.Session`` is kept for each host, so repeated downloads
+    from the same server reuse open connections instead of performing a new
+    TCP and TLS handshake for every file.
+    Each host also has a ``HostScheduler``, which protects the server by limiting
+    the request rate and number of concurrent downloads, and by backing off when
+    the server responds with ``429`` or ``503``.
+    """
+    def __init__(self, authorizers=None, rate_limit=DEFAULT_RATE_LIMIT,
+                 host_concurrency=DEFAULT_HOST_CONCURRENCY, max_retries=DEFAULT_MAX_RETRIES):
+        """Create an HTTPDownloader.
+
+        Arguments:
+            authorizers (dict): ``host: GlobusAuthorizer`` pairs used to authenticate
+                    requests to each host. Hosts not listed use a ``NullAuthorizer``.
+                    **Default:** ``None``, for no authentication.
+            rate_limit (float): The maximum number of requests per second to each host,
+                    or ``None`` for no limit.
+                    **Default:** ``DEFAULT_RATE_LIMIT``.
+            host_concurrency (int): The maximum number of downloads in progress from
+                    each host at once. This is also the number of connections
+                    kept open to each host.
+                    **Default:** ``DEFAULT_HOST_CONCURRENCY``.
+            max_retries (int): The number of times to retry a request refused
+                    with ``429`` or ``503``.
+                    **Default:** ``DEFAULT_MAX_RETRIES``.
+        """
+        self.authorizers = authorizers or {}
+        self.rate_limit = rate_limit
+        self.host_concurrency = host_concurrency
+        self.max_retries = max_retries
+        self.__sessions = {}
+        self.__schedulers = {}
+        self.__session_lock = threading.Lock()
+        self.__auth_lock = threading.Lock()
+
+    def _session(self, host):
+        """Return the pooled Session for a host, creating it if needed.
+
+        Arguments:
+            host (str): The network location of the server.
+
+        Returns:
+            requests.Session: The Session for the host.
+        """
+        with self.__session_lock:
+            session = self.__sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(pool_connections=1,
+                                                        pool_maxsize=self.host_concurrency)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                self.__sessions[host] = session
+        return session
+
+    def scheduler(self, host):
+        """Return the HostScheduler for a host, creating it if needed.
+
+        Arguments:
+            host (str): The network location of the server.
+
+        Returns:
+            HostScheduler: The scheduler for the host.
+        """
+        with self.__session_lock:
+            scheduler = self.__schedulers.get(host)
+            if scheduler is None:
+                scheduler = HostScheduler(rate=self.rate_limit,
+                                          concurrency=self.host_concurrency)
+                self.__schedulers[host] = scheduler
+        return scheduler
+
+    def get(self, url, **kwargs):
+        """Perform an authenticated GET request.
+        A first ``401`` response is handled by regenerating the authorization header
+        and retrying once.
+        Requests are paced by the host's ``HostScheduler``, and requests refused
+        with ``429`` or ``503`` are retried after backing off.
+
+        Arguments:
+            url (str): The URL to fetch.
+
+        Keyword Arguments:
+            Passed through to ``requests.Session.get()``.
+
+        Returns:
+            requests.Response: The response from the server.
+        """
+        host = urlparse(url).netloc
+        authorizer = self.authorizers.get(host) or globus_sdk.NullAuthorizer()
+        session = self._session(host)
+        scheduler = self.scheduler(host)
+        headers = dict(kwargs.pop("headers", None) or {})
+
+        headers["Authorization"] = authorizer.get_authorization_header()
+        refreshed = False
+        attempt = 0
+        while True:
+            scheduler.wait()
+            response = session.get(url, headers=headers, **kwargs)
+            # Handle first 401 by regenerating auth headers
+            if response.status_code == 401 and not refreshed:
+                response.close()
+                refreshed = True
+                # Only one thread should refresh tokens at a time
+                with self.__auth_lock:
+                    authorizer.handle_missing_authorization()
+                    headers["Authorization"] = authorizer.get_authorization_header()
+            # Back off if the server is overloaded
+            elif response.status_code in RETRY_STATUS_CODES and attempt < self.max_retries:
+                response.close()
+                scheduler.backoff(retry_delay(response, attempt))
+                attempt += 1
+            else:
+                return response
+
+    def read(self, url, binary=False):
+        """Download one file into memory.
+
+        Arguments:
+            url (str): The URL of the file.
+            binary (bool): If ``True``, return the raw bytes of the file.
+                    If ``False``, return the decoded text.
+                    **Default:** ``False``.
+
+        Returns:
+            str or bytes: The contents of the file, or ``None`` if the download failed.
+        """
+        try:
+            with self.scheduler(urlparse(url).netloc):
+                response = self.get(url)
+        except requests.RequestException as e:
+            print("Error when attempting to access '{}': {}".format(url, repr(e)))
+            return None
+        # Handle other errors by passing the buck to the user
+        if response.status_code != 200:
+            print("Error {} when attempting to access '{}'".format(response.status_code, url))
+            return None
+        return response.content if binary else response.text
+
+    @contextmanager
+    def open(self, url):
+        """Open a file for reading as it downloads, without holding it in memory.
+        The connection (and one of the host's download slots) is released when the
+        context exits.
+
+        **Example usage**::
+
+            with downloader.open(url) as stream:
+                if stream is not None:
+                    tar = tarfile.open(fileobj=stream, mode="r|*")
+
+        Arguments:
+            url (str): The URL of the file.
+
+        Yields:
+            file-like: A readable, non-seekable binary stream of the file's contents,
+            or ``None`` if the download failed.
+        """
+        with self.scheduler(urlparse(url).netloc):
+            try:
+                response = self.get(url, stream=True)
+            except requests.RequestException as e:
+                print("Error when attempting to access '{}': {}".format(url, repr(e)))
+                yield None
+                return
+            with response:
+                # Handle other errors by passing the buck to the user
+                if response.status_code != 200:
+                    print("Error {} when attempting to access "
+                          "'{}'".format(response.status_code, url))
+                    yield None
+                else:
+                    # Undo any Content-Encoding, as iter_content() does
+                    response.raw.decode_content = True
+                    yield response.raw
+
+    def fetch(self, url, local_path, chunk_size=DEFAULT_CHUNK_SIZE, progress=None,
+              resume=False, length=None, restart=False):
+        """Download one file to disk.
+        The response is streamed to a temporary file in ``chunk_size`` pieces,
+        which is renamed to ``local_path`` once complete, so memory use does not
+        depend on the size of the file.
+
+        Arguments:
+            url (str): The URL of the file.
+            local_path (str): The path to write the file to.
+            chunk_size (int): The number of bytes to read and write at a time.
+                    **Default:** ``DEFAULT_CHUNK_SIZE``.
+            progress (callable): If provided, will be called with the number of bytes
+                    written after every chunk. **Default:** ``None``.
+            resume (bool): If ``True``, a partial file left by an earlier attempt will be
+                    finished with an HTTP ``Range`` request, and the partial file will be
+                    kept if this attempt fails.
+                    If ``False``, the file will always be fetched from the beginning.
+                    **Default:** ``False``.
+            length (int): The expected size of the file in bytes. If provided, a file
+                    of any other size is treated as a failed download.
+                    **Default:** ``None``.
+            restart (bool): If ``True``, a partial file already on disk is not finished,
+                    such as when it may not be from this URL. With ``resume``,
+                    the new partial file is still kept if this attempt fails.
+                    **Default:** ``False``.
+
+        Returns:
+            dict: The status of the download:
+                * **url** (*str*): The URL of the file.
+                * **local_path** (*str*): The path the file was written to.
+                * **success** (*bool*): ``True`` if the file was saved.
+                * **skipped** (*bool*): ``True`` if the file was already present.
+                    Always ``False`` here.
+                * **status_code** (*int*): The HTTP status code, or ``None`` if the
+                    server could not be reached.
+                * **bytes** (*int*): The number of bytes written.
+                * **resumed_from** (*int*): The number of bytes already on disk
+                    when the download started.
+                * **error** (*str*): The error message, if the download failed.
+        """
+        status = {
+            "url": url,
+            "local_path": local_path,
+            "success": False,
+            "skipped": False,
+            "status_code": None,
+            "bytes": 0,
+            "resumed_from": 0,
+            "error": None
+        }
+        partial_path = local_path + PARTIAL_SUFFIX
+        offset = 0
+        headers = {}
+        if resume and not restart and os.path.isfile(partial_path):
+            offset = os.path.getsize(partial_path)
+            if offset:
+                headers["Range"] = "bytes={}-".format(offset)
+        try:
+            # Hold one of the host's download slots until the file is written
+            with self.scheduler(urlparse(url).netloc):
+                response = self.get(url, stream=True, headers=headers)
+                # The partial file cannot be finished (e.g. it is already too long), so restart
+                if offset and response.status_code == 416:
+                    response.close()
+                    offset = 0
+                    response = self.get(url, stream=True)
+                with response:
+                    status["status_code"] = response.status_code
+                    # 206 means the server is sending the rest of the file
+                    # Any other success means the whole file is being sent
+                    if response.status_code == 206:
+                        mode = "ab"
+                    elif response.status_code == 200:
+                        mode = "wb"
+                        offset = 0
+                    else:
+                        # Handle other errors by passing the buck to the user
+                        status["error"] = ("Error {} when attempting to access "
+                                           "'{}'".format(response.status_code, url))
+                        print(status["error"])
+                        return status
+                    status["resumed_from"] = offset
+                    # Write out the binary response content as it arrives
+                    with open(partial_path, mode) as output:
+                        for chunk in response.iter_content(chunk_size=chunk_size):
+                            output.write(chunk)
+                            status["bytes"] += len(chunk)
+                            if progress:
+                                progress(len(chunk))
+            received = offset + status["bytes"]
+            if length is not None and received != length:
+                # A file cut short can be finished later, if requested
+                if received > length or not resume:
+                    os.remove(partial_path)
+                status["error"] = ("Error: Expected {} bytes from '{}', but received "
+                                   "{}".format(length, url, received))
+                print(status["error"])
+                return status
+            os.replace(partial_path, local_path)
+        except (requests.RequestException, IOError, OSError) as e:
+            status["error"] = "Error when attempting to access '{}': {}".format(url, repr(e))
+            print(status["error"])
+            # Keep partial files to resume later, if requested
+            if not resume:
+                try:
+                    os.remove(partial_path)
+                except (IOError, OSError):
+                    pass
+            return status
+        status["success"] = True
+        return status
+
+    def download(self, files, max_workers=DEFAULT_MAX_WORKERS, chunk_size=DEFAULT_CHUNK_SIZE,
+                 resume=False, manifest=None, verbose=True):
+        """Download many files concurrently.
+
+        Arguments:
+            files (list of dict): The files to fetch. Each file has the keys:
+                    * **url** (*str*): The URL of the file.
+                    * **local_path** (*str*): The path to save the file to. Each path should
+                        be unique, and its directory must exist.
+                    * **length** (*int*): The expected size of the file in bytes, if known.
+                    * **sha512** (*str*): The expected checksum of the file, if known.
+                    * **resume** (*bool*): Set to ``False`` to fetch this file from the
+                        beginning, even when ``resume`` is ``True``, such as when a partial
+                        file on disk may not be from this URL. A new partial file is
+                        still kept if the download fails.
+            max_workers (int): The maximum number of files to download at once.
+                    **Default:** ``DEFAULT_MAX_WORKERS``.
+            chunk_size (int): The number of bytes to read and write at a time.
+                    **Default:** ``DEFAULT_CHUNK_SIZE``.
+            resume (bool): If ``True``, partial files from earlier attempts will be finished
+                    instead of restarted. **Default:** ``False``.
+            manifest (DownloadManifest): If provided, each file will be recorded in the
+                    manifest before it is fetched, and marked complete once finished.
+                    **Default:** ``None``.
+            verbose (bool): If ``True``, a progress bar will show the bytes fetched
+                    and the transfer rate.
+                    **Default:** ``True``.
+
+        Returns:
+            list of dict: The status of each download (see ``fetch()``),
+            in the same order as ``files``.
+        """
+        statuses = [None] * len(files)
+        if not files:
+            return statuses
+        if manifest is not None:
+            for f in files:
+                manifest.update(f["url"], local_path=f["local_path"], length=f.get("length"),
+                                sha512=f.get("sha512"), save=False)
+            manifest.save()
+        lengths = [f.get("length") for f in files]
+        total = sum(lengths) if all(isinstance(n, int) for n in lengths) else None
+        bar_lock = threading.Lock()
+        with tqdm(total=total, desc="Fetching files", unit="B", unit_scale=True,
+                  unit_divisor=1024, disable=(not verbose)) as bar:
+
+            def progress(num_bytes):
+                with bar_lock:
+                    bar.update(num_bytes)
+
+            with ThreadPoolExecutor(max_workers=max(int(max_workers), 1)) as executor:
+                futures = {executor.submit(self.fetch, f["url"], f["local_path"],
+                                           chunk_size=chunk_size, progress=progress,
+                                           resume=resume, length=f.get("length"),
+                                           restart=(not f.get("resume", True))): i
+                           for i, f in enumerate(files)}
+                done = 0
+                for future in as_completed(futures):
+                    status = future.result()
+                    statuses[futures[future]] = status
+                    if manifest is not None and status["success"]:
+                        manifest.update(status["url"], complete=True)
+                    # Resumed bytes were fetched earlier, but count toward the total
+                    done += 1
+                    with bar_lock:
+                        bar.update(status["resumed_from"])
+                        bar.set_postfix_str("{}/{} files".format(done, len(files)))
+        return statuses
+
+    def adownload(self, files, max_workers=DEFAULT_MAX_WORKERS,
+                  chunk_size=DEFAULT_CHUNK_SIZE, resume=False, manifest=None,
+                  ordered=False):
+        """Download many files concurrently, from asyncio.
+        The files are fetched on a thread pool sharing this downloader's connection pools
+        and host limits, so the event loop is never blocked.
+
+        Arguments:
+            files (list of dict): The files to fetch (see ``download()``).
+            max_workers (int): The maximum number of files to download at once.
+                    **Default:** ``DEFAULT_MAX_WORKERS``.
+            chunk_size (int): The number of bytes to read and write at a time.
+                    **Default:** ``DEFAULT_CHUNK_SIZE``.
+            resume (bool): If ``True``, partial files from earlier attempts will be finished
+                    instead of restarted. **Default:** ``False``.
+            manifest (DownloadManifest): If provided, each file will be recorded in the
+                    manifest before it is fetched, and marked complete once finished.
+                    **Default:** ``None``.
+            ordered (bool): If ``True``, statuses are returned in the same order as ``files``.
+                    If ``False``, statuses are returned as each download finishes.
+                    **Default:** ``False``.
+
+        Returns:
+            AsyncResults: For use with ``async for``, the index of each file in ``files``
+            and its status (see ``fetch()``).
+        """
+        if manifest is not None:
+            for f in files:
+                manifest.update(f["url"], local_path=f["local_path"], length=f.get("length"),
+                                sha512=f.get("sha512"), save=False)
+            manifest.save()
+
+        def fetch(f):
+            return self.fetch(f["url"], f["local_path"], chunk_size=chunk_size, resume=resume,
+                              length=f.get("length"), restart=(not f.get("resume", True)))
+
+        fetched = amap(fetch, files, max_workers=max_workers, ordered=ordered)
+
+        async def step():
+            i, status = await fetched.__anext__()
+            if manifest is not None and status["success"]:
+                manifest.update(status["url"], complete=True)
+            return i, status
+
+        return AsyncResults(step, fetched.close)
@@ -0,0 +1,290 @@
+import json
+import os
+
+from .table import get_field
+
+
+# Supported export formats, and their file extensions
+EXPORT_FORMATS = {
+    "parquet": ".parquet",
+    "jsonl": ".jsonl"
+}
+# Partition directory name for records without a value in the partition field
+DEFAULT_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+
+
+def leaf_fields(records):
+    """List every field holding data in a set of records, in dot notation.
+    Lists of objects are searched by their item fields, the same as in Search queries.
+
+    Arguments:
+        records (list of dict): The records.
+
+    Returns:
+        list of str: The fields, in order.
+    """
+    fields = set()
+
+    def add(value, path):
+        if isinstance(value, list) and any(isinstance(item, dict) for item in value):
+            for item in value:
+                add(item, path)
+        elif isinstance(value, dict) and value:
+            for key, subvalue in value.items():
+                add(subvalue, path + "." + key if path else key)
+        elif path:
+            fields.add(path)
+
+    for record in records:
+        add(record, "")
+    return sorted(fields)
+
+
+def _schema_type(index, path):
+    """Get the JSONSchema type of a field, and if the field holds a list of values."""
+    is_list = False
+    parts = path.split(".")
+    for i in range(len(parts)):
+        node = index.get(".".join(parts[:i+1]))
+        if isinstance(node, dict) and node.get("type") == "array":
+            is_list = True
+    field_type = index.type_of(path)
+    # Types can be lists, such as ["string", "null"]
+    if isinstance(field_type, list):
+        field_type = next((t for t in field_type if t != "null"), None)
+    return field_type, is_list
+
+
+def schema_fields(index):
+    """List every field in a schema holding data (not just other fields), in dot notation.
+
+    Arguments:
+        index (FieldIndex): The index of the schema.
+
+    Returns:
+        list of str: The fields, in order.
+    """
+    fields = []
+    for path in index.fields():
+        node = index.get(path)
+        node = node.get("items", node) if isinstance(node, dict) else node
+        if not (isinstance(node, dict) and node.get("properties")):
+            fields.append(path)
+    return fields
+
+
+def arrow_schema(columns, field_index=None, records=()):
+    """Create an Arrow schema for exporting records. Requires ``pyarrow``.
+    Column types are taken from the MDF schema where available,
+    and otherwise inferred from the given records.
+
+    Arguments:
+        columns (list of str): The fields to use as columns, in dot notation.
+        field_index (FieldIndex): The index of the MDF schema for the records.
+                **Default:** ``None``, to infer every type.
+        records (list of dict): Sample records, to infer types not in the schema.
+                **Default:** No records.
+
+    Returns:
+        pyarrow.Schema: The schema. Fields in lists are list columns.
+    """
+    pyarrow = _import_pyarrow()
+    types = {
+        "string": pyarrow.string(),
+        "integer": pyarrow.int64(),
+        "number": pyarrow.float64(),
+        "boolean": pyarrow.bool_()
+    }
+    arrow_fields = []
+    for column in columns:
+        arrow_type = None
+        if field_index is not None and column in field_index:
+            field_type, is_list = _schema_type(field_index, column)
+            # Objects without known fields, and any other types, are stored as JSON
+            arrow_type = types.get(field_type, pyarrow.string())
+            if is_list:
+                arrow_type = pyarrow.list_(arrow_type)
+        else:
+            values = [_simple_value(get_field(record, column)) for record in records]
+            try:
+                arrow_type = pyarrow.array(values).type
+            except (pyarrow.ArrowException, TypeError, ValueError):
+                arrow_type = pyarrow.string()
+            if pyarrow.types.is_null(arrow_type):
+                arrow_type = pyarrow.string()
+        arrow_fields.append(pyarrow.field(column, arrow_type))
+    return pyarrow.schema(arrow_fields)
+
+
+def _simple_value(value):
+    """Convert objects in a value to JSON strings, for type inference."""
+    if isinstance(value, dict):
+        return json.dumps(value)
+    if isinstance(value, list):
+        return [_simple_value(item) for item in value]
+    return value
+
+
+def _converter(arrow_type):
+    """Create a function to convert values to fit an Arrow type.
+    Values that cannot be converted are replaced by ``None``.
+    """
+    import pyarrow
+    if pyarrow.types.is_list(arrow_type):
+        convert_item = _converter(arrow_type.value_type)
+
+        def convert_list(value):
+            if value is None:
+                return None
+            if not isinstance(value, list):
+                value = [value]
+            return [convert_item(item) for item in value]
+        return convert_list
+    if pyarrow.types.is_string(arrow_type):
+        return lambda value: (value if value is None or isinstance(value, str)
+                              else json.dumps(value))
+    cast = {"int64": int, "double": float, "bool": bool}.get(str(arrow_type))
+    if cast is None:
+        return _simple_value
+
+    def convert(value):
+        if value is None or isinstance(value, (list, dict)):
+            return None
+        try:
+            return cast(value)
+        except (TypeError, ValueError):
+            return None
+    return convert
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        raise ImportError("pyarrow is required for Parquet export. "
+                          "Install it with 'pip install pyarrow'.")
+    return pyarrow
+
+
+def _partition_dir(field, value):
+    """Get the Hive-style directory name for a partition, such as ``source_name=oqmd``."""
+    if value is None or isinstance(value, (list, dict)) or value == "":
+        value = DEFAULT_PARTITION
+    value = str(value).replace("/", "_").replace(os.sep, "_")
+    return "{}={}".format(field.split(".")[-1], value)
+
+
+class RecordExporter:
+    """Write records to Parquet or JSON Lines files, one page at a time.
+    Each page written to a Parquet file is stored as a row group,
+    so only one page needs to be held in memory.
+
+    **Example usage**::
+
+        with RecordExporter("out", partition_by="mdf.source_name") as exporter:
+            for page in forge.iter_aggregate_sources(["oqmd"], pages=True):
+                exporter.write(page)
+    """
+    def __init__(self, path, format="parquet", partition_by=None, columns=None,
+                 field_index=None):
+        """Create a RecordExporter.
+
+        Arguments:
+            path (str): The file to write to. If ``partition_by`` is set, the directory to
+                    write to, which will contain one directory per partition.
+            format (str): The format to write, ``"parquet"`` or ``"jsonl"``.
+                    **Default:** ``"parquet"``.
+            partition_by (str): The field to partition the records by, in dot notation.
+                    Records are written to Hive-style directories, such as
+                    ``path/source_name=oqmd/part-0.parquet``.
+                    **Default:** ``None``, to write one file.
+            columns (list of str): For Parquet, the fields to write as columns.
+                    Fields in lists are written as list columns, and objects as JSON strings.
+                    **Default:** Every field in the MDF schema if ``field_index`` is given,
+                    otherwise every field in the first page.
+            field_index (FieldIndex): For Parquet, the index of the MDF schema,
+                    used to set the type of each column. **Default:** ``None``,
+                    to infer types from the first page.
+        """
+        if format not in EXPORT_FORMATS.keys():
+            raise ValueError("Invalid format '{}'. Valid formats: {}"
+                             .format(format, list(EXPORT_FORMATS.keys())))
+        if format == "parquet":
+            _import_pyarrow()
+        self.path = path
+        self.format = format
+        self.partition_by = partition_by
+        self.columns = list(columns) if columns else None
+        self.field_index = field_index
+        self.schema = None
+        self.__converters = None
+        self.count = 0
+        self.__writers = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def files(self):
+        """list of str: The files written."""
+        return sorted(writer[0] for writer in self.__writers.values())
+
+    def __open(self, partition):
+        path = self.path
+        if self.partition_by is not None:
+            path = os.path.join(self.path, partition, "part-0" + EXPORT_FORMATS[self.format])
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        if self.format == "parquet":
+            import pyarrow.parquet
+            return path, pyarrow.parquet.ParquetWriter(path, self.schema)
+        return path, open(path, "w")
+
+    def write(self, records):
+        """Write a page of records.
+
+        Arguments:
+            records (list of dict): The records.
+        """
+        records = list(records)
+        if not records:
+            return
+        if self.format == "parquet" and self.schema is None:
+            # The schema is set by the first page, so every row group matches
+            if self.columns is None:
+                self.columns = (schema_fields(self.field_index) if self.field_index is not None
+                                else leaf_fields(records))
+            self.schema = arrow_schema(self.columns, self.field_index, records)
+            self.__converters = [_converter(field.type) for field in self.schema]
+
+        partitions = {}
+        for record in records:
+            partition = (_partition_dir(self.partition_by, get_field(record, self.partition_by))
+                         if self.partition_by is not None else None)
+            partitions.setdefault(partition, []).append(record)
+        for partition, part_records in partitions.items():
+            if partition not in self.__writers.keys():
+                self.__writers[partition] = self.__open(partition)
+            writer = self.__writers[partition][1]
+            if self.format == "parquet":
+                writer.write_table(self.__to_arrow(part_records))
+            else:
+                for record in part_records:
+                    writer.write(json.dumps(record) + "\n")
+        self.count += len(records)
+
+    def __to_arrow(self, records):
+        import pyarrow
+        arrays = [pyarrow.array([convert(get_field(record, field.name)) for record in records],
+                                type=field.type)
+                  for field, convert in zip(self.schema, self.__converters)]
+        return pyarrow.Table.from_arrays(arrays, schema=self.schema)
+
+    def close(self):
+        """Finish writing every file."""
+        for path, writer in self.__writers.values():
+            writer.close()
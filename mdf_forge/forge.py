@@ -1,18 +1,30 @@
+from collections import deque, OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import copy
+from itertools import islice
 import os
-import re
+import types
 from urllib.parse import urlparse
+import warnings
 
 import globus_sdk
 import mdf_toolbox
-import requests
+from mdf_toolbox.globus_search.search_helper import NONADVANCED_LIMIT, SEARCH_LIMIT
 from tqdm import tqdm
 
+from .cache import DEFAULT_CACHE_SIZE, DEFAULT_CACHE_TTL, SearchCache
+from .downloader import (amap, AsyncResults, DEFAULT_CHUNK_SIZE, DEFAULT_HOST_CONCURRENCY,
+                         DEFAULT_MAX_WORKERS, DEFAULT_RATE_LIMIT, DownloadManifest, file_matches,
+                         HTTPDownloader)
+from .export import EXPORT_FORMATS, RecordExporter
+from .local_index import LocalIndex, record_key
+from .metadata import MetadataCache
+from .query import field_values, or_batches, Query, QUERY_LENGTH_LIMIT
+from .schema import FieldIndex
+from .table import make_projection, project, ResultTable
+from .transfer import submit_transfer, TransferBatch
 from .version import __version__
 
-# Maximum recommended number of HTTP file transfers
-#  Large transfers are much better suited for Globus Transfer
-HTTP_NUM_LIMIT = 50
-
 
 class Forge(mdf_toolbox.AggregateHelper, mdf_toolbox.SearchHelper):
     """Forge fetches metadata and files from the Materials Data Facility.
@@ -29,6 +41,8 @@ class Forge(mdf_toolbox.AggregateHelper, mdf_toolbox.SearchHelper):
     __client_id = "b2b437c4-17c1-4e4b-8f15-e9783e1312d7"
     __transfer_interval = 60  # 1 minute, in seconds
     __inactivity_time = 1 * 60 * 60  # 1 hour, in seconds
+    __petrel_host = "e38ee745-6d04-11e5-ba46-22000b92c6ec.e.globus.org"
+    __data_mdf_host = "data.materialsdatafacility.org"
 
     # "Protected" variables (for dev/debugging)
     _schemas_url = "https://api.materialsdatafacility.org/schemas/"
@@ -78,6 +92,26 @@ class Forge(mdf_toolbox.AggregateHelper, mdf_toolbox.SearchHelper):
             no_browser (bool): Do not automatically open the browser for the Globus Auth URL.
                     Display the URL instead and let the user navigate to that location manually.
                     **Default**: ``False``.
+            http_rate_limit (float): The maximum number of HTTPS requests per second
+                    to send to each data server, or ``None`` for no limit.
+                    Servers that respond with ``429`` or ``503`` are also backed off from
+                    automatically.
+                    **Default**: ``DEFAULT_RATE_LIMIT``.
+            http_host_concurrency (int): The maximum number of HTTPS downloads in progress
+                    from each data server at once.
+                    **Default**: ``DEFAULT_HOST_CONCURRENCY``.
+            cache_dir (str): A directory to cache Search results in. Repeated searches
+                    are answered from the cache, and cached results are used if Search
+                    cannot be reached. Results for a dataset are removed when
+                    ``get_dataset_version()`` finds a new version of it.
+                    Schemas and organizations are also saved here, and are only downloaded
+                    again when they change.
+                    **Default**: ``None``, for no caching.
+            cache_ttl (int): The number of seconds cached Search results are used for.
+                    **Default**: ``DEFAULT_CACHE_TTL``.
+            cache_size (int): The maximum size of the Search cache, in bytes.
+                    The least-recently-used results are removed first.
+                    **Default**: ``DEFAULT_CACHE_SIZE``.
         """
         self.__anonymous = anonymous
         self.local_ep = local_ep
@@ -104,6 +138,27 @@ class Forge(mdf_toolbox.AggregateHelper, mdf_toolbox.SearchHelper):
         self.__petrel_authorizer = kwargs.get("petrel_authorizer",
                                               clients.get("petrel",
                                                           globus_sdk.NullAuthorizer()))
+        # Check for Petrel vs. NCSA url for authorizer
+        http_authorizers = {
+            self.__petrel_host: self.__petrel_authorizer,
+            self.__data_mdf_host: self.__data_mdf_authorizer
+        }
+        self.__http = HTTPDownloader(http_authorizers,
+                                     rate_limit=kwargs.pop("http_rate_limit", DEFAULT_RATE_LIMIT),
+                                     host_concurrency=kwargs.pop("http_host_concurrency",
+                                                                 DEFAULT_HOST_CONCURRENCY))
+        # source_name: versions found, for get_dataset_versions()
+        self.__dataset_versions = {}
+        cache_dir = kwargs.pop("cache_dir", None)
+        cache_ttl = kwargs.pop("cache_ttl", DEFAULT_CACHE_TTL)
+        cache_size = kwargs.pop("cache_size", DEFAULT_CACHE_SIZE)
+        self.__search_cache = (SearchCache(cache_dir, ttl=cache_ttl, max_size=cache_size)
+                               if cache_dir else None)
+        self.__metadata = MetadataCache(cache_dir)
+        # resource_type: FieldIndex
+        self.__field_indexes = {}
+        # Compacted groups of values in the current query, which can be split if too long
+        self.__query_groups = ()
         super().__init__(index=index, search_client=search_client,
                          scroll_field=self.__scroll_field, **kwargs)
 
@@ -126,28 +181,7 @@ class Forge(mdf_toolbox.AggregateHelper, mdf_toolbox.SearchHelper):
         Returns:
             Forge: Self
         """
-        # If no source_names are supplied, nothing to match
-        if not source_names:
-            return self
-        if isinstance(source_names, str):
-            source_names = [source_names]
-        # If passed source_ids, strip version info
-        sanitized_names = []
-        for src in source_names:
-            match = re.search("_v[0-9]+\\.[0-9]+$", src)
-
-            if match:
-                sanitized_names.append(src[:match.start()])
-            else:
-                sanitized_names.append(src)
-        source_names = sanitized_names
-        # First source should be in new group and required
-        self.match_field(field="mdf.source_name", value=source_names[0],
-                         required=True, new_group=True)
-        # Other sources should stay in that group, and not be required
-        for src in source_names[1:]:
-            self.match_field(field="mdf.source_name", value=src, required=False, new_group=False)
-        return self
+        return self.match_query(Query().match_source_names(source_names))
 
     def match_records(self, source_name, scroll_ids):
         """Match specific records from a given dataset.
@@ -161,25 +195,7 @@ class Forge(mdf_toolbox.AggregateHelper, mdf_toolbox.SearchHelper):
         Returns:
             Forge: self
         """
-        if not source_name or not scroll_ids:
-            return self
-        if isinstance(scroll_ids, int):
-            scroll_ids = [scroll_ids]
-        # If passed source_id, strip version info
-        match = re.search("_v[0-9]+\\.[0-9]+$", source_name)
-        if not match:
-            match = (re.search("_v[0-9]+-[0-9]+$", source_name)
-                     or re.search("_v[0-9]+$", source_name))
-        if match:
-            source_name = source_name[:match.start()]
-        # source_name is required, starts new group
-        # First scroll is (nested) new required group
-        # (source:source AND (scroll:scroll0 OR scroll:scroll1 ... ))
-        self.match_field(field="mdf.source_name", value=source_name, required=True, new_group=True)
-        self.match_field(field="mdf.scroll_id", value=scroll_ids[0], required=True, new_group=True)
-        for scroll in scroll_ids[1:]:
-            self.match_field(field="mdf.scroll_id", value=scroll, required=False, new_group=False)
-        return self
+        return self.match_query(Query().match_records(source_name, scroll_ids))
 
     def match_elements(self, elements, match_all=True):
         """Add elemental abbreviations to the query.
@@ -193,19 +209,7 @@ class Forge(mdf_toolbox.AggregateHelper, mdf_toolbox.SearchHelper):
         Returns:
             Forge: Self
         """
-        # If no elements are supplied, nothing to match
-        if not elements:
-            return self
-        if isinstance(elements, str):
-            elements = [elements]
-        # First element should be in new group and required
-        self.match_field(field="material.elements", value=elements[0],
-                         required=True, new_group=True)
-        # Other elements should stay in that group
-        for element in elements[1:]:
-            self.match_field(field="material.elements", value=element, required=match_all,
-                             new_group=False)
-        return self
+        return self.match_query(Query().match_elements(elements, match_all=match_all))
 
     def match_titles(self, titles):
         """Add titles to the query.
@@ -216,15 +220,7 @@ class Forge(mdf_toolbox.AggregateHelper, mdf_toolbox.SearchHelper):
         Returns:
             Forge: Self
         """
-        if not titles:
-            return self
-        if not isinstance(titles, list):
-            titles = [titles]
-
-        self.match_field(field="dc.titles.title", value=titles[0], required=True, new_group=True)
-        for title in titles[1:]:
-            self.match_field(field="dc.titles.title", value=title, required=False, new_group=False)
-        return self
+        return self.match_query(Query().match_titles(titles))
 
     def match_years(self, years=None, start=None, stop=None, inclusive=True):
         """Add years and limits to the query.
@@ -240,43 +236,8 @@ class Forge(mdf_toolbox.AggregateHelper, mdf_toolbox.SearchHelper):
         Returns:
             Forge: Self
         """
-        # If nothing supplied, nothing to match
-        if years is None and start is None and stop is None:
-            return self  # No filtering if no filters provided
-
-        if years is not None and years != []:
-            if not isinstance(years, list):
-                years = [years]
-            years_int = []
-            for year in years:
-                try:
-                    y_int = int(year)
-                    years_int.append(y_int)
-                except ValueError:
-                    raise AttributeError("Invalid year: '{}'".format(year))
-
-            # Only match years if valid years were supplied
-            if len(years_int) > 0:
-                self.match_field(field="dc.publicationYear", value=years_int[0], required=True,
-                                 new_group=True)
-                for year in years_int[1:]:
-                    self.match_field(field="dc.publicationYear",
-                                     value=year, required=False, new_group=False)
-        else:
-            if start is not None:
-                try:
-                    start = int(start)
-                except ValueError:
-                    raise AttributeError("Invalid start year: '{}'".format(start))
-            if stop is not None:
-                try:
-                    stop = int(stop)
-                except ValueError:
-                    raise AttributeError("Invalid stop year: '{}'".format(stop))
-
-            self.match_range(field="dc.publicationYear", start=start, stop=stop,
-                             inclusive=inclusive, required=True, new_group=True)
-        return self
+        return self.match_query(Query().match_years(years=years, start=start, stop=stop,
+                                                    inclusive=inclusive))
 
     def match_resource_types(self, types):
         """Match the given resource types.
@@ -287,17 +248,7 @@ class Forge(mdf_toolbox.AggregateHelper, mdf_toolbox.SearchHelper):
         Returns:
             Forge: Self
         """
-        # If no types, nothing to match
-        if not types:
-            return self
-        if isinstance(types, str):
-            types = [types]
-        # First type should be in new group and required
-        self.match_field(field="mdf.resource_type", value=types[0], required=True, new_group=True)
-        # Other IDs should stay in that group, and not be required
-        for rt in types[1:]:
-            self.match_field(field="mdf.resource_type", value=rt, required=False, new_group=False)
-        return self
+        return self.match_query(Query().match_resource_types(types))
 
     def match_organizations(self, organizations, match_all=True):
         """Match the given Organizations.
@@ -312,19 +263,7 @@ class Forge(mdf_toolbox.AggregateHelper, mdf_toolbox.SearchHelper):
         Returns:
             Forge: Self
         """
-        # If no orgs, nothing to match
-        if not organizations:
-            return self
-        if isinstance(organizations, str):
-            organizations = [organizations]
-        # First org should be in new group and required
-        self.match_field(field="mdf.organizations", value=organizations[0],
-                         required=True, new_group=True)
-        # Other elements should stay in that group
-        for org in organizations[1:]:
-            self.match_field(field="mdf.organizations", value=org, required=match_all,
-                             new_group=False)
-        return self
+        return self.match_query(Query().match_organizations(organizations, match_all=match_all))
 
     def match_dois(self, dois):
         """Match the given Digital Object Identifiers.
@@ -335,20 +274,54 @@ class Forge(mdf_toolbox.AggregateHelper, mdf_toolbox.SearchHelper):
         Returns:
             Forge: self
         """
-        if not dois:
+        return self.match_query(Query().match_dois(dois))
+
+    def match_query(self, query):
+        """Add the terms of a ``Query`` to the query, as a new required group.
+
+        Arguments:
+            query (Query): The query to add.
+
+        Returns:
+            Forge: Self
+        """
+        if not query.initialized:
             return self
-        if isinstance(dois, str):
-            dois = [dois]
-        # Sanitize DOIs - usually contain problem characters
-        # First doi should be in new group and required
-        self.match_field(field="dc.identifier.identifier", value=dois[0],
-                         required=True, new_group=True)
-        # Other sources should stay in that group, and not be required
-        for doi in dois[1:]:
-            self.match_field(field="dc.identifier.identifier", value=doi,
-                             required=False, new_group=False)
+        current = self._SearchHelper__query
+        if self.initialized:
+            # The same as adding each term with required=True, new_group=True
+            current["q"] += ") AND "
+            offset = len(current["q"])
+            current["q"] += query._q
+        else:
+            offset = 0
+            current["q"] = query._q
+        self.__query_groups += tuple((start + offset, end + offset, field, terms)
+                                     for start, end, field, terms in query._groups)
+        if query.advanced:
+            current["advanced"] = True
         return self
 
+    def to_query(self):
+        """Get the current query as an immutable ``Query``, which can be run from any thread.
+        The current query is not changed.
+
+        Returns:
+            Query: The current query.
+        """
+        return Query._from_raw(self._SearchHelper__query["q"],
+                               self._SearchHelper__query["advanced"], self.__query_groups)
+
+    def reset_query(self):
+        """Destroy the current query and create a fresh one.
+        This method should not be chained.
+
+        Returns:
+            None
+        """
+        self.__query_groups = ()
+        return super().reset_query()
+
     # ***********************************************
     # * Premade searches
     # ***********************************************
@@ -437,15 +410,569 @@ class Forge(mdf_toolbox.AggregateHelper, mdf_toolbox.SearchHelper):
         """
         return self.match_dois(dois).search(limit=limit, info=info)
 
-    def aggregate_sources(self, source_names, index=None):
+    def search(self, q=None, advanced=False, limit=None, info=False, reset_query=True,
+               as_table=False, columns=None, fields=None):
+        """Execute a search and return the results, up to the ``SEARCH_LIMIT``.
+        A helper-formed query longer than ``QUERY_LENGTH_LIMIT`` is split into
+        shorter queries, and their results merged.
+
+        Arguments:
+            q (str or Query): The query to execute.
+                    **Default:** The current helper-formed query, if any.
+                    There must be some query to execute.
+            advanced (bool): Whether to treat ``q`` as a basic or advanced query.
+                Has no effect if a query is not supplied in ``q``.
+                **Default:** ``False``
+            limit (int): The maximum number of results to return.
+                    The max for this argument is the ``SEARCH_LIMIT`` imposed by Globus Search.
+                    **Default:** ``SEARCH_LIMIT`` for advanced queries, 10 for basic queries.
+            info (bool): If ``False``, search will return a list of the results.
+                    If ``True``, search will return a tuple containing the results list
+                    and other information about the query.
+                    **Default:** ``False``.
+            reset_query (bool): If ``True``, will destroy the current query after execution
+                    and start a fresh one.
+                    If ``False``, will keep the current query set.
+                    Has no effect if a query is supplied in ``q``.
+                    **Default:** ``True``.
+            as_table (bool): If ``True``, will return the results as a ``ResultTable``
+                    instead of a list. **Default:** ``False``.
+            columns (list of str): The fields to store as columns if ``as_table`` is ``True``.
+                    **Default:** ``mdf_forge.table.DEFAULT_COLUMNS``.
+            fields (list of str): If given, only these fields are kept in each record,
+                    in dot notation (such as ``"mdf.source_name"`` or ``"files.url"``).
+                    Other fields are removed from the results before they are returned.
+                    **Default:** ``None``, to keep all fields.
+
+        Returns:
+            If ``info`` is ``False``, *list*: The search results.
+            If ``info`` is ``True``, *tuple*: The search results,
+            and a dictionary of query information.
+
+        Note:
+            If a query is specified in ``q``, the current, helper-built query (if any)
+            will not be used in the search or modified.
+        """
+        if isinstance(q, Query):
+            query = q
+            q, advanced = q.q, q.advanced
+        else:
+            query = self.to_query() if q is None else None
+        # Queries too long for Search are split, and the results merged
+        split = [query]
+        if query is not None and len(query.q) > QUERY_LENGTH_LIMIT:
+            split = query.split(QUERY_LENGTH_LIMIT)
+        if len(split) > 1:
+            res = self._search_split(split, limit=limit, info=info)
+            if q is None and reset_query:
+                self.reset_query()
+        elif q is None:
+            res = super().search(limit=limit, info=info, reset_query=reset_query)
+        else:
+            res = self._query_helper(q, advanced=advanced).search(limit=limit, info=info,
+                                                                  reset_query=False)
+        if fields is not None:
+            projection = make_projection(fields)
+            if info:
+                res = [project(rec, projection) for rec in res[0]], res[1]
+            else:
+                res = [project(rec, projection) for rec in res]
+        if as_table:
+            if info:
+                return ResultTable(res[0], columns=columns), res[1]
+            return ResultTable(res, columns=columns)
+        return res
+
+    def _search_split(self, queries, limit=None, info=False):
+        """Execute the parts of a query split by ``Query.split()``, and merge the results.
+        Records matched by more than one part are only returned once.
+
+        Arguments:
+            queries (list of Query): The parts of the query.
+            limit (int): The maximum number of results to return.
+                    **Default:** ``SEARCH_LIMIT`` for advanced queries, 10 for basic queries.
+            info (bool): If ``True``, will also return information about the query, with the
+                    ``total_query_matches`` summed over every part (which may count
+                    records matched by more than one part more than once), and each
+                    part's query in ``split_queries``. **Default:** ``False``.
+
+        Returns:
+            If ``info`` is ``False``, *list*: The search results.
+            If ``info`` is ``True``, *tuple*: The search results,
+            and a dictionary of query information.
+        """
+        if limit is None:
+            limit = SEARCH_LIMIT if queries[0].advanced else NONADVANCED_LIMIT
+
+        def run(query):
+            return self._query_helper(query.q, advanced=query.advanced).search(
+                        limit=limit, info=True, reset_query=False)
+
+        results = []
+        seen = set()
+        res_infos = []
+        with ThreadPoolExecutor(max_workers=min(DEFAULT_MAX_WORKERS, len(queries))) as executor:
+            for res, res_info in executor.map(run, queries):
+                res_infos.append(res_info)
+                for rec in res:
+                    key = record_key(rec)
+                    if key not in seen and len(results) < limit:
+                        seen.add(key)
+                        results.append(rec)
+        if not info:
+            return results
+        merged_info = dict(res_infos[0])
+        merged_info["total_query_matches"] = sum(res_info["total_query_matches"]
+                                                 for res_info in res_infos)
+        merged_info["split_queries"] = [res_info["query"] for res_info in res_infos]
+        return results, merged_info
+
+    def _ex_search(self, limit=None, info=False, retries=3):
+        """Execute a search with the current query, using the Search cache if enabled.
+
+        Arguments:
+            limit (int): Maximum number of entries to return. **Default**: ``10`` for basic
+                queries, and ``10000`` for advanced.
+            info (bool): If ``False``, search will return a list of the results.
+                    If ``True``, search will return a tuple containing the results list
+                    and other information about the query.
+                    **Default:** ``False``.
+            retries (int): The number of times to retry a Search query if it fails.
+                           **Default:** 3.
+
+        Returns:
+            If ``info`` is ``False``, *list*: The search results.
+            If ``info`` is ``True``, *tuple*: The search results,
+            and a dictionary of query information.
+        """
+        if self.__search_cache is None:
+            return self.__search(limit=limit, info=info, retries=retries)
+
+        query = self._SearchHelper__query
+        if limit is None:
+            limit = query["limit"]
+        if limit is None:
+            limit = SEARCH_LIMIT if query["advanced"] else NONADVANCED_LIMIT
+        key = SearchCache.make_key(self.index, {
+            "q": self.current_query(),
+            "advanced": query["advanced"],
+            "limit": limit,
+            "offset": query["offset"],
+            "facets": query["facets"],
+            "filters": query["filters"],
+            "sort": query["sort"]
+        })
+        cached = self.__search_cache.get(key)
+        if cached is None:
+            try:
+                results, res_info = self.__search(limit=limit, info=True, retries=retries)
+            except Exception as e:
+                # Fall back to expired results if Search is unavailable
+                cached = self.__search_cache.get(key, allow_expired=True)
+                if cached is None:
+                    raise
+                warnings.warn("Search failed, using cached results: {}".format(repr(e)),
+                              RuntimeWarning)
+            else:
+                # Remember which datasets the results depend on
+                source_names = set(field_values(res_info["query"], "mdf.source_name"))
+                source_names.update(res["mdf"]["source_name"] for res in results
+                                    if res.get("mdf", {}).get("source_name"))
+                self.__search_cache.put(key, [results, res_info], source_names)
+                cached = [results, res_info]
+        results, res_info = cached
+        return (results, res_info) if info else results
+
+    def __search(self, limit=None, info=False, retries=3):
+        """Execute a search with the current query, without the Search cache.
+        If facets are requested, their results are kept in the query information
+        as ``facet_results``.
+        Arguments and return values are the same as ``_ex_search()``.
+        """
+        if not self._SearchHelper__query["facets"]:
+            return super()._ex_search(limit=limit, info=info, retries=retries)
+        # The results are unwrapped without the facet results, so keep the raw response
+        client = self._SearchHelper__search_client
+        responses = []
+
+        def post_search(index, query):
+            responses.append(client.post_search(index, query))
+            return responses[-1]
+
+        helper = copy.copy(self)
+        helper._SearchHelper__search_client = types.SimpleNamespace(post_search=post_search)
+        results, res_info = super(Forge, helper)._ex_search(limit=limit, info=True,
+                                                            retries=retries)
+        response = responses[-1]
+        if isinstance(response, globus_sdk.GlobusHTTPResponse):
+            response = response.data
+        res_info["facet_results"] = response.get("facet_results", [])
+        return (results, res_info) if info else results
+
+    def clear_search_cache(self, source_name=None):
+        """Remove results from the Search cache, if the cache is enabled.
+
+        Arguments:
+            source_name (str): If given, only remove results from this dataset.
+                    **Default:** ``None``, to remove all results.
+        """
+        if self.__search_cache is not None:
+            self.__search_cache.invalidate(source_name)
+
+    def _query_helper(self, q=None, advanced=False, cache=True):
+        """Create a copy of this client with only the given query set.
+        The copy shares this client's connections and index, so unlike a new
+        ``SearchHelper``, no requests are needed to set it up.
+
+        Arguments:
+            q (str): The query to set. **Default:** No query.
+            advanced (bool): Whether to treat ``q`` as a basic or advanced query.
+                    **Default:** ``False``.
+            cache (bool): If ``False``, the new client will not use the Search cache.
+                    **Default:** ``True``.
+
+        Returns:
+            Forge: The new client.
+        """
+        helper = copy.copy(self)
+        if not cache:
+            helper.__search_cache = None
+        helper.reset_query()
+        if q:
+            helper._SearchHelper__query["q"] = q
+            helper._SearchHelper__query["advanced"] = advanced
+        return helper
+
+    def search_many(self, queries, advanced=True, limit=None, max_workers=DEFAULT_MAX_WORKERS):
+        """Execute many independent searches at once.
+        Every search uses this client's connection, so no extra logins are needed,
+        and this client's current query is not used or changed.
+
+        **Example usage**::
+
+            queries = ["mdf.source_name:oqmd AND material.elements:Fe",
+                       "mdf.source_name:oqmd AND material.elements:Co"]
+            for res in forge.search_many(queries):
+                print(res["query"], len(res["results"]))
+
+        Arguments:
+            queries (list): The queries to execute. Each query may be a ``Query``,
+                    a query string, or a ``Forge`` with a helper-built query
+                    (whose query is read immediately).
+            advanced (bool): Whether to treat query strings as basic or advanced queries.
+                    **Default:** ``True``.
+            limit (int): The maximum number of results to return for each query.
+                    **Default:** ``SEARCH_LIMIT`` for advanced queries, 10 for basic queries.
+            max_workers (int): The maximum number of searches to run at once.
+                    **Default:** ``DEFAULT_MAX_WORKERS``.
+
+        Returns:
+            list of dict: The outcome of each query, in the same order as ``queries``, with:
+                ``query`` (*str*): The query.
+                ``success`` (*bool*): ``True`` if the search succeeded.
+                ``results`` (*list*): The search results, or an empty list on failure.
+                ``info`` (*dict*): The query information, as from ``search(info=True)``,
+                or ``None`` on failure.
+                ``error`` (*str*): The error, or ``None`` on success.
+        """
+        # Read every query now, so later changes to builders do not affect the searches.
+        # Queries are kept as Query objects where possible, so that search() can split
+        # queries too long for Search.
+        snapshots = []
+        for query in queries:
+            if isinstance(query, Query):
+                snapshots.append((query, query.advanced))
+            elif isinstance(query, Forge):
+                snapshots.append((query.to_query(), query._SearchHelper__query["advanced"]))
+            elif isinstance(query, mdf_toolbox.SearchHelper):
+                snapshots.append((query.current_query() if query.initialized else "",
+                                  query._SearchHelper__query["advanced"]))
+            elif isinstance(query, str):
+                snapshots.append((query, advanced))
+            else:
+                raise ValueError("Invalid query: '{}'".format(query))
+
+        def run(snapshot):
+            query, q_advanced = snapshot
+            q = query.q if isinstance(query, Query) else query
+            try:
+                if not q.strip():
+                    raise ValueError("No query has been set.")
+                results, info = self.search(query, advanced=q_advanced, limit=limit, info=True)
+            except Exception as e:
+                return {
+                    "query": q,
+                    "success": False,
+                    "results": [],
+                    "info": None,
+                    "error": repr(e)
+                }
+            return {
+                "query": q,
+                "success": True,
+                "results": results,
+                "info": info,
+                "error": None
+            }
+
+        if not snapshots:
+            return []
+        with ThreadPoolExecutor(max_workers=max(min(int(max_workers), len(snapshots)),
+                                                1)) as executor:
+            return list(executor.map(run, snapshots))
+
+    def iter_search(self, q=None, advanced=False, page_size=1000, prefetch=2, limit=None,
+                    info=False, reset_query=True, pages=False, fields=None):
+        """Execute a search, and yield the results one page at a time through a generator.
+        While each page is being used, the next pages are fetched on background threads,
+        so processing results and waiting on Search overlap.
+
+        **Example usage**::
+
+            for record in forge.match_source_names("oqmd").iter_search(page_size=500):
+                featurize(record)
+
+        Note:
+            The query is read (and reset, if requested) immediately, so the current query
+            can be reused before the generator is finished.
+            Like ``search()``, at most ``SEARCH_LIMIT`` results can be returned.
+            To get every result of a larger query, use ``iter_aggregate()``.
+
+        Arguments:
+            q (str or Query): The query to execute.
+                    **Default:** The current helper-formed query, if any.
+                    There must be some query to execute.
+            advanced (bool): Whether to treat ``q`` as a basic or advanced query.
+                Has no effect if a query is not supplied in ``q``.
+                **Default:** ``False``
+            page_size (int): The number of results in each page. **Default:** ``1000``.
+            prefetch (int): The maximum number of pages to fetch ahead of the page in use.
+                    If ``0``, each page is only fetched when it is needed. **Default:** ``2``.
+            limit (int): The maximum number of results to return.
+                    **Default:** ``None``, for all results (up to the ``SEARCH_LIMIT``).
+            info (bool): If ``True``, will yield a tuple of each result (or page) and the
+                    information about the query that returned it, as from
+                    ``search(info=True)``. **Default:** ``False``.
+            reset_query (bool): If ``True``, will destroy the current query
+                    and start a fresh one.
+                    If ``False``, will keep the current query set.
+                    Has no effect if a query is supplied in ``q``.
+                    **Default:** ``True``.
+            pages (bool): If ``True``, will yield each page of results as a list.
+                    If ``False``, will yield results one at a time.
+                    **Default:** ``False``.
+            fields (list of str): If given, only these fields are kept in each record,
+                    in dot notation (such as ``"mdf.source_name"`` or ``"files.url"``).
+                    **Default:** ``None``, to keep all fields.
+
+        Yields:
+            dict: Each result, or a list of results if ``pages`` is ``True``.
+            If ``info`` is ``True``, each is in a tuple with the query information.
+        """
+        if page_size <= 0:
+            raise AttributeError("Page size must be greater than zero")
+        query = None
+        if isinstance(q, Query):
+            query = q
+            q, advanced = q.q, q.advanced
+        # Capture the query now, so the generator is not affected by later query changes
+        if q is None:
+            if not self.initialized:
+                raise AttributeError('No query has been set.')
+            q = self.current_query()
+            advanced = self._SearchHelper__query["advanced"]
+            query = self.to_query()
+            if reset_query:
+                self.reset_query()
+        limit = SEARCH_LIMIT if limit is None else min(limit, SEARCH_LIMIT)
+
+        # Queries too long for Search are split, and each part paged through in turn
+        split = [query]
+        if query is not None and len(query.q) > QUERY_LENGTH_LIMIT:
+            split = query.split(QUERY_LENGTH_LIMIT)
+
+        def pager():
+            seen = set()
+            count = 0
+            for part in split:
+                part_q = part.q if len(split) > 1 else q
+                for page, page_info in self._search_pages(part_q, advanced, page_size,
+                                                          limit, prefetch):
+                    if len(split) > 1:
+                        page = [rec for rec in page if record_key(rec) not in seen]
+                        seen.update(record_key(rec) for rec in page)
+                    page = page[:limit - count]
+                    count += len(page)
+                    if page:
+                        yield page, page_info
+                    if count >= limit:
+                        return
+
+        pages_info = pager()
+        if fields is not None:
+            projection = make_projection(fields)
+            pages_info = (([project(rec, projection) for rec in page], page_info)
+                          for page, page_info in pages_info)
+        if pages:
+            return pages_info if info else (page for page, page_info in pages_info)
+        if info:
+            return ((rec, page_info) for page, page_info in pages_info for rec in page)
+        return (rec for page, page_info in pages_info for rec in page)
+
+    def _search_pages(self, q, advanced, page_size, limit, prefetch):
+        """Yield pages of results for a query, paging by offset, with up to ``prefetch``
+        pages fetched ahead of the page in use.
+
+        Arguments:
+            q (str): The query to execute.
+            advanced (bool): Whether to treat ``q`` as a basic or advanced query.
+            page_size (int): The number of results in each page.
+            limit (int): The maximum number of results to return,
+                    no more than the ``SEARCH_LIMIT``.
+            prefetch (int): The maximum number of pages to fetch ahead.
+
+        Yields:
+            tuple: Each page of results, and the query information for that page.
+        """
+        def fetch(offset):
+            helper = self._query_helper(q, advanced=advanced)
+            helper._SearchHelper__query["offset"] = offset
+            return helper.search(limit=min(page_size, limit - offset), info=True,
+                                 reset_query=False)
+
+        # The first page gives the total, so only pages with results are requested
+        results, info = fetch(0)
+        offsets = deque(range(page_size, min(limit, info["total_query_matches"]), page_size))
+        executor = ThreadPoolExecutor(max_workers=max(prefetch, 1))
+        pending = deque()
+        try:
+            # Start on the next pages before the first page is used
+            while offsets and len(pending) < prefetch:
+                pending.append(executor.submit(fetch, offsets.popleft()))
+            if results:
+                yield results, info
+            while offsets or pending:
+                while offsets and len(pending) < max(prefetch, 1):
+                    pending.append(executor.submit(fetch, offsets.popleft()))
+                results, info = pending.popleft().result()
+                # Start on the next page before this page is used
+                while offsets and len(pending) < prefetch:
+                    pending.append(executor.submit(fetch, offsets.popleft()))
+                if results:
+                    yield results, info
+        finally:
+            # If the consumer stops early, do not fetch the remaining pages
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+    def count(self, q=None, advanced=False, reset_query=True):
+        """Count the records matching a query, without fetching any records.
+
+        Arguments:
+            q (str or Query): The query to count.
+                    **Default:** The current helper-formed query, if any.
+                    There must be some query to count.
+            advanced (bool): Whether to treat ``q`` as a basic or advanced query.
+                Has no effect if a query is not supplied in ``q``.
+                **Default:** ``False``
+            reset_query (bool): If ``True``, will destroy the current query after execution
+                    and start a fresh one.
+                    If ``False``, will keep the current query set.
+                    Has no effect if a query is supplied in ``q``.
+                    **Default:** ``True``.
+
+        Returns:
+            int: The number of matching records. If the query was too long and had to be
+            split, records matched by more than one part are counted more than once.
+        """
+        return self.search(q=q, advanced=advanced, limit=0, info=True,
+                           reset_query=reset_query)[1]["total_query_matches"]
+
+    def facets(self, fields, q=None, advanced=False, size=100, info=False, reset_query=True,
+               retries=3):
+        """Count the records with each value of some fields, without fetching any records.
+
+        **Example usage**::
+
+            forge.match_elements("Fe").facets(["mdf.source_name", "dc.publicationYear"])
+            => {"mdf.source_name": {"oqmd": 80000, "nist_xps_db": 100, ...},
+                "dc.publicationYear": {"2016": 80100, ...}}
+
+        Arguments:
+            fields (str or list of str): The fields to count values of, in dot notation,
+                    such as ``"mdf.source_name"``, ``"material.elements"``,
+                    ``"dc.publicationYear"``, or ``"mdf.organizations"``.
+            q (str or Query): The query matching the records to count.
+                    **Default:** The current helper-formed query, if any.
+                    There must be some query to execute.
+            advanced (bool): Whether to treat ``q`` as a basic or advanced query.
+                Has no effect if a query is not supplied in ``q``.
+                **Default:** ``False``
+            size (int): The maximum number of values to return for each field,
+                    starting from the most common. **Default:** ``100``.
+            info (bool): If ``True``, will also return information about the query,
+                    including the number of matching records in ``total_query_matches``.
+                    **Default:** ``False``.
+            reset_query (bool): If ``True``, will destroy the current query after execution
+                    and start a fresh one.
+                    If ``False``, will keep the current query set.
+                    Has no effect if a query is supplied in ``q``.
+                    **Default:** ``True``.
+            retries (int): The number of times to retry the query if it fails.
+                    **Default:** 3.
+
+        Returns:
+            If ``info`` is ``False``, *dict*: ``field: {value: count}`` pairs,
+            with the values of each field from most to least common.
+            If ``info`` is ``True``, *tuple*: The counts, and a dictionary of query information.
+
+        Note:
+            Unlike ``search()``, a query longer than ``QUERY_LENGTH_LIMIT`` is not split,
+            since the most common values of each part cannot be merged exactly.
+            Such queries will be refused by Search.
+        """
+        if isinstance(fields, str):
+            fields = [fields]
+        if isinstance(q, Query):
+            q, advanced = q.q, q.advanced
+        if q is None:
+            if not self.initialized:
+                raise AttributeError('No query has been set.')
+            q = self.current_query()
+            advanced = self._SearchHelper__query["advanced"]
+            if reset_query:
+                self.reset_query()
+        helper = self._query_helper(q, advanced=advanced)
+        helper._SearchHelper__query["facets"] = [{
+            "name": field,
+            "field_name": field,
+            "type": "terms",
+            "size": size
+        } for field in fields]
+        # Only the facets are needed, so no records are requested
+        res, res_info = helper._ex_search(limit=0, info=True, retries=retries)
+        res_info = dict(res_info)
+        facet_results = res_info.pop("facet_results", [])
+        # Keep the most common values first, on versions where dicts are unordered
+        facets = OrderedDict((field, OrderedDict()) for field in fields)
+        for facet in facet_results:
+            facets[facet["name"]] = OrderedDict((bucket["value"], bucket["count"])
+                                                for bucket in facet.get("buckets", []))
+        return (facets, res_info) if info else facets
+
+    def aggregate_sources(self, source_names, index=None, stream=False, max_workers=1,
+                          as_table=False, columns=None, fields=None):
         """Aggregate all records with the given ``source_name`` values.
         There is no limit to the number of results returned.
         Please beware of aggregating very large datasets.
 
         Caution:
             It is recommended that you check how many entries will be returned from your chosen
-            datasets by running ``match_source_names(source_names).search(limit=0, info=True)``
+            datasets by running ``match_source_names(source_names).count()``
+            (or, for a count per dataset, ``facets("mdf.source_name")``)
             before using ``aggregate_sources()``.
+            For very large datasets, use ``stream=True`` or ``iter_aggregate_sources()``.
 
         Note:
             This method will use terms from the current query, and resets the current query.
@@ -453,13 +980,378 @@ class Forge(mdf_toolbox.AggregateHelper, mdf_toolbox.SearchHelper):
         Arguments:
             source_names (str or list of str): The ``source_name`` values to aggregate.
             index (str): The Search index to search on. **Default:** The current index.
+            stream (bool): If ``True``, will return a generator of records instead of a list,
+                    as ``iter_aggregate_sources()`` does. **Default:** ``False``.
+            max_workers (int): The maximum number of queries to run at once.
+                    When greater than ``1``, each source is split into ``scroll_id`` ranges
+                    which are fetched in parallel, and records are returned in no
+                    particular order. **Default:** ``1``.
+            as_table (bool): If ``True``, will return the records as a ``ResultTable``
+                    instead of a list. **Default:** ``False``.
+            columns (list of str): The fields to store as columns if ``as_table`` is ``True``.
+                    **Default:** ``mdf_forge.table.DEFAULT_COLUMNS``.
+            fields (list of str): If given, only these fields are kept in each record,
+                    in dot notation (such as ``"mdf.source_name"`` or ``"files.url"``).
+                    Other fields are removed from each page as soon as it is fetched.
+                    **Default:** ``None``, to keep all fields.
 
         Returns:
             list of dict: All of the entries from the ``source_name`` matches.
         """
-        return self.match_source_names(source_names).aggregate(index=index)
+        partitions = self._source_partitions(source_names) if max_workers > 1 else None
+        return self.match_source_names(source_names).aggregate(
+                    index=index, stream=stream, max_workers=max_workers, partitions=partitions,
+                    as_table=as_table, columns=columns, fields=fields)
+
+    def iter_aggregate_sources(self, source_names, index=None, pages=False, max_workers=1,
+                               fields=None):
+        """Yield all records with the given ``source_name`` values, through a generator.
+        Records are fetched one page at a time, so only one page is held in memory
+        no matter how large the datasets are.
+
+        Note:
+            This method will use terms from the current query, and resets the current query
+            immediately, before any records are fetched.
+
+        Arguments:
+            source_names (str or list of str): The ``source_name`` values to aggregate.
+            index (str): The Search index to search on. **Default:** The current index.
+            pages (bool): If ``True``, will yield each page of records as a list.
+                    If ``False``, will yield records one at a time.
+                    **Default:** ``False``.
+            max_workers (int): The maximum number of queries to run at once.
+                    When greater than ``1``, each source is split into ``scroll_id`` ranges
+                    which are fetched in parallel, and records are yielded in no
+                    particular order. **Default:** ``1``.
+            fields (list of str): If given, only these fields are kept in each record,
+                    in dot notation (such as ``"mdf.source_name"`` or ``"files.url"``).
+                    Other fields are removed from each page as soon as it is fetched.
+                    **Default:** ``None``, to keep all fields.
+
+        Yields:
+            dict: Each entry from the ``source_name`` matches, or a list of entries
+            if ``pages`` is ``True``.
+        """
+        partitions = self._source_partitions(source_names) if max_workers > 1 else None
+        return self.match_source_names(source_names).iter_aggregate(
+                    index=index, pages=pages, max_workers=max_workers, partitions=partitions,
+                    fields=fields)
+
+    def aggregate(self, q=None, scroll_size=SEARCH_LIMIT, reset_query=True, stream=False,
+                  max_workers=1, as_table=False, columns=None, fields=None, **kwargs):
+        """Perform an advanced query, and return *all* matching results.
+        Will automatically perform multiple queries in order to retrieve all results.
+
+        Note:
+            All ``aggregate`` queries run in advanced mode, and ``info`` is not available.
 
-    def fetch_datasets_from_results(self, entries=None, query=None, reset_query=True):
+        Arguments:
+            q (str or Query): The query to execute.
+                    **Default:** The current helper-formed query, if any.
+                    There must be some query to execute.
+            scroll_size (int): Maximum number of records returned per query. Must be
+                    between one and the ``SEARCH_LIMIT`` (inclusive).
+                    **Default:** ``SEARCH_LIMIT``.
+            reset_query (bool): If ``True``, will destroy the current query after execution
+                    and start a fresh one.
+                    If ``False``, will keep the current query set.
+                    **Default:** ``True``.
+            stream (bool): If ``True``, will return a generator of records instead of a list,
+                    as ``iter_aggregate()`` does. **Default:** ``False``.
+            max_workers (int): The maximum number of queries to run at once.
+                    When greater than ``1``, the ``scroll_id`` range is split into partitions
+                    which are fetched in parallel, and records are returned in no
+                    particular order. **Default:** ``1``.
+            as_table (bool): If ``True``, will return the records as a ``ResultTable``
+                    instead of a list. Records are added to the table as they are fetched,
+                    so the full list of records is never held in memory.
+                    Cannot be used with ``stream``. **Default:** ``False``.
+            columns (list of str): The fields to store as columns if ``as_table`` is ``True``.
+                    **Default:** ``mdf_forge.table.DEFAULT_COLUMNS``.
+            fields (list of str): If given, only these fields are kept in each record,
+                    in dot notation (such as ``"mdf.source_name"`` or ``"files.url"``).
+                    Other fields are removed from each page as soon as it is fetched.
+                    **Default:** ``None``, to keep all fields.
+
+        Keyword Arguments:
+            scroll_field (str): The field on which to scroll. This should be a field
+                    that counts/indexes the entries.
+                    **Default**: ``self.scroll_field``.
+            partitions (list of str): Disjoint advanced queries that together match the same
+                    records as the query, such as one query per ``source_name``.
+                    Each is partitioned separately when ``max_workers`` is greater than ``1``.
+                    **Default:** The query is not split.
+
+        Returns:
+            list of dict: All matching records, or a ``ResultTable`` if ``as_table`` is ``True``.
+        """
+        if stream and as_table:
+            raise AttributeError("stream and as_table cannot both be used.")
+        records = self.iter_aggregate(q=q, scroll_size=scroll_size, reset_query=reset_query,
+                                      max_workers=max_workers, fields=fields, **kwargs)
+        if stream:
+            return records
+        if as_table:
+            return ResultTable(records, columns=columns)
+        return list(records)
+
+    def iter_aggregate(self, q=None, scroll_size=SEARCH_LIMIT, reset_query=True, pages=False,
+                       max_workers=1, fields=None, **kwargs):
+        """Perform an advanced query, and yield *all* matching results, through a generator.
+        Records are fetched one ``scroll_id`` range at a time, so only one page
+        is held in memory at once.
+
+        Note:
+            The query is read (and reset, if requested) immediately, so the current query
+            can be reused before the generator is finished.
+
+        Arguments:
+            q (str or Query): The query to execute.
+                    **Default:** The current helper-formed query, if any.
+                    There must be some query to execute.
+            scroll_size (int): Maximum number of records returned per query. Must be
+                    between one and the ``SEARCH_LIMIT`` (inclusive).
+                    **Default:** ``SEARCH_LIMIT``.
+            reset_query (bool): If ``True``, will destroy the current query
+                    and start a fresh one.
+                    If ``False``, will keep the current query set.
+                    **Default:** ``True``.
+            pages (bool): If ``True``, will yield each page of records as a list.
+                    If ``False``, will yield records one at a time.
+                    **Default:** ``False``.
+            max_workers (int): The maximum number of queries to run at once.
+                    When greater than ``1``, the ``scroll_id`` range is split into partitions
+                    which are fetched in parallel, and records are yielded in no
+                    particular order. **Default:** ``1``.
+            fields (list of str): If given, only these fields are kept in each record,
+                    in dot notation (such as ``"mdf.source_name"`` or ``"files.url"``).
+                    Other fields are removed from each page as soon as it is fetched.
+                    **Default:** ``None``, to keep all fields.
+
+        Keyword Arguments:
+            scroll_field (str): The field on which to scroll. This should be a field
+                    that counts/indexes the entries.
+                    **Default**: ``self.scroll_field``.
+            partitions (list of str): Disjoint advanced queries that together match the same
+                    records as the query, such as one query per ``source_name``.
+                    Each is partitioned separately when ``max_workers`` is greater than ``1``.
+                    **Default:** The query is not split.
+
+        Yields:
+            dict: Each matching record, or a list of records if ``pages`` is ``True``.
+        """
+        scroll_field = kwargs.get("scroll_field", self.scroll_field)
+        # Make sure scroll_field is valid
+        if not scroll_field:
+            raise AttributeError("scroll_field is required.")
+        # Inform the user if they set an invalid value for the query size
+        if scroll_size <= 0:
+            raise AttributeError('Scroll size must greater than zero')
+
+        query = None
+        if isinstance(q, Query):
+            query = q
+            q = q.q
+        # Capture the query now, so the generator is not affected by later query changes
+        if q is None:
+            if not self.initialized:
+                raise AttributeError('No query has been set.')
+            # Warn the user if we are changing the setting of advanced
+            if not self._SearchHelper__query["advanced"]:
+                warnings.warn('This query will be run in advanced mode.', RuntimeWarning)
+            q = self.current_query()
+            query = self.to_query()
+            if reset_query:
+                self.reset_query()
+
+        def make_pager(q, partitions=None):
+            if max_workers > 1:
+                return self._aggregate_pages_parallel(q, scroll_field,
+                                                      min(scroll_size, SEARCH_LIMIT),
+                                                      max_workers, partitions)
+            return self._aggregate_pages(q, scroll_field, min(scroll_size, SEARCH_LIMIT))
+
+        # Queries too long for Search are split, and each part aggregated in turn
+        split = [query]
+        if query is not None and len(query.q) > QUERY_LENGTH_LIMIT:
+            split = query.split(QUERY_LENGTH_LIMIT)
+        if len(split) > 1:
+            pager = self._unique_pages(make_pager(part.q) for part in split)
+        else:
+            pager = make_pager(q, kwargs.get("partitions"))
+        if fields is not None:
+            projection = make_projection(fields)
+            pager = ([project(rec, projection) for rec in page] for page in pager)
+        if pages:
+            return pager
+        return (record for page in pager for record in page)
+
+    def _unique_pages(self, pagers):
+        """Yield the pages from several pagers, without records already yielded.
+
+        Arguments:
+            pagers (iterable of generators): The pagers.
+
+        Yields:
+            list of dict: Each page of new records.
+        """
+        seen = set()
+        for pager in pagers:
+            for page in pager:
+                new_page = []
+                for rec in page:
+                    key = record_key(rec)
+                    if key not in seen:
+                        seen.add(key)
+                        new_page.append(rec)
+                if new_page:
+                    yield new_page
+
+    def _aggregate_pages(self, q, scroll_field, scroll_size):
+        """Yield pages of results for the given advanced query, scrolling over
+        ``scroll_field`` in ranges small enough that every record is returned.
+
+        Arguments:
+            q (str): The query to execute.
+            scroll_field (str): The field on which to scroll.
+            scroll_size (int): Maximum number of records returned per query.
+
+        Yields:
+            list of dict: Each page of matching records.
+        """
+        # Get the total number of records
+        total = self.search(q=q, advanced=True, limit=0, info=True)[1]["total_query_matches"]
+
+        # If aggregate is unnecessary, use Search automatically instead
+        if total <= SEARCH_LIMIT:
+            yield self.search(q=q, advanced=True, limit=SEARCH_LIMIT)
+            return
+
+        # Scroll until all results are found
+        found = 0
+        scroll_pos = 0
+        while found < total:
+            # Scroll until the width is small enough to get all records
+            #   `scroll_id`s are unique to each dataset. If multiple datasets
+            #   match a certain query, the total number of matching records
+            #   may exceed the maximum that search will return - even if the
+            #   scroll width is much smaller than that maximum
+            scroll_width = scroll_size
+            while True:
+                query = "({q}) AND ({field}:>={start} AND {field}:<{end})".format(
+                        q=q, field=scroll_field, start=scroll_pos, end=scroll_pos+scroll_width)
+                results, info = self.search(q=query, advanced=True, info=True)
+                # Check to make sure that all the matching records were returned
+                if info["total_query_matches"] <= len(results):
+                    break
+                # If not, reduce the scroll width
+                # new_width is proportional with the proportion of results returned
+                new_width = scroll_width * len(results) // info["total_query_matches"]
+                # scroll_width should never be 0, and should only be 1 in rare circumstances
+                scroll_width = new_width if new_width > 1 else max(scroll_width // 2, 1)
+
+            found += len(results)
+            scroll_pos += scroll_width
+            if results:
+                yield results
+
+    def _aggregate_pages_parallel(self, q, scroll_field, scroll_size, max_workers,
+                                  partitions=None):
+        """Yield pages of results for the given advanced query, fetching disjoint
+        ``scroll_field`` ranges in parallel. Ranges with more records than Search will
+        return are split in half until every record is returned.
+
+        Arguments:
+            q (str): The query to execute.
+            scroll_field (str): The field on which to scroll.
+            scroll_size (int): The width of each range, and maximum number of records
+                    returned per query.
+            max_workers (int): The maximum number of queries to run at once.
+            partitions (list of str): Disjoint queries that together match the same
+                    records as ``q``, to be partitioned separately. **Default:** ``[q]``.
+
+        Yields:
+            list of dict: Each page of matching records, in no particular order.
+        """
+        # If aggregate is unnecessary, use Search automatically instead
+        total = self.search(q=q, advanced=True, limit=0, info=True)[1]["total_query_matches"]
+        if total <= SEARCH_LIMIT:
+            yield self.search(q=q, advanced=True, limit=SEARCH_LIMIT)
+            return
+
+        def last_scroll_id(query):
+            res = self._query_helper(query, advanced=True).add_sort(
+                        scroll_field, ascending=False).search(limit=1)
+            if not res:
+                return None
+            value = res[0]
+            for key in scroll_field.split("."):
+                value = value[key]
+            return int(value)
+
+        def fetch(query, start, end):
+            range_query = "({q}) AND ({field}:>={start} AND {field}:<{end})".format(
+                            q=query, field=scroll_field, start=start, end=end)
+            results, info = self.search(q=range_query, advanced=True, info=True)
+            return query, start, end, results, info["total_query_matches"]
+
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        pending = set()
+        try:
+            # Split each partition into ranges up to its last scroll_id
+            ranges = deque()
+            partitions = partitions or [q]
+            for query, last in zip(partitions, executor.map(last_scroll_id, partitions)):
+                if last is not None:
+                    ranges.extend((query, start, min(start + scroll_size, last + 1))
+                                  for start in range(0, last + 1, scroll_size))
+            # Only keep a few ranges in flight, so unconsumed pages do not pile up
+            while ranges or pending:
+                while ranges and len(pending) < max_workers:
+                    pending.add(executor.submit(fetch, *ranges.popleft()))
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    query, start, end, results, matches = future.result()
+                    # If the range is overfull, split it and fetch both halves instead
+                    # Ranges are disjoint, so no record is returned twice
+                    if matches > len(results) and end - start > 1:
+                        middle = (start + end) // 2
+                        ranges.appendleft((query, middle, end))
+                        ranges.appendleft((query, start, middle))
+                        continue
+                    elif matches > len(results):
+                        warnings.warn("Only {} of {} records with {} {} could be "
+                                      "retrieved.".format(len(results), matches,
+                                                          scroll_field, start), RuntimeWarning)
+                    if results:
+                        yield results
+        finally:
+            # If the consumer stops early, do not start the remaining queries
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+    def _source_partitions(self, source_names):
+        """Create one advanced query per ``source_name``, for partitioning aggregations.
+
+        Arguments:
+            source_names (str or list of str): The ``source_name`` values.
+
+        Returns:
+            list of str: The query matching each source, or ``None`` if there is only one source.
+        """
+        if isinstance(source_names, str) or len(source_names) < 2:
+            return None
+        # Each source is combined with any other terms in the current query
+        base = self.current_query()
+        partitions = []
+        for src in source_names:
+            src_query = self._query_helper().match_source_names(src).current_query()
+            partitions.append("({}) AND ({})".format(base, src_query) if base else src_query)
+        return partitions
+
+    def fetch_datasets_from_results(self, entries=None, query=None, reset_query=True,
+                                    max_workers=DEFAULT_MAX_WORKERS):
         """Retrieve the dataset entries for given records.
         Note that this method may use the current query.
 
@@ -467,10 +1359,12 @@ class Forge(mdf_toolbox.AggregateHelper, mdf_toolbox.SearchHelper):
             This method will use terms from the current query, and resets the current query.
 
         Arguments:
-            entries (dict, list of dict, or tuple of dict): The records to parse
+            entries (dict, iterable of dict, or tuple of dict): The records to parse
                     to find the datasets. This argument can be a single entry,
                     a list of entries, or a tuple with a list of entries.
                     The latter two options support both return values of the ``search()`` method.
+                    Any other iterable of entries, such as the generator from
+                    ``iter_aggregate()``, is also accepted, and is only read once.
                     If entries is ``None``, the current query is executed and those
                     results are used instead. **Default:** ``None``.
             query (str): If not ``None``, search for entries using this query
@@ -480,6 +1374,9 @@ class Forge(mdf_toolbox.AggregateHelper, mdf_toolbox.SearchHelper):
                     If ``True``, will reset the current query after searching for entries.
                     If ``False``, will not reset the current query.
                     **Default:** ``True``.
+            max_workers (int): The maximum number of searches to run at once.
+                    Datasets are searched for in batches, to keep each query short.
+                    **Default:** ``DEFAULT_MAX_WORKERS``.
 
         Returns:
             list: The dataset entries.
@@ -491,17 +1388,31 @@ class Forge(mdf_toolbox.AggregateHelper, mdf_toolbox.SearchHelper):
             entries = [entries]
         elif isinstance(entries, tuple):
             entries = entries[0]
-        # If no entries, error
-        if len(entries) == 0:
-            raise ValueError("No entries provided or found")
 
         # Extract source_name from every entry, make unique, skip invalid entries
-        ds_ids = set([entry["mdf"]["source_name"] for entry in entries
-                      if entry.get("mdf", {}).get("source_name")])
+        ds_ids = {}
+        found_entries = False
+        for entry in entries:
+            found_entries = True
+            if entry.get("mdf", {}).get("source_name"):
+                ds_ids[entry["mdf"]["source_name"]] = True
+        # If no entries, error
+        if not found_entries:
+            raise ValueError("No entries provided or found")
+        # Any terms in the current query also apply
+        base = self.match_resource_types("dataset").current_query()
+        self.reset_query()
         if not ds_ids:
             return []
 
-        return self.match_source_names(ds_ids).match_resource_types("dataset").search()
+        # Search for the datasets in batches, all at once
+        def fetch(batch_query):
+            return self.search(q=batch_query, advanced=True, limit=SEARCH_LIMIT)
+
+        batches = [batch_query for batch_query, batch in or_batches("mdf.source_name",
+                                                                    ds_ids.keys(), base=base)]
+        with ThreadPoolExecutor(max_workers=max(int(max_workers), 1)) as executor:
+            return [dataset for results in executor.map(fetch, batches) for dataset in results]
 
     def get_dataset_version(self, source_name):
         """Get the version of a certain dataset.
@@ -513,9 +1424,9 @@ class Forge(mdf_toolbox.AggregateHelper, mdf_toolbox.SearchHelper):
             int: Version of the dataset in question.
         """
 
-        hits = self.search("mdf.source_name:{} AND"
-                           " mdf.resource_type:dataset".format(source_name),
-                           advanced=True, limit=2)
+        # Always check Search itself, so a new version is noticed
+        hits = self._query_helper("mdf.source_name:{} AND mdf.resource_type:dataset".format(
+                                      source_name), advanced=True, cache=False).search(limit=2)
 
         # Some error checking
         if len(hits) == 0:
@@ -524,76 +1435,140 @@ class Forge(mdf_toolbox.AggregateHelper, mdf_toolbox.SearchHelper):
             raise ValueError("Unexpectedly matched multiple datasets with source_name '{}'. "
                              "Please contact MDF support.".format(source_name))
         else:
-            return hits[0]['mdf']['version']
+            version = hits[0]['mdf']['version']
+            self.__dataset_versions[source_name] = [version]
+            # Remove cached results from older versions
+            if self.__search_cache is not None:
+                self.__search_cache.check_version(source_name, version)
+            return version
+
+    def get_dataset_versions(self, source_names, info=False, refresh=False):
+        """Get the versions of many datasets at once.
+        The datasets are looked up in as few searches as possible, and the versions
+        are remembered for the lifetime of this Forge client.
+
+        Arguments:
+            source_names (str or list of str): The ``source_name`` values of the datasets.
+            info (bool): If ``False``, will return the versions.
+                    If ``True``, will return a tuple containing the versions and
+                    the ``source_name`` values that were not found or were ambiguous.
+                    **Default:** ``False``.
+            refresh (bool): If ``True``, will look up every version again, instead of using
+                    versions already found by this Forge client. **Default:** ``False``.
+
+        Returns:
+            If ``info`` is ``False``, *dict*: ``source_name: version`` pairs.
+            The version is ``None`` if the dataset was not found,
+            or more than one dataset has the ``source_name``.
+            If ``info`` is ``True``, *tuple*: The versions, and a dictionary containing
+            the ``missing`` and ``ambiguous`` ``source_name`` values.
+        """
+        if isinstance(source_names, str):
+            source_names = [source_names]
+        # Remove duplicates, keeping order
+        source_names = list(dict.fromkeys(source_names))
+
+        to_fetch = [src for src in source_names
+                    if refresh or src not in self.__dataset_versions.keys()]
+        for query, batch in or_batches("mdf.source_name", to_fetch,
+                                       base="mdf.resource_type:dataset"):
+            # Always check Search itself, so a new version is noticed
+            hits = self._query_helper(query, advanced=True, cache=False).search(
+                        limit=SEARCH_LIMIT)
+            found = {src: [] for src in batch}
+            for hit in hits:
+                if hit["mdf"]["source_name"] in found.keys():
+                    found[hit["mdf"]["source_name"]].append(hit["mdf"]["version"])
+            self.__dataset_versions.update(found)
+            # Remove cached results from older versions
+            if self.__search_cache is not None:
+                for src, versions in found.items():
+                    if len(versions) == 1:
+                        self.__search_cache.check_version(src, versions[0])
+
+        versions = {}
+        missing = []
+        ambiguous = []
+        for src in source_names:
+            found_versions = self.__dataset_versions[src]
+            if len(found_versions) == 1:
+                versions[src] = found_versions[0]
+            elif len(found_versions) == 0:
+                versions[src] = None
+                missing.append(src)
+            else:
+                versions[src] = None
+                ambiguous.append(src)
+        if info:
+            return versions, {
+                "missing": missing,
+                "ambiguous": ambiguous
+            }
+        return versions
 
     # ***********************************************
     # * Data retrieval functions
     # ***********************************************
 
-    def http_download(self, results, dest=".", preserve_dir=False, verbose=True):
-        """Download data files from the provided results using HTTPS.
-        For a large number of files, you should use ``globus_download()`` instead,
-        which uses Globus Transfer.
+    def _plan_http_download(self, results, dest=".", preserve_dir=False, resume=False,
+                            skip_existing=False):
+        """Assemble the list of files to fetch with ``http_download()``, assigning each
+        file a unique local path and creating the directories required.
 
         Arguments:
-            results (dict): The records from which files should be fetched.
-                    This should be the return value of a search method.
+            results (dict, list of dict, or tuple): The records from which files
+                    should be fetched.
             dest (str): The destination path for the data files on the local machine.
-                    **Default:** The current directory.
             preserve_dir (bool): If ``True``, the directory structure for the data files will be
                     recreated at the destination.
-                    If ``False``, only the data files themselves will be saved.
-                    **Default:** ``False``.
-            verbose (bool): If ``True``, status and progress messages will be printed.
-                    If ``False``, only error messages will be printed.
-                    **Default:** ``True``.
+            resume (bool): If ``True``, files previously recorded in the manifest
+                    in ``dest`` keep their local path.
+            skip_existing (bool): If ``True``, files already downloaded are not fetched again.
 
         Returns:
-            *dict*: The status information for the download:
-                    * **success** (*bool*): ``True`` if the download succeeded. ``False``
-                        if it failed.
-                    * **message** (*str*): The error message, if the download failed.
+            tuple: The files to fetch (as accepted by ``HTTPDownloader.download()``),
+            the order of all files found (either a status dict for skipped files,
+            or the index into the files to fetch),
+            and the ``DownloadManifest`` for ``dest`` (or ``None`` if not used).
         """
-        if self.__anonymous:
-            print("Error: Anonymous HTTP download not yet supported.")
-            return {
-                "success": False,
-                "message": "Anonymous HTTP download not yet supported."
-                }
         # If user submitted single result, make into list
         if isinstance(results, dict):
             results = [results]
         # If results have info attached, remove it
         elif isinstance(results, tuple):
             results = results[0]
-        if len(results) > HTTP_NUM_LIMIT:
-            print("Error: Too many results supplied. Use globus_download()"
-                  + " for fetching more than "
-                  + str(HTTP_NUM_LIMIT)
-                  + " entries.")
-            return {
-                "success": False,
-                "message": ("Too many results supplied. Use globus_download()"
-                            + " for fetching more than "
-                            + str(HTTP_NUM_LIMIT)
-                            + " entries.")
-                }
-        for res in tqdm(results, desc="Fetching files", disable=(not verbose)):
+        # Assemble the list of files to fetch
+        manifest = DownloadManifest(dest) if (resume or skip_existing) else None
+        files = []
+        # Each file is either a status (if skipped) or the index of the file in files
+        order = []
+        filenames = set()
+        # With a manifest, a url appearing more than once is only fetched once
+        planned_urls = {}
+        for res in results:
             if res["mdf"]["resource_type"] == "dataset":
                 print("Skipping datset entry for '{}': Cannot download dataset over HTTPS. "
                       "Use globus_download() for datasets.".format(res["mdf"]["source_id"]))
             elif res["mdf"]["resource_type"] == "record":
                 for dl in res.get("files", []):
                     url = dl.get("url", None)
-                    if url:
-                        parsed_url = urlparse(url)
-                        remote_path = parsed_url.path
-                        # local_path should be either dest + whole path or dest + filename
-                        if preserve_dir:
-                            local_path = os.path.normpath(dest + "/" + remote_path)
+                    if url and url in planned_urls:
+                        order.append(planned_urls[url])
+                    elif url:
+                        length = dl.get("length")
+                        sha512 = dl.get("sha512")
+                        # Files downloaded before keep their original local_path
+                        entry = manifest.get(url) if manifest is not None else None
+                        if entry:
+                            local_path = entry["local_path"]
                         else:
-                            local_path = os.path.normpath(dest + "/"
-                                                          + os.path.basename(remote_path))
+                            remote_path = urlparse(url).path
+                            # local_path should be either dest + whole path or dest + filename
+                            if preserve_dir:
+                                local_path = os.path.normpath(dest + "/" + remote_path)
+                            else:
+                                local_path = os.path.normpath(dest + "/"
+                                                              + os.path.basename(remote_path))
                         # Make dirs for storing the file if they don't exist
                         # preserve_dir doesn't matter; local_path has accounted for it already
                         try:
@@ -603,9 +1578,33 @@ class Forge(mdf_toolbox.AggregateHelper, mdf_toolbox.SearchHelper):
                         # Since it means all dirs required exist, it can be swallowed.
                         except (IOError, OSError):
                             pass
+                        # Skip files that are already complete
+                        if skip_existing and (
+                                (entry and entry["complete"] and os.path.isfile(local_path)
+                                 and (entry["length"] is None
+                                      or os.path.getsize(local_path) == entry["length"]))
+                                or file_matches(local_path, length=length, sha512=sha512)):
+                            manifest.update(url, local_path=local_path, length=length,
+                                            sha512=sha512, complete=True, save=False)
+                            planned_urls[url] = {
+                                "url": url,
+                                "local_path": local_path,
+                                "success": True,
+                                "skipped": True,
+                                "status_code": None,
+                                "bytes": 0,
+                                "resumed_from": 0,
+                                "error": None
+                            }
+                            order.append(planned_urls[url])
+                            continue
                         # Check if file already exists, change filename if necessary
+                        # Files are fetched concurrently, so filenames already assigned
+                        # to another file in this batch are also collisions
+                        # A file previously downloaded from this url is not a collision
                         collisions = 0
-                        while os.path.exists(local_path):
+                        while not entry and (os.path.exists(local_path)
+                                             or local_path in filenames):
                             # Save and remove extension
                             local_path, ext = os.path.splitext(local_path)
                             # Check if already added number to end
@@ -617,40 +1616,106 @@ class Forge(mdf_toolbox.AggregateHelper, mdf_toolbox.SearchHelper):
                                 local_path = local_path[:-len(old_add)]
                             # Add new number
                             local_path = local_path + new_add + ext
-
-                        headers = {}
-                        # Check for Petrel vs. NCSA url for authorizer
-                        # Petrel
-                        if parsed_url.netloc == "e38ee745-6d04-11e5-ba46-22000b92c6ec.e.globus.org":
-                            authorizer = self.__petrel_authorizer
-                        elif parsed_url.netloc == "data.materialsdatafacility.org":
-                            authorizer = self.__data_mdf_authorizer
-                        else:
-                            authorizer = globus_sdk.NullAuthorizer()
-                        headers["Authorization"] = authorizer.get_authorization_header()
-                        response = requests.get(url, headers=headers)
-                        # Handle first 401 by regenerating auth headers
-                        if response.status_code == 401:
-                            authorizer.handle_missing_authorization()
-                            headers["Authorization"] = authorizer.get_authorization_header()
-                            response = requests.get(url, headers=headers)
-                        # Handle other errors by passing the buck to the user
-                        if response.status_code != 200:
-                            print("Error {} when attempting to access "
-                                  "'{}'".format(response.status_code, url))
-                        else:
-                            # Write out the binary response content
-                            with open(local_path, 'wb') as output:
-                                output.write(response.content)
+                        filenames.add(local_path)
+                        if manifest is not None:
+                            planned_urls[url] = len(files)
+                        order.append(len(files))
+                        files.append({
+                            "url": url,
+                            "local_path": local_path,
+                            "length": length,
+                            "sha512": sha512,
+                            # Only partial files known to be from this url can be finished,
+                            # but a new partial file is kept if the download fails
+                            "resume": bool(entry)
+                        })
             else:
                 print("Error: Found unknown resource_type '{}'. "
                       "Skipping entry.".format(res["mdf"]["resource_type"]))
+        if manifest is not None:
+            manifest.save()
+        return files, order, manifest
+
+    def http_download(self, results, dest=".", preserve_dir=False, verbose=True,
+                      max_workers=DEFAULT_MAX_WORKERS, chunk_size=DEFAULT_CHUNK_SIZE,
+                      resume=False, skip_existing=False):
+        """Download data files from the provided results using HTTPS.
+        Any number of results may be given; requests to each data server are limited
+        by the ``http_rate_limit`` and ``http_host_concurrency`` set on this Forge client.
+        For very large files or full datasets, you should use ``globus_download()`` instead,
+        which uses Globus Transfer.
+
+        Arguments:
+            results (dict): The records from which files should be fetched.
+                    This should be the return value of a search method.
+            dest (str): The destination path for the data files on the local machine.
+                    **Default:** The current directory.
+            preserve_dir (bool): If ``True``, the directory structure for the data files will be
+                    recreated at the destination.
+                    If ``False``, only the data files themselves will be saved.
+                    **Default:** ``False``.
+            verbose (bool): If ``True``, status and progress messages will be printed.
+                    If ``False``, only error messages will be printed.
+                    **Default:** ``True``.
+            max_workers (int): The maximum number of files to download at the same time.
+                    Connections to each server are pooled and reused between files.
+                    **Default:** ``DEFAULT_MAX_WORKERS``.
+            chunk_size (int): The number of bytes to hold in memory for each file
+                    being downloaded. Files are streamed to disk in pieces of this size,
+                    and are only moved to their final location once complete.
+                    **Default:** ``DEFAULT_CHUNK_SIZE``.
+            resume (bool): If ``True``, files left partially downloaded by an earlier call
+                    with the same ``dest`` will be finished using HTTP ``Range`` requests,
+                    and files are saved to the same path as before instead of
+                    to a new numbered copy.
+                    **Default:** ``False``.
+            skip_existing (bool): If ``True``, files that were already downloaded to ``dest``
+                    will not be fetched again. A file is considered downloaded if a previous
+                    call recorded it as complete, or if a file with the same name matches
+                    the size and checksum in the record's ``files`` metadata.
+                    **Default:** ``False``.
+
+                    Note:
+                        When ``resume`` or ``skip_existing`` is ``True``, a small manifest
+                        file (``.mdf_download_manifest.json``) is kept in ``dest``
+                        to record the files downloaded there.
+
+        Returns:
+            *dict*: The status information for the download:
+                    * **success** (*bool*): ``True`` if every file was downloaded. ``False``
+                        if any file failed.
+                    * **message** (*str*): The error message, if the download failed.
+                    * **files** (*list of dict*): The status of each file, with the keys
+                        ``url``, ``local_path``, ``success``, ``skipped``, ``status_code``,
+                        ``bytes``, ``resumed_from``, and ``error``.
+        """
+        if self.__anonymous:
+            print("Error: Anonymous HTTP download not yet supported.")
+            return {
+                "success": False,
+                "message": "Anonymous HTTP download not yet supported."
+                }
+        files, order, manifest = self._plan_http_download(results, dest=dest,
+                                                          preserve_dir=preserve_dir,
+                                                          resume=resume,
+                                                          skip_existing=skip_existing)
+        fetched = self.__http.download(files, max_workers=max_workers, chunk_size=chunk_size,
+                                       resume=resume, manifest=manifest, verbose=verbose)
+        statuses = [fetched[item] if isinstance(item, int) else item for item in order]
+        failed = len([status for status in statuses if not status["success"]])
+        if failed:
+            return {
+                "success": False,
+                "message": "{} of {} files failed to download.".format(failed, len(statuses)),
+                "files": statuses
+                }
         return {
-            "success": True
+            "success": True,
+            "files": statuses
             }
 
     def globus_download(self, results, dest=".", dest_ep=None, preserve_dir=False,
-                        download_datasets=False, verbose=True, **kwargs):
+                        download_datasets=False, verbose=True, wait=True, **kwargs):
         """Download data files from the provided results using Globus Transfer.
         This method requires Globus Connect to be installed on the destination endpoint.
 
@@ -680,16 +1745,34 @@ class Forge(mdf_toolbox.AggregateHelper, mdf_toolbox.SearchHelper):
                     If ``False``, only error messages will be printed,
                     and the Transfer will always continue.
                     **Default:** ``False``.
+            wait (bool): If ``True``, will wait for all of the Transfers to finish.
+                    If ``False``, will submit the Transfers and return immediately with a
+                    ``TransferBatch`` that can be used to check on, wait for, or cancel them.
+                    **Default:** ``True``.
 
         Keyword Arguments:
             inactivity_time (int): Number of seconds the Transfer is allowed to go without progress
                     before being cancelled.
                     **Default:** ``self.__inactivity_time``.
-            interval (int): Time in seconds to wait between checking transfer status.
-                            **Default:** ``self.__transfer_interval``
+            interval (int): Maximum time in seconds to wait between checking transfer status.
+                    Status is checked frequently at first, then less often
+                    until this interval is reached.
+                    **Default:** ``self.__transfer_interval``
+            poll_schedule (iterable of float): Time in seconds to wait before each successive
+                    status check, to replace the default schedule.
+                    Once exhausted, ``interval`` is used.
+                    **Default:** Starts sub-second and doubles up to ``interval``.
+            interactive (bool): If ``True``, errors will prompt for continuation confirmation.
+                    If ``False``, the Transfers will never wait for user input.
+                    **Default:** The value of ``verbose``.
+
+        Note:
+            All Transfers (one per source endpoint) are submitted before any are waited on,
+            so they run concurrently. Progress is shown for all Transfers together.
 
         Returns:
-            list of str: The task IDs of the Globus transfers.
+            list of str: The task IDs of the Globus transfers, if ``wait`` is ``True``.
+            TransferBatch: A handle on the running Globus transfers, if ``wait`` is ``False``.
         """
         if self.__anonymous:
             print("Error: Anonymous Globus Transfer not supported.")
@@ -699,6 +1782,8 @@ class Forge(mdf_toolbox.AggregateHelper, mdf_toolbox.SearchHelper):
                 }
         inactivity_time = kwargs.get("inactivity_time", self.__inactivity_time)
         interval = kwargs.get('interval', self.__transfer_interval)
+        interactive = kwargs.get("interactive", verbose)
+        schedule = kwargs.get("poll_schedule", None)
 
         dest = os.path.abspath(dest)
         # If results have info attached, remove it
@@ -785,63 +1870,69 @@ class Forge(mdf_toolbox.AggregateHelper, mdf_toolbox.SearchHelper):
                     tasks[ep_id].append((ep_path, local_path))
                     filenames.add(local_path)
 
-        # Submit the jobs
-        success = 0
-        failed = 0
-        for task_ep, task_paths in tqdm(tasks.items(), desc="Transferring data",
+        # Submit all of the Transfers first, so they run at the same time
+        task_ids = {}
+        errors = {}
+        for task_ep, task_paths in tqdm(tasks.items(), desc="Submitting transfers",
                                         disable=(not verbose)):
-            transfer = mdf_toolbox.custom_transfer(self.__transfer_client, task_ep, dest_ep,
-                                                   task_paths, interval=interval,
-                                                   inactivity_time=inactivity_time)
-            cont = True
-            # Prime loop
-            event = next(transfer)
             try:
-                # Loop ends on StopIteration from generator exhaustion
-                while True:
-                    if not event["success"] and cont:
-                        print("Error: {} - {}".format(event["code"], event["description"]))
-                        if verbose:
-                            # Allow user to abort transfer if verbose, else cont is always True
-                            user_cont = input("Continue Transfer (y/n)?\n")
-                            cont = (user_cont.strip().lower() == "y"
-                                    or user_cont.strip().lower() == "yes")
-                    event = transfer.send(cont)
-            except StopIteration:
-                pass
-            if not event["success"]:
-                print("Error transferring with endpoint '{}': {} - "
-                      "{}".format(task_ep, event["status"],
-                                  event["nice_status_short_description"]))
-                failed += 1
-                # Allow cancellation of remaining Transfers if Transfer are remaining
-                if verbose and list(tasks.keys())[-1] != task_ep:
-                    user_cont = input("Continue Transfer (y/n)?\n")
-                    if not (user_cont.strip().lower() == "y"
-                            or user_cont.strip().lower() == "yes"):
-                        break
-            else:
-                success += 1
-
+                task_ids[task_ep] = submit_transfer(self.__transfer_client, task_ep, dest_ep,
+                                                    task_paths, inactivity_time=inactivity_time)
+            except globus_sdk.GlobusError as e:
+                print("Error submitting transfer with endpoint '{}': {}".format(task_ep, repr(e)))
+                errors[task_ep] = repr(e)
+        batch = TransferBatch(self.__transfer_client, task_ids, errors=errors,
+                              inactivity_time=inactivity_time)
+        if not wait:
+            return batch
+
+        # Then wait for all of them together
+        batch.wait(interval=interval, verbose=verbose, interactive=interactive,
+                   schedule=schedule)
         if verbose:
+            summary = batch.summary()
             print("All transfers processed\n{} transfers succeeded\n"
-                  "{} transfers failed".format(success, failed))
-        return
+                  "{} transfers failed".format(summary["succeeded"], summary["failed"]))
+        return list(task_ids.values())
 
-    def http_stream(self, results, verbose=True):
+    def http_stream(self, results, verbose=True, binary=False):
         """Yield data files from the provided results using HTTPS, through a generator.
-        For a large number of files, you should use ``globus_download()`` instead,
+        For very large files or full datasets, you should use ``globus_download()`` instead,
         which uses Globus Transfer.
 
+        **Example usage**::
+
+            for record, file_info, stream in forge.http_stream(results, binary=True):
+                if stream is not None:
+                    with tarfile.open(fileobj=stream, mode="r|*") as tar:
+                        ...
+
         Arguments:
             results (dict): The records from which files should be fetched.
                     This should be the return value of a search method.
             verbose (bool): If ``True``, status and progress messages will be printed.
                     If ``False``, only error messages will be printed.
                     **Default:** ``True``.
+            binary (bool): If ``True``, each file is yielded as a byte stream along with the
+                    record and ``files`` entry it came from. The stream is read directly
+                    from the network as it is consumed, so files of any size or type can be
+                    processed without decoding or holding them in memory.
+                    The stream is only valid until the next file is requested.
+                    If ``False``, the text of each file is yielded.
+                    **Default:** ``False``.
+
+                    Note:
+                        Each open stream holds a connection and one of the host's download
+                        slots (see ``http_host_concurrency``). If you stop before the last
+                        file, call ``close()`` on the generator (or use it in a
+                        ``contextlib.closing()`` block) to release them right away.
 
         Yields:
-            str: Text of each data file.
+            If ``binary`` is ``False``, *str*: Text of each data file,
+            or ``None`` if the file could not be fetched.
+            If ``binary`` is ``True``, *tuple*: The record, the entry from the record's
+            ``files`` list, and a readable, non-seekable binary file-like object
+            (or ``None`` if the file could not be fetched).
         """
         if self.__anonymous:
             print("Error: Anonymous HTTP download not yet supported.")
@@ -855,53 +1946,374 @@ class Forge(mdf_toolbox.AggregateHelper, mdf_toolbox.SearchHelper):
             results = results[0]
         if type(results) is not list:
             results = [results]
-        if len(results) > HTTP_NUM_LIMIT:
-            print("Too many results supplied. Use globus_download()"
-                  + " for fetching more than "
-                  + str(HTTP_NUM_LIMIT)
-                  + " entries.")
-            yield {
-                "success": False,
-                "message": ("Too many results supplied. Use globus_download()"
-                            + " for fetching more than "
-                            + str(HTTP_NUM_LIMIT)
-                            + " entries.")
-                }
-            return
         for res in results:
             for dl in res.get("files", []):
                 url = dl.get("url", None)
                 if url:
-                    parsed_url = urlparse(url)
-                    # Check for Petrel vs. NCSA url for authorizer
-                    # Petrel
-                    if parsed_url.netloc == "e38ee745-6d04-11e5-ba46-22000b92c6ec.e.globus.org":
-                        authorizer = self.__petrel_authorizer
-                    elif parsed_url.netloc == "data.materialsdatafacility.org":
-                        authorizer = self.__data_mdf_authorizer
+                    # Errors are printed, and yield None
+                    if binary:
+                        # The connection and download slot are released when the next file
+                        # is requested, or when the generator is closed
+                        with self.__http.open(url) as stream:
+                            yield res, dl, stream
                     else:
-                        authorizer = globus_sdk.NullAuthorizer()
-                    
-                    headers = {}
-                    headers["Authorization"] = authorizer.get_authorization_header()
-                    response = requests.get(url, headers=headers)
-                    # Handle first 401 by regenerating auth headers
-                    if response.status_code == 401:
-                        authorizer.handle_missing_authorization()
-                        headers["Authorization"] = authorizer.get_authorization_header()
-                        response = requests.get(url, headers=headers)
-                    # Handle other errors by passing the buck to the user
-                    if response.status_code != 200:
-                        print("Error ", response.status_code, " when attempting to access '",
-                              url, "'", sep="")
-                        yield None
-                    else:
-                        yield response.text
+                        yield self.__http.read(url)
+
+    def ahttp_download(self, results, dest=".", preserve_dir=False,
+                       max_workers=DEFAULT_MAX_WORKERS, chunk_size=DEFAULT_CHUNK_SIZE,
+                       resume=False, skip_existing=False, ordered=False):
+        """Download data files from the provided results using HTTPS, from asyncio.
+        This is the asynchronous counterpart to ``http_download()``: files are downloaded
+        concurrently without blocking the event loop, using the same connection pools,
+        host limits, and authentication as the other HTTPS methods of this Forge client.
+
+        **Example usage**::
+
+            async for status in forge.ahttp_download(results, dest="data"):
+                if status["success"]:
+                    process(status["local_path"])
+
+        Arguments:
+            results (dict): The records from which files should be fetched.
+                    This should be the return value of a search method.
+            dest (str): The destination path for the data files on the local machine.
+                    **Default:** The current directory.
+            preserve_dir (bool): If ``True``, the directory structure for the data files will be
+                    recreated at the destination.
+                    If ``False``, only the data files themselves will be saved.
+                    **Default:** ``False``.
+            max_workers (int): The maximum number of files to download at the same time.
+                    **Default:** ``DEFAULT_MAX_WORKERS``.
+            chunk_size (int): The number of bytes to hold in memory for each file
+                    being downloaded. **Default:** ``DEFAULT_CHUNK_SIZE``.
+            resume (bool): If ``True``, partially downloaded files will be finished.
+                    See ``http_download()``. **Default:** ``False``.
+            skip_existing (bool): If ``True``, files already downloaded will not be fetched again.
+                    See ``http_download()``. **Default:** ``False``.
+            ordered (bool): If ``True``, statuses are returned in the order the files appear in
+                    ``results``. If ``False``, statuses are returned as soon as
+                    each file finishes. **Default:** ``False``.
+
+        Returns:
+            AsyncResults: For use with ``async for``, the status of each file, with the keys
+            ``url``, ``local_path``, ``success``, ``skipped``, ``status_code``, ``bytes``,
+            ``resumed_from``, and ``error``.
+            Call ``aclose()`` to stop any remaining downloads if you stop early.
+        """
+        if self.__anonymous:
+            print("Error: Anonymous HTTP download not yet supported.")
+            return self.__async_error()
+        files, order, manifest = self._plan_http_download(results, dest=dest,
+                                                          preserve_dir=preserve_dir,
+                                                          resume=resume,
+                                                          skip_existing=skip_existing)
+        fetched = self.__http.adownload(files, max_workers=max_workers, chunk_size=chunk_size,
+                                        resume=resume, manifest=manifest, ordered=ordered)
+        if not ordered:
+            # Skipped files are already finished
+            order = ([item for item in order if not isinstance(item, int)]
+                     + [item for item in order if isinstance(item, int)])
+        order = deque(order)
+
+        async def step():
+            if not order:
+                raise StopAsyncIteration
+            item = order.popleft()
+            if isinstance(item, int):
+                # Downloads arrive in the order of files, which is also their order in order
+                i, status = await fetched.__anext__()
+                return status
+            return item
+
+        # Stop any remaining downloads if the caller stops early
+        return AsyncResults(step, fetched.close)
+
+    def ahttp_stream(self, results, max_workers=DEFAULT_MAX_WORKERS, ordered=False,
+                     binary=False):
+        """Fetch data files from the provided results using HTTPS, from asyncio.
+        This is the asynchronous counterpart to ``http_stream()``: files are fetched
+        concurrently without blocking the event loop, using the same connection pools,
+        host limits, and authentication as the other HTTPS methods of this Forge client.
+
+        **Example usage**::
+
+            async for record, file_info, text in forge.ahttp_stream(results):
+                parse(text)
+
+        Arguments:
+            results (dict): The records from which files should be fetched.
+                    This should be the return value of a search method.
+            max_workers (int): The maximum number of files to fetch at the same time.
+                    **Default:** ``DEFAULT_MAX_WORKERS``.
+            ordered (bool): If ``True``, files are returned in the order they appear in
+                    ``results``. If ``False``, files are returned as soon as
+                    each one is fetched. **Default:** ``False``.
+            binary (bool): If ``True``, the contents of each file are returned as ``bytes``,
+                    without decoding. If ``False``, the text of each file is returned.
+                    **Default:** ``False``.
+
+        Returns:
+            AsyncResults: For use with ``async for``, tuples of the record, the entry from
+            the record's ``files`` list, and the contents of the data file
+            (or ``None`` if the file could not be fetched).
+            Call ``aclose()`` to stop any remaining fetches if you stop early.
+        """
+        if self.__anonymous:
+            print("Error: Anonymous HTTP download not yet supported.")
+            return self.__async_error()
+        # If results have info attached, remove it
+        if type(results) is tuple:
+            results = results[0]
+        if type(results) is not list:
+            results = [results]
+        files = [(res, dl) for res in results for dl in res.get("files", []) if dl.get("url")]
+        fetched = amap(lambda f: self.__http.read(f[1]["url"], binary=binary),
+                       files, max_workers=max_workers, ordered=ordered)
+
+        async def step():
+            i, content = await fetched.__anext__()
+            return files[i][0], files[i][1], content
+
+        return AsyncResults(step, fetched.close)
+
+    @staticmethod
+    def __async_error():
+        """Return the anonymous HTTP error as the only result of an AsyncResults."""
+        errors = deque([{
+            "success": False,
+            "message": "Anonymous HTTP download not yet supported."
+            }])
+
+        async def step():
+            if not errors:
+                raise StopAsyncIteration
+            return errors.popleft()
+
+        return AsyncResults(step)
+
+    def export_records(self, query_or_results, path, format="parquet", partition_by=None,
+                       columns=None, resource_type="record", max_workers=1):
+        """Export records to Parquet or JSON Lines files.
+        Records are written one page at a time as they are fetched, so the full set of records
+        is never held in memory. Each page is a row group in Parquet files.
+
+        **Example usage**::
+
+            forge.export_records("mdf.source_name:oqmd", "oqmd_out",
+                                 partition_by="mdf.source_name")
+
+        Arguments:
+            query_or_results (str, Query, list of dict, or ResultTable): A query to
+                    aggregate, or the records to export (including a generator, such as from
+                    ``iter_aggregate()``). If ``None``, the current query is aggregated.
+            path (str): The file to write to. If ``partition_by`` is set, the directory to
+                    write to, which will contain one Hive-style directory per partition
+                    (such as ``path/source_name=oqmd/part-0.parquet``).
+            format (str): The format to write, ``"parquet"`` or ``"jsonl"``.
+                    Parquet requires ``pyarrow``. **Default:** ``"parquet"``.
+            partition_by (str): The field to partition the records by, in dot notation,
+                    such as ``"mdf.source_name"``. **Default:** ``None``, to write one file.
+            columns (list of str): For Parquet, the fields to write as columns, in
+                    dot notation. Fields in lists are written as list columns, and objects as
+                    JSON strings. **Default:** Every field in the MDF schema.
+            resource_type (str): For Parquet, the ``resource_type`` of the MDF schema used to
+                    set the type of each column. If ``None``, or the schema is unavailable,
+                    types (and default columns) are inferred from the first page of records.
+                    **Default:** ``"record"``.
+            max_workers (int): The maximum number of queries to run at once
+                    when aggregating a query. **Default:** ``1``.
+
+        Returns:
+            dict: The number of ``records`` written, and the list of ``files`` written.
+        """
+        if format not in EXPORT_FORMATS.keys():
+            raise ValueError("Invalid format '{}'. Valid formats: {}"
+                             .format(format, list(EXPORT_FORMATS.keys())))
+        if query_or_results is None or isinstance(query_or_results, (str, Query)):
+            pages = self.iter_aggregate(q=query_or_results, pages=True, max_workers=max_workers)
+        else:
+            # Split given records into pages, without reading them all at once
+            records = iter(query_or_results)
+            pages = iter(lambda: list(islice(records, SEARCH_LIMIT)), [])
+        field_index = (self._field_index(resource_type)
+                       if format == "parquet" and resource_type else None)
+
+        with RecordExporter(path, format=format, partition_by=partition_by, columns=columns,
+                            field_index=field_index) as exporter:
+            for page in pages:
+                exporter.write(page)
+        return {
+            "records": exporter.count,
+            "files": exporter.files
+        }
+
+    def build_local_index(self, source_names=None, path=":memory:", max_workers=1):
+        """Aggregate records into a ``LocalIndex``, so they can be queried without Search.
+        Records are added one page at a time as they are fetched.
+
+        **Example usage**::
+
+            index = forge.build_local_index(["oqmd"], path="oqmd.sqlite")
+            index.match_elements(["Fe", "O"]).match_years(start=2015, stop=2018).search()
+
+        Arguments:
+            source_names (str or list of str): The ``source_name`` values to aggregate.
+                    **Default:** ``None``, to aggregate the current query.
+            path (str): The SQLite file to keep the index in. An existing index is added to.
+                    **Default:** ``":memory:"``, to keep the index in memory.
+            max_workers (int): The maximum number of queries to run at once.
+                    **Default:** ``1``.
+
+        Returns:
+            LocalIndex: The index.
+        """
+        if source_names:
+            pages = self.iter_aggregate_sources(source_names, pages=True, max_workers=max_workers)
+        else:
+            pages = self.iter_aggregate(pages=True, max_workers=max_workers)
+        local_index = LocalIndex(path)
+        for page in pages:
+            local_index.add(page)
+        return local_index
 
     # ***********************************************
     # * Misc Forge-specific utility functions
     # ***********************************************
 
+    def export_metadata(self, path, resource_types=("dataset", "record"), organizations=True):
+        """Save the MDF schemas and organizations to a file, for use without network access
+        through ``import_metadata()``.
+        Any other schemas or organizations already fetched by this client are also saved.
+
+        Arguments:
+            path (str): The path to save the snapshot to.
+            resource_types (list of str): The ``resource_type`` values to save schemas for.
+                    **Default:** ``("dataset", "record")``.
+            organizations (bool): If ``True``, will save every organization.
+                    **Default:** ``True``.
+
+        Returns:
+            list of str: The URLs saved.
+        """
+        for resource_type in resource_types:
+            self.__metadata.get(self._schemas_url+resource_type)
+        if organizations:
+            org_list = self.__metadata.get(self._organizations_url+"list")["json"] or {}
+            for org in org_list.get("organization_list", []):
+                self.__metadata.get(self._organizations_url+org)
+        return self.__metadata.export_snapshot(path)
+
+    def import_metadata(self, path):
+        """Load MDF schemas and organizations saved with ``export_metadata()``.
+        ``describe_field()`` and ``describe_organization()`` will use them without
+        network access.
+
+        Arguments:
+            path (str): The path to the snapshot.
+
+        Returns:
+            list of str: The URLs loaded.
+        """
+        return self.__metadata.import_snapshot(path)
+
+    def _get_schema(self, resource_type):
+        """Fetch the schema for a ``resource_type``.
+
+        Arguments:
+            resource_type (str): The type of MDF entry to fetch the schema for.
+
+        Returns:
+            tuple: The schema (or ``None`` on failure), the error message (or ``None`` on success),
+            and the HTTP status code. The schema is shared with the metadata cache,
+            and must be copied before it is given to the user.
+        """
+        res = self.__metadata.get(self._schemas_url+resource_type, copy_json=False)
+        # Check for success
+        error = None
+        schema = None
+        json_res = res["json"]
+        if json_res is None:
+            if res["status_code"] < 300:
+                error = "Error decoding {} response: {}".format(res["status_code"], res["content"])
+            else:
+                error = ("Error {}. MDF may be experiencing technical difficulties."
+                         .format(res["status_code"]))
+        else:
+            if res["status_code"] >= 300:
+                error = "Error {}: {}".format(res["status_code"], json_res["error"])
+            else:
+                # Support (Forge-undocumented) "all" and "list" keywords
+                schema = json_res.get("schema",
+                                      json_res.get("all_schemas",
+                                                   json_res.get("schema_list", {})))
+        return schema, error, res["status_code"]
+
+    def _field_index(self, resource_type):
+        """Get the index of every field in the schema for a ``resource_type``.
+        The index is built once per ``resource_type``.
+
+        Arguments:
+            resource_type (str): The type of MDF entry.
+
+        Returns:
+            FieldIndex: The index, or ``None`` if the schema could not be fetched
+            or is not a single schema.
+        """
+        if resource_type not in self.__field_indexes.keys():
+            schema, error, status_code = self._get_schema(resource_type)
+            if error is not None:
+                return None
+            self.__field_indexes[resource_type] = (FieldIndex(schema)
+                                                   if isinstance(schema, dict)
+                                                   and "properties" in schema.keys() else None)
+        return self.__field_indexes[resource_type]
+
+    def list_fields(self, resource_type="record", pattern=None):
+        """List the fields in MDF entries, in dot notation.
+
+        **Example usage**::
+
+            forge.list_fields("record", "material.")
+            forge.list_fields("dataset", "*.identifier")
+
+        Arguments:
+            resource_type (str): The type of MDF entry to list fields from.
+                    This value can be ``"dataset"`` or ``"record``. **Default:** ``"record"``.
+            pattern (str): Only list fields starting with this prefix, or, if the pattern
+                    contains wildcards (``*``, ``?``, ``[]``), matching this pattern.
+                    **Default:** ``None``, to list every field.
+
+        Returns:
+            list of str: The matching fields.
+        """
+        field_index = self._field_index(resource_type)
+        if field_index is None:
+            raise ValueError("Unable to fetch schema for resource_type '{}'"
+                             .format(resource_type))
+        return field_index.fields(pattern)
+
+    def validate_fields(self, fields, resource_types=("record", "dataset")):
+        """Check that fields exist in MDF entries, without searching.
+        Useful for checking fields before using them with ``match_field()``
+        and the other query helpers.
+
+        Arguments:
+            fields (str or list of str): The fields to check, in dot notation.
+            resource_types (list of str): The types of MDF entry the fields may be in.
+                    **Default:** ``("record", "dataset")``.
+
+        Returns:
+            list of str: The fields that do not exist in any of the ``resource_types``.
+        """
+        if isinstance(fields, str):
+            fields = [fields]
+        indexes = [self._field_index(resource_type) for resource_type in resource_types]
+        if any(field_index is None for field_index in indexes):
+            raise ValueError("Unable to fetch schemas for resource_types {}"
+                             .format(list(resource_types)))
+        return [field for field in fields
+                if not any(field in field_index for field_index in indexes)]
+
     def describe_field(self, resource_type, field=None, raw=False):
         """Fetch and display the description of a field in MDF, along with
         any subfields.
@@ -920,48 +2332,42 @@ class Forge(mdf_toolbox.AggregateHelper, mdf_toolbox.SearchHelper):
         """
         if field == "None" or field == "all":
             field = None
-        res = requests.get(self._schemas_url+resource_type)
-        # Check for success
-        error = None
-        schema = None
-        try:
-            json_res = res.json()
-        except Exception:
-            if res.status_code < 300:
-                error = "Error decoding {} response: {}".format(res.status_code, res.content)
-            else:
-                error = ("Error {}. MDF may be experiencing technical difficulties."
-                         .format(res.status_code))
+        # Indexed fields are looked up directly, without walking the schema
+        field_index = self._field_index(resource_type) if field else None
+        if field_index is not None:
+            error = None
+            schema = field_index.get(field)
+            status_code = self.__metadata.get(self._schemas_url+resource_type,
+                                              copy_json=False)["status_code"]
+            if schema is None:
+                error = ("Error: Field '{}' (from '{}') not found in schema for "
+                         "resource_type '{}'".format(field_index.missing_part(field), field,
+                                                     resource_type))
         else:
-            if res.status_code >= 300:
-                error = "Error {}: {}".format(res.status_code, json_res["error"])
-            else:
-                # Support (Forge-undocumented) "all" and "list" keywords
-                schema = json_res.get("schema",
-                                      json_res.get("all_schemas",
-                                                   json_res.get("schema_list", {})))
-
-        # If user requested a specific field, extract only that
-        if field and error is None:
-            try:
-                subfields = field.split(".")
-                while len(subfields) > 0:
-                    subfield = subfields.pop(0)
-
-                    # If subfield is not in schema, try pulling out "properties" or "items" first
-                    # "items" must be first to pull "properties" from "items"
-                    if subfield not in schema.keys():
-                        schema = schema.get("items", schema)
-                        schema = schema.get("properties", schema)
-
-                    # Pull out subfield, triggering KeyError if not present
-                    schema = schema[subfield]
-
-            # KeyError here means field not in schema
-            except KeyError as e:
-                error = ("Error: Field {} (from '{}') not found in schema for "
-                         "resource_type '{}'".format(str(e), field, resource_type))
-                schema = None
+            schema, error, status_code = self._get_schema(resource_type)
+            # Support (Forge-undocumented) "all" and "list" keywords, which are not indexed
+            if field and error is None:
+                try:
+                    subfields = field.split(".")
+                    while len(subfields) > 0:
+                        subfield = subfields.pop(0)
+
+                        # If subfield is not in schema, try pulling out "properties" or "items"
+                        # first. "items" must be first to pull "properties" from "items"
+                        if subfield not in schema.keys():
+                            schema = schema.get("items", schema)
+                            schema = schema.get("properties", schema)
+
+                        # Pull out subfield, triggering KeyError if not present
+                        schema = schema[subfield]
+
+                # KeyError here means field not in schema
+                except KeyError as e:
+                    error = ("Error: Field {} (from '{}') not found in schema for "
+                             "resource_type '{}'".format(str(e), field, resource_type))
+                    schema = None
+        # The schema is shared with the metadata cache, so only the part returned is copied
+        schema = copy.deepcopy(schema)
 
         # Return if raw=True
         if raw:
@@ -969,7 +2375,7 @@ class Forge(mdf_toolbox.AggregateHelper, mdf_toolbox.SearchHelper):
                 "success": error is None,
                 "error": error,
                 "schema": schema,
-                "status_code": res.status_code
+                "status_code": status_code
             }
         # Otherwise, print the result
         else:
@@ -997,21 +2403,20 @@ class Forge(mdf_toolbox.AggregateHelper, mdf_toolbox.SearchHelper):
                     For human consumption, ``False`` is recommended.
                     **Default:** ``False``
         """
-        res = requests.get(self._organizations_url+organization)
+        res = self.__metadata.get(self._organizations_url+organization)
         # Check for success
         error = None
         org_res = None
-        try:
-            json_res = res.json()
-        except Exception:
-            if res.status_code < 300:
-                error = "Error decoding {} response: {}".format(res.status_code, res.content)
+        json_res = res["json"]
+        if json_res is None:
+            if res["status_code"] < 300:
+                error = "Error decoding {} response: {}".format(res["status_code"], res["content"])
             else:
                 error = ("Error {}. MDF may be experiencing technical difficulties."
-                         .format(res.status_code))
+                         .format(res["status_code"]))
         else:
-            if res.status_code >= 300:
-                error = "Error {}: {}".format(res.status_code, json_res["error"])
+            if res["status_code"] >= 300:
+                error = "Error {}: {}".format(res["status_code"], json_res["error"])
             else:
                 # Support "all" and "list" keywords
                 org_res = json_res.get("organization",
@@ -1024,7 +2429,7 @@ class Forge(mdf_toolbox.AggregateHelper, mdf_toolbox.SearchHelper):
                 "success": error is None,
                 "error": error,
                 "organization": org_res,
-                "status_code": res.status_code
+                "status_code": res["status_code"]
             }
         # Otherwise, print the result
         else:
@@ -0,0 +1,296 @@
+import json
+import sqlite3
+import threading
+
+from .query import Query
+from .table import get_field
+
+
+# Fields indexed by a LocalIndex
+INDEXED_FIELDS = ("material.elements", "dc.publicationYear", "mdf.source_name",
+                  "mdf.resource_type", "mdf.organizations", "dc.identifier.identifier")
+
+
+def _index_value(field, value):
+    """Normalize a value for storing or matching in the index."""
+    if field == "dc.publicationYear":
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            pass
+    return value
+
+
+def record_key(record):
+    """Get a key identifying a record, such as to find the same record in different results.
+
+    Arguments:
+        record (dict): The record.
+
+    Returns:
+        str: The key.
+    """
+    mdf = record.get("mdf", {}) if isinstance(record, dict) else {}
+    if mdf.get("mdf_id"):
+        return mdf["mdf_id"]
+    key = [mdf.get("source_id", mdf.get("source_name")), mdf.get("resource_type"),
+           mdf.get("scroll_id")]
+    if key == [None, None, None]:
+        return json.dumps(record, sort_keys=True)
+    return json.dumps(key)
+
+
+class LocalIndex:
+    """An on-disk (or in-memory) index of MDF records, for running queries without Search.
+    Records are indexed on the fields in ``INDEXED_FIELDS``, and can be queried with
+    the same ``match_*`` helpers as ``Forge``.
+
+    **Example usage**::
+
+        index = forge.build_local_index(["oqmd", "nist_xps_db"], path="local.sqlite")
+        index.match_elements(["Fe", "O"]).match_years(start=2015, stop=2018).search()
+    """
+    def __init__(self, path=":memory:"):
+        """Open (or create) a LocalIndex.
+
+        Arguments:
+            path (str): The SQLite file to keep the index in.
+                    **Default:** ``":memory:"``, to keep the index in memory.
+        """
+        self.path = path
+        self.__lock = threading.Lock()
+        self.__db = sqlite3.connect(path, check_same_thread=False)
+        with self.__lock, self.__db:
+            self.__db.execute("CREATE TABLE IF NOT EXISTS records "
+                              "(id INTEGER PRIMARY KEY, key TEXT UNIQUE, data TEXT)")
+            # Values have no type affinity, so numbers compare as numbers
+            self.__db.execute("CREATE TABLE IF NOT EXISTS terms "
+                              "(field TEXT, value, record INTEGER)")
+            self.__db.execute("CREATE INDEX IF NOT EXISTS terms_field_value "
+                              "ON terms (field, value, record)")
+            self.__db.execute("CREATE INDEX IF NOT EXISTS terms_record ON terms (record)")
+        self.reset_query()
+
+    def __len__(self):
+        with self.__lock:
+            return self.__db.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+
+    def close(self):
+        """Close the index."""
+        self.__db.close()
+
+    def add(self, records):
+        """Add records to the index. Records already in the index are replaced.
+
+        Arguments:
+            records (iterable of dict): The records to add, such as the results
+                    of ``Forge.aggregate()``, or pages from ``Forge.iter_aggregate()``.
+
+        Returns:
+            int: The number of records added.
+        """
+        count = 0
+        with self.__lock, self.__db:
+            for record in records:
+                key = record_key(record)
+                row = self.__db.execute("SELECT id FROM records WHERE key = ?",
+                                        (key,)).fetchone()
+                if row is None:
+                    record_id = self.__db.execute("INSERT INTO records (key, data) VALUES (?, ?)",
+                                                  (key, json.dumps(record))).lastrowid
+                else:
+                    # Replaced records keep their place
+                    record_id = row[0]
+                    self.__db.execute("UPDATE records SET data = ? WHERE id = ?",
+                                      (json.dumps(record), record_id))
+                    self.__db.execute("DELETE FROM terms WHERE record = ?", (record_id,))
+                terms = set()
+                for field in INDEXED_FIELDS:
+                    values = get_field(record, field)
+                    if values is None:
+                        continue
+                    for value in (values if isinstance(values, list) else [values]):
+                        if isinstance(value, (str, int, float)):
+                            terms.add((field, _index_value(field, value), record_id))
+                self.__db.executemany("INSERT INTO terms VALUES (?, ?, ?)", terms)
+                count += 1
+        return count
+
+    # ***********************************************
+    # * Query building
+    # ***********************************************
+
+    def reset_query(self):
+        """Destroy the current query and start a fresh one.
+
+        Returns:
+            LocalIndex: Self
+        """
+        self.__clauses = []
+        return self
+
+    @property
+    def initialized(self):
+        """bool: ``True`` if a query has been set."""
+        return bool(self.__clauses)
+
+    def _check_field(self, field):
+        if field not in INDEXED_FIELDS:
+            raise ValueError("Field '{}' is not indexed. Indexed fields: {}"
+                             .format(field, list(INDEXED_FIELDS)))
+
+    def _match_terms(self, field, values, match_all=False):
+        """Add a clause matching any (or all) of the values of a field."""
+        values = [_index_value(field, value) for value in values]
+        if not values:
+            return
+        if match_all:
+            for value in values:
+                self.__clauses.append(("SELECT record FROM terms WHERE field = ? AND value = ?",
+                                       [field, value]))
+        else:
+            self.__clauses.append(("SELECT record FROM terms WHERE field = ? AND value IN ({})"
+                                   .format(", ".join("?" * len(values))), [field] + values))
+
+    def _match_term_range(self, field, start=None, stop=None, inclusive=True):
+        """Add a clause matching a range of values of a field."""
+        query = "SELECT record FROM terms WHERE field = ?"
+        params = [field]
+        if start is not None:
+            query += " AND value >= ?" if inclusive else " AND value > ?"
+            params.append(_index_value(field, start))
+        if stop is not None:
+            query += " AND value <= ?" if inclusive else " AND value < ?"
+            params.append(_index_value(field, stop))
+        self.__clauses.append((query, params))
+
+    def match_query(self, query):
+        """Add a ``Query`` to the query.
+        Only queries built with the field-specific helpers (such as ``match_elements()``),
+        on fields in ``INDEXED_FIELDS``, can be run against the index.
+
+        Arguments:
+            query (Query): The query to add.
+
+        Returns:
+            LocalIndex: Self
+        """
+        if query._clauses is None:
+            raise ValueError("Query '{}' cannot be run against a LocalIndex. Only queries "
+                             "built with the field-specific helpers are supported."
+                             .format(query.q))
+        # Check every clause first, so no part of an invalid query is added
+        for clause in query._clauses:
+            self._check_field(clause[1])
+        for clause in query._clauses:
+            if clause[0] == "terms":
+                self._match_terms(*clause[1:])
+            else:
+                self._match_term_range(*clause[1:])
+        return self
+
+    def match_source_names(self, source_names):
+        """Add sources to match to the query, the same as ``Forge.match_source_names()``.
+
+        Returns:
+            LocalIndex: Self
+        """
+        return self.match_query(Query().match_source_names(source_names))
+
+    def match_elements(self, elements, match_all=True):
+        """Add elements to match to the query, the same as ``Forge.match_elements()``.
+
+        Returns:
+            LocalIndex: Self
+        """
+        return self.match_query(Query().match_elements(elements, match_all=match_all))
+
+    def match_years(self, years=None, start=None, stop=None, inclusive=True):
+        """Add years and limits to the query, the same as ``Forge.match_years()``.
+
+        Returns:
+            LocalIndex: Self
+        """
+        return self.match_query(Query().match_years(years, start=start, stop=stop,
+                                                    inclusive=inclusive))
+
+    def match_resource_types(self, types):
+        """Add resource types to match to the query, the same as
+        ``Forge.match_resource_types()``.
+
+        Returns:
+            LocalIndex: Self
+        """
+        return self.match_query(Query().match_resource_types(types))
+
+    def match_organizations(self, organizations, match_all=True):
+        """Add organizations to match to the query, the same as
+        ``Forge.match_organizations()``.
+
+        Returns:
+            LocalIndex: Self
+        """
+        return self.match_query(Query().match_organizations(organizations,
+                                                            match_all=match_all))
+
+    def match_dois(self, dois):
+        """Add DOIs to match to the query, the same as ``Forge.match_dois()``.
+
+        Returns:
+            LocalIndex: Self
+        """
+        return self.match_query(Query().match_dois(dois))
+
+    # ***********************************************
+    # * Searching
+    # ***********************************************
+
+    def search(self, q=None, limit=None, info=False, reset_query=True):
+        """Run a query against the index.
+        Records are returned in the order they were added.
+
+        Arguments:
+            q (Query): The query to run, which must be supported by ``match_query()``.
+                    **Default:** The current helper-formed query, if any.
+                    There must be some query to run.
+            limit (int): The maximum number of records to return.
+                    **Default:** ``None``, for no limit.
+            info (bool): If ``True``, will also return information about the query,
+                    as ``Forge.search()`` does. **Default:** ``False``.
+            reset_query (bool): If ``True``, will destroy the current query after execution
+                    and start a fresh one.
+                    Has no effect if a query is supplied in ``q``.
+                    **Default:** ``True``.
+
+        Returns:
+            If ``info`` is ``False``, *list*: The matching records.
+            If ``info`` is ``True``, *tuple*: The matching records,
+            and a dictionary of query information.
+        """
+        if q is not None:
+            # Run the query by itself, keeping the current query
+            current = self.__clauses
+            self.__clauses = []
+            try:
+                return self.match_query(q).search(limit=limit, info=info, reset_query=False)
+            finally:
+                self.__clauses = current
+        if not self.__clauses:
+            raise AttributeError("No query has been set.")
+        where = " INTERSECT ".join(query for query, params in self.__clauses)
+        params = [param for query, params in self.__clauses for param in params]
+        with self.__lock:
+            rows = self.__db.execute("SELECT data FROM records WHERE id IN ({}) ORDER BY id "
+                                     "LIMIT ?".format(where),
+                                     params + [-1 if limit is None else limit]).fetchall()
+            if info:
+                total = self.__db.execute("SELECT COUNT(*) FROM ({})".format(where),
+                                          params).fetchone()[0]
+        if reset_query:
+            self.reset_query()
+        results = [json.loads(row[0]) for row in rows]
+        if info:
+            return results, {
+                "total_query_matches": total
+            }
+        return results
@@ -0,0 +1,143 @@
+import copy
+import hashlib
+import json
+import os
+
+import requests
+
+
+# Name of the metadata directory in the cache directory
+METADATA_DIR_NAME = "metadata"
+# Version of the snapshot file format
+SNAPSHOT_VERSION = 1
+
+
+class MetadataCache:
+    """A cache of MDF metadata (schemas and organizations) fetched over HTTPS.
+    Each URL is fetched at most once per MetadataCache.
+    If a cache directory is given, responses are also saved to disk and revalidated
+    with the server (using ``ETag`` and ``Last-Modified``) instead of being downloaded
+    again. Saved responses are used if the server cannot be reached or returns an error
+    (status 500 or greater).
+    """
+    def __init__(self, cache_dir=None):
+        """Create a MetadataCache.
+
+        Arguments:
+            cache_dir (str): The directory to save responses in.
+                    **Default:** ``None``, to only keep responses in memory.
+        """
+        self.__entries = {}
+        self.__dir = os.path.join(cache_dir, METADATA_DIR_NAME) if cache_dir else None
+        if self.__dir:
+            os.makedirs(self.__dir, exist_ok=True)
+
+    def __path(self, url):
+        return os.path.join(self.__dir, hashlib.sha1(url.encode("utf-8")).hexdigest() + ".json")
+
+    def __load(self, url):
+        if not self.__dir:
+            return None
+        try:
+            with open(self.__path(url)) as f:
+                return json.load(f)
+        except (IOError, OSError, ValueError):
+            return None
+
+    def __save(self, entry):
+        self.__entries[entry["url"]] = entry
+        if self.__dir:
+            # Write to a temporary file first, so a partial write never replaces an entry
+            path = self.__path(entry["url"])
+            with open(path + ".part", "w") as f:
+                json.dump(entry, f)
+            os.replace(path + ".part", path)
+
+    def get(self, url, copy_json=True):
+        """Fetch JSON metadata, from the cache if possible.
+
+        Arguments:
+            url (str): The URL of the metadata.
+            copy_json (bool): If ``True``, the decoded JSON is a copy.
+                    If ``False``, it is shared with the cache and must not be modified,
+                    which avoids copying large schemas. **Default:** ``True``.
+
+        Returns:
+            dict: The response, with keys:
+                ``status_code`` (*int*): The HTTP status code.
+                ``json``: The decoded JSON body, or ``None`` if it could not be decoded.
+                ``content`` (*bytes*): The raw body, if it could not be decoded.
+        """
+        entry = self.__entries.get(url)
+        if entry is None:
+            saved = self.__load(url)
+            headers = {}
+            if saved is not None:
+                if saved.get("etag"):
+                    headers["If-None-Match"] = saved["etag"]
+                if saved.get("last_modified"):
+                    headers["If-Modified-Since"] = saved["last_modified"]
+            try:
+                res = requests.get(url, headers=headers)
+            except requests.RequestException:
+                # Offline, use the saved response if there is one
+                if saved is None:
+                    raise
+                entry = saved
+            else:
+                # Server errors are also treated as the server being unavailable
+                if saved is not None and (res.status_code == 304 or res.status_code >= 500):
+                    entry = saved
+                else:
+                    try:
+                        json_res = res.json()
+                    except Exception:
+                        json_res = None
+                    entry = {
+                        "url": url,
+                        "status_code": res.status_code,
+                        "json": json_res,
+                        "content": None if json_res is not None else res.content,
+                        "etag": res.headers.get("ETag"),
+                        "last_modified": res.headers.get("Last-Modified")
+                    }
+                    # Only keep successful responses
+                    if res.status_code >= 300 or json_res is None:
+                        return entry
+            self.__save(entry)
+        return copy.deepcopy(entry) if copy_json else dict(entry)
+
+    def export_snapshot(self, path):
+        """Save every cached response to a single file, for use with ``import_snapshot()``.
+
+        Arguments:
+            path (str): The path to save the snapshot to.
+
+        Returns:
+            list of str: The URLs saved.
+        """
+        with open(path, "w") as f:
+            json.dump({
+                "snapshot_version": SNAPSHOT_VERSION,
+                "entries": list(self.__entries.values())
+            }, f)
+        return list(self.__entries.keys())
+
+    def import_snapshot(self, path):
+        """Load responses saved with ``export_snapshot()``.
+        The responses are used without contacting the server.
+
+        Arguments:
+            path (str): The path to the snapshot.
+
+        Returns:
+            list of str: The URLs loaded.
+        """
+        with open(path) as f:
+            snapshot = json.load(f)
+        if snapshot.get("snapshot_version") != SNAPSHOT_VERSION:
+            raise ValueError("Unsupported snapshot version: {}"
+                             .format(snapshot.get("snapshot_version")))
+        for entry in snapshot["entries"]:
+            self.__save(entry)
+        return [entry["url"] for entry in snapshot["entries"]]
@@ -0,0 +1,533 @@
+import re
+
+from mdf_toolbox.globus_search.search_helper import (_clean_query_string, QUOTE_LIST,
+                                                     UNQUOTE_LIST)
+
+
+# Maximum length of a query string to send to Search in one request
+QUERY_LENGTH_LIMIT = 4096
+
+
+def quote_value(value):
+    """Quote a value for matching in a field, the same way ``SearchHelper`` does.
+    Values with spaces or special characters are quoted, unless they already
+    contain quotes or are ranges.
+
+    Arguments:
+        value (str): The value to quote.
+
+    Returns:
+        str: The value, quoted if required.
+    """
+    value = str(value)
+    if (any([char in value for char in QUOTE_LIST]) and '"' not in value
+            and not any([char in value for char in UNQUOTE_LIST])):
+        value = '"' + value + '"'
+    return value
+
+
+def or_batches(field, values, base=None, limit=QUERY_LENGTH_LIMIT):
+    """Split a match on any of many values of a field into as few queries as possible,
+    keeping each query under the length limit.
+
+    **Example**::
+
+        or_batches("mdf.source_name", ["oqmd", "nist_xps_db"], base="mdf.resource_type:dataset")
+        => ("(mdf.resource_type:dataset) AND (mdf.source_name:oqmd OR "
+            "mdf.source_name:nist_xps_db)", ["oqmd", "nist_xps_db"])
+
+    Arguments:
+        field (str): The field to match the values in.
+        values (iterable): The values to match.
+        base (str): An advanced query the values must also match, if any.
+                **Default:** ``None``.
+        limit (int): The maximum length of each query. A single value that would
+                exceed the limit is still put in a query by itself.
+                **Default:** ``QUERY_LENGTH_LIMIT``.
+
+    Yields:
+        tuple: An advanced query, and the list of values it matches.
+    """
+    prefix = "({}) AND (".format(base) if base else "("
+    suffix = ")"
+    batch = []
+    length = len(prefix) + len(suffix)
+    for value in values:
+        term = "{}:{}".format(field, quote_value(value))
+        added = len(term) + (len(" OR ") if batch else 0)
+        if batch and length + added > limit:
+            yield prefix + " OR ".join("{}:{}".format(field, quote_value(val))
+                                       for val in batch) + suffix, batch
+            batch = []
+            length = len(prefix) + len(suffix)
+            added = len(term)
+        batch.append(value)
+        length += added
+    if batch:
+        yield prefix + " OR ".join("{}:{}".format(field, quote_value(val))
+                                   for val in batch) + suffix, batch
+
+
+def compact_terms(values, ranges=False):
+    """Compile values to match in one field into as few terms as possible.
+    Duplicate values are removed, and values are quoted if required.
+
+    **Example**::
+
+        compact_terms([1, 2, 3, 4, 7], ranges=True) => ["[1 TO 4]", "7"]
+
+    Arguments:
+        values (list): The values to match.
+        ranges (bool): If ``True``, and the values are all integers, runs of three
+                or more consecutive integers are replaced with a range.
+                **Default:** ``False``.
+
+    Returns:
+        list of str: The terms.
+    """
+    if ranges and all(isinstance(val, int) and not isinstance(val, bool) for val in values):
+        values = sorted(set(values))
+        terms = []
+        i = 0
+        while i < len(values):
+            j = i
+            while j + 1 < len(values) and values[j+1] == values[j] + 1:
+                j += 1
+            if j - i >= 2:
+                terms.append("[{} TO {}]".format(values[i], values[j]))
+            else:
+                terms.extend(str(val) for val in values[i:j+1])
+            i = j + 1
+        return terms
+    terms = []
+    for value in values:
+        term = quote_value(value)
+        if term not in terms:
+            terms.append(term)
+    return terms
+
+
+def field_values(q, field):
+    """Find the values matched in a field in a query string,
+    in either ``field:value`` or ``field:(value1 OR value2)`` form.
+
+    Arguments:
+        q (str): The query string.
+        field (str): The field.
+
+    Returns:
+        list of str: The values, without quotes.
+    """
+    values = []
+    for match in re.finditer(re.escape(field) + ':(\\((?:"[^"]*"|[^)])*\\)|"[^"]*"|[^\\s()]+)',
+                             q):
+        term = match.group(1)
+        if term.startswith("("):
+            values.extend(val for val in re.findall('"[^"]*"|[^\\s()]+', term[1:-1])
+                          if val not in ("AND", "OR", "NOT"))
+        else:
+            values.append(term)
+    return [val.strip('"') for val in values]
+
+
+class Query:
+    """An immutable Search query, built with the same helpers as ``Forge``.
+    Each helper returns a new ``Query``, leaving the original unchanged, so queries can be
+    shared between threads, hashed, and used as cache keys.
+    A ``Query`` can be run by any ``Forge`` method that takes a query,
+    such as ``search()``, ``aggregate()``, and ``search_many()``.
+
+    **Example usage**::
+
+        base = Query().match_source_names("oqmd")
+        queries = [base.match_elements(["Fe", el]) for el in ["O", "S", "Se"]]
+        results = forge.search_many(queries)
+    """
+    __slots__ = ("_q", "_advanced", "_groups", "_clauses")
+
+    def __init__(self, q=None, advanced=False):
+        """Create a Query.
+
+        Arguments:
+            q (str): A query to start from. **Default:** ``None``, to start with no query.
+            advanced (bool): Whether to treat ``q`` as a basic or advanced query.
+                    Any field-matching helper makes the query advanced.
+                    **Default:** ``False``.
+        """
+        # The raw query has an open group, the same as a SearchHelper query
+        object.__setattr__(self, "_q", "(" + (q or ""))
+        object.__setattr__(self, "_advanced", bool(advanced))
+        # The (start, end, field, terms) of each compacted group in the raw query,
+        # which can be split if the query is too long
+        object.__setattr__(self, "_groups", ())
+        # The clauses added by the field-specific helpers, so the query can also be run
+        # against a LocalIndex, or None if the query has any other terms
+        object.__setattr__(self, "_clauses", None if q else ())
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Query objects are immutable.")
+
+    def __delattr__(self, name):
+        raise AttributeError("Query objects are immutable.")
+
+    def __eq__(self, other):
+        if not isinstance(other, Query):
+            return NotImplemented
+        return (self.q, self.advanced) == (other.q, other.advanced)
+
+    def __hash__(self):
+        return hash((self.q, self.advanced))
+
+    def __repr__(self):
+        return "Query({!r}, advanced={})".format(self.q, self.advanced)
+
+    def __str__(self):
+        return self.q
+
+    @property
+    def q(self):
+        """str: The query string."""
+        return _clean_query_string(self._q)
+
+    @property
+    def advanced(self):
+        """bool: Whether the query is an advanced query."""
+        return self._advanced
+
+    @property
+    def initialized(self):
+        """bool: Whether any term has been added to the query."""
+        return bool(self.q)
+
+    @classmethod
+    def _from_raw(cls, raw, advanced, groups=(), clauses=None):
+        """Create a Query from a raw, possibly unclosed, query string,
+        such as the query of a ``SearchHelper``.
+        """
+        query = cls.__new__(cls)
+        object.__setattr__(query, "_q", raw)
+        object.__setattr__(query, "_advanced", bool(advanced))
+        object.__setattr__(query, "_groups", tuple(groups))
+        object.__setattr__(query, "_clauses", None if clauses is None else tuple(clauses))
+        return query
+
+    def _add(self, text, advanced=False, group=None):
+        groups = self._groups
+        if group is not None:
+            # Group positions are relative to the added text
+            start, end, field, terms = group
+            groups += ((start + len(self._q), end + len(self._q), field, terms),)
+        return Query._from_raw(self._q + text, self._advanced or advanced, groups)
+
+    def _with_clause(self, query, clause):
+        """Record the clause that was added to this query to make ``query``.
+
+        Arguments:
+            query (Query): The new query.
+            clause (tuple): Either ``("terms", field, values, match_all)``,
+                    or ``("range", field, start, stop, inclusive)``.
+
+        Returns:
+            Query: The new query, with the clause recorded.
+        """
+        if query is self:
+            return self
+        clauses = None if self._clauses is None else self._clauses + (clause,)
+        return Query._from_raw(query._q, query._advanced, query._groups, clauses)
+
+    def _join(self, required=True, new_group=False):
+        """Get the operator joining a new term to the query, if any."""
+        if not self.initialized:
+            return ""
+        op = "AND" if required else "OR"
+        return ") {} (".format(op) if new_group else " {} ".format(op)
+
+    # ***********************************************
+    # * General helpers
+    # ***********************************************
+
+    def match_term(self, value, required=True, new_group=False):
+        """Add a fulltext search term to the query, as ``Forge.match_term()`` does.
+
+        Returns:
+            Query: The new query.
+        """
+        return self._add(self._join(required, new_group) + str(value))
+
+    def match_field(self, field, value, required=True, new_group=False):
+        """Add a ``field:value`` term to the query, as ``Forge.match_field()`` does.
+
+        Returns:
+            Query: The new query.
+        """
+        field = str(field)
+        value = quote_value(value)
+        if not field or not value:
+            return self
+        return self._add(self._join(required, new_group) + field + ":" + value, advanced=True)
+
+    def exclude_field(self, field, value, new_group=False):
+        """Add a ``NOT field:value`` term to the query, as ``Forge.exclude_field()`` does.
+
+        Returns:
+            Query: The new query.
+        """
+        if not field and not value:
+            return self
+        return self._add(self._join(True, new_group) + " NOT " + str(field) + ":"
+                         + quote_value(value), advanced=True)
+
+    def match_exists(self, field, required=True, new_group=False):
+        """Add a ``field:*`` term to the query, as ``Forge.match_exists()`` does.
+
+        Returns:
+            Query: The new query.
+        """
+        return self.match_field(field, "*", required=required, new_group=new_group)
+
+    def match_not_exists(self, field, new_group=False):
+        """Add a ``NOT field:*`` term to the query, as ``Forge.match_not_exists()`` does.
+
+        Returns:
+            Query: The new query.
+        """
+        return self.exclude_field(field, "*", new_group=new_group)
+
+    @staticmethod
+    def _range(start, stop, inclusive):
+        if inclusive:
+            return "[" + str(start) + " TO " + str(stop) + "]"
+        return "{" + str(start) + " TO " + str(stop) + "}"
+
+    def match_range(self, field, start=None, stop=None, inclusive=True,
+                    required=True, new_group=False):
+        """Add a ``field:[start TO stop]`` term to the query, as ``Forge.match_range()`` does.
+
+        Returns:
+            Query: The new query.
+        """
+        start = "*" if start is None else start
+        stop = "*" if stop is None else stop
+        if start == "*" and stop == "*":
+            return self.match_exists(field, required=required, new_group=new_group)
+        return self.match_field(field, self._range(start, stop, inclusive),
+                                required=required, new_group=new_group)
+
+    def exclude_range(self, field, start="*", stop="*", inclusive=True, new_group=False):
+        """Add a ``NOT field:[start TO stop]`` term to the query,
+        as ``Forge.exclude_range()`` does.
+
+        Returns:
+            Query: The new query.
+        """
+        start = "*" if start is None else start
+        stop = "*" if stop is None else stop
+        if start == "*" and stop == "*":
+            return self.match_not_exists(field, new_group=new_group)
+        return self.exclude_field(field, self._range(start, stop, inclusive),
+                                  new_group=new_group)
+
+    # ***********************************************
+    # * Field-specific helpers
+    # ***********************************************
+
+    def _match_any(self, field, values, match_all=False, ranges=False):
+        """Add a new required group matching any (or all) of the values.
+        Any-of matches are compiled to one compact ``field:(value1 OR value2)`` term.
+        """
+        clause = ("terms", field, tuple(values), match_all)
+        if match_all:
+            query = self.match_field(field, values[0], required=True, new_group=True)
+            for value in values[1:]:
+                query = query.match_field(field, value, required=True, new_group=False)
+            return self._with_clause(query, clause)
+        terms = compact_terms(values, ranges=ranges)
+        if len(terms) == 1:
+            return self._with_clause(self.match_field(field, terms[0], required=True,
+                                                      new_group=True), clause)
+        join = self._join(required=True, new_group=True)
+        term = field + ":(" + " OR ".join(terms) + ")"
+        return self._with_clause(self._add(join + term, advanced=True,
+                                           group=(len(join), len(join) + len(term), field,
+                                                  tuple(terms))), clause)
+
+    def split(self, limit=QUERY_LENGTH_LIMIT):
+        """Split a query that is too long into shorter queries, which together
+        match the same records. Only compacted groups of values (from helpers such as
+        ``match_source_names()`` or ``match_records()``) can be split.
+
+        Arguments:
+            limit (int): The maximum length of each query. **Default:** ``QUERY_LENGTH_LIMIT``.
+
+        Returns:
+            list of Query: The queries, which may overlap. A query that is short enough,
+            or cannot be split, is returned by itself.
+        """
+        if len(self.q) <= limit or not self._groups:
+            return [self]
+        lengths = [end - start for start, end, field, terms in self._groups]
+        available = limit - (len(self.q) - sum(lengths))
+        # Share the available length equally between the groups, since that makes the
+        # fewest queries, with any length short groups do not need going to longer ones
+        budgets = [0] * len(lengths)
+        left = len(lengths)
+        for i in sorted(range(len(lengths)), key=lengths.__getitem__):
+            budgets[i] = min(lengths[i], available / left)
+            available -= budgets[i]
+            left -= 1
+        queries = [self]
+        for i, budget in enumerate(budgets):
+            if budget < lengths[i]:
+                queries = [part for query in queries for part in query._split_group(i, budget)]
+        return queries
+
+    def _split_group(self, index, budget):
+        """Split one compacted group into parts no longer than the budget."""
+        start, end, field, terms = self._groups[index]
+        budget -= len(field + ":()")
+        chunks = []
+        for term in terms:
+            if chunks and len(" OR ".join(chunks[-1] + [term])) <= budget:
+                chunks[-1].append(term)
+            else:
+                chunks.append([term])
+        queries = []
+        for chunk in chunks:
+            text = (field + ":(" + " OR ".join(chunk) + ")" if len(chunk) > 1
+                    else field + ":" + chunk[0])
+            shift = len(text) - (end - start)
+            groups = [group if group[0] < start
+                      else (group[0] + shift, group[1] + shift, group[2], group[3])
+                      for group in self._groups]
+            groups[index] = (start, start + len(text), field, tuple(chunk))
+            queries.append(Query._from_raw(self._q[:start] + text + self._q[end:],
+                                           self._advanced, groups))
+        return queries
+
+    def match_source_names(self, source_names):
+        """Add sources to match to the query, as ``Forge.match_source_names()`` does.
+
+        Returns:
+            Query: The new query.
+        """
+        if not source_names:
+            return self
+        if isinstance(source_names, str):
+            source_names = [source_names]
+        # If passed source_ids, strip version info
+        source_names = [re.sub("_v[0-9]+\\.[0-9]+$", "", src) for src in source_names]
+        return self._match_any("mdf.source_name", source_names)
+
+    def match_records(self, source_name, scroll_ids):
+        """Add individual records to match to the query, as ``Forge.match_records()`` does.
+
+        Returns:
+            Query: The new query.
+        """
+        if not source_name or not scroll_ids:
+            return self
+        if isinstance(scroll_ids, int):
+            scroll_ids = [scroll_ids]
+        # If passed source_id, strip version info
+        match = (re.search("_v[0-9]+\\.[0-9]+$", source_name)
+                 or re.search("_v[0-9]+-[0-9]+$", source_name)
+                 or re.search("_v[0-9]+$", source_name))
+        if match:
+            source_name = source_name[:match.start()]
+        return (self._match_any("mdf.source_name", [source_name])
+                ._match_any("mdf.scroll_id", scroll_ids, ranges=True))
+
+    def match_elements(self, elements, match_all=True):
+        """Add elements to match to the query, as ``Forge.match_elements()`` does.
+
+        Returns:
+            Query: The new query.
+        """
+        if not elements:
+            return self
+        if isinstance(elements, str):
+            elements = [elements]
+        return self._match_any("material.elements", elements, match_all=match_all)
+
+    def match_titles(self, titles):
+        """Add titles to match to the query, as ``Forge.match_titles()`` does.
+
+        Returns:
+            Query: The new query.
+        """
+        if not titles:
+            return self
+        if not isinstance(titles, list):
+            titles = [titles]
+        return self._match_any("dc.titles.title", titles)
+
+    def match_years(self, years=None, start=None, stop=None, inclusive=True):
+        """Add years and limits to the query, as ``Forge.match_years()`` does.
+
+        Returns:
+            Query: The new query.
+        """
+        if years is None and start is None and stop is None:
+            return self
+        if years is not None and years != []:
+            if not isinstance(years, list):
+                years = [years]
+            years_int = []
+            for year in years:
+                try:
+                    years_int.append(int(year))
+                except ValueError:
+                    raise AttributeError("Invalid year: '{}'".format(year))
+            if not years_int:
+                return self
+            return self._match_any("dc.publicationYear", years_int, ranges=True)
+        if start is not None:
+            try:
+                start = int(start)
+            except ValueError:
+                raise AttributeError("Invalid start year: '{}'".format(start))
+        if stop is not None:
+            try:
+                stop = int(stop)
+            except ValueError:
+                raise AttributeError("Invalid stop year: '{}'".format(stop))
+        return self._with_clause(self.match_range("dc.publicationYear", start=start, stop=stop,
+                                                  inclusive=inclusive, required=True,
+                                                  new_group=True),
+                                 ("range", "dc.publicationYear", start, stop, inclusive))
+
+    def match_resource_types(self, types):
+        """Add resource types to match to the query, as ``Forge.match_resource_types()`` does.
+
+        Returns:
+            Query: The new query.
+        """
+        if not types:
+            return self
+        if isinstance(types, str):
+            types = [types]
+        return self._match_any("mdf.resource_type", types)
+
+    def match_organizations(self, organizations, match_all=True):
+        """Add organizations to match to the query, as ``Forge.match_organizations()`` does.
+
+        Returns:
+            Query: The new query.
+        """
+        if not organizations:
+            return self
+        if isinstance(organizations, str):
+            organizations = [organizations]
+        return self._match_any("mdf.organizations", organizations, match_all=match_all)
+
+    def match_dois(self, dois):
+        """Add DOIs to match to the query, as ``Forge.match_dois()`` does.
+
+        Returns:
+            Query: The new query.
+        """
+        if not dois:
+            return self
+        if isinstance(dois, str):
+            dois = [dois]
+        return self._match_any("dc.identifier.identifier", dois)
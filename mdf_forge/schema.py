@@ -0,0 +1,97 @@
+import fnmatch
+
+
+class FieldIndex:
+    """A flat index of every field in a JSONSchema, by full dot-notation path.
+    Fields inside arrays are indexed by the path of the array, so ``"material.elements"``
+    and ``"files.url"`` are both valid paths, the same as in Search queries.
+    """
+    def __init__(self, schema):
+        """Build a FieldIndex.
+
+        Arguments:
+            schema (dict): The JSONSchema to index.
+        """
+        self.schema = schema
+        self.__fields = {}
+        self.__add(schema, "")
+
+    def __add(self, node, path):
+        if path:
+            self.__fields[path] = node
+        if not isinstance(node, dict):
+            return
+        # Array fields are searched by their item fields
+        node = node.get("items", node)
+        if not isinstance(node, dict):
+            return
+        for name, subnode in node.get("properties", {}).items():
+            self.__add(subnode, path + "." + name if path else name)
+
+    def __contains__(self, path):
+        return path in self.__fields
+
+    def __len__(self):
+        return len(self.__fields)
+
+    def get(self, path):
+        """Get the schema of a field.
+
+        Arguments:
+            path (str): The field, in dot notation.
+                    The value ``None`` gives the schema of the whole document.
+
+        Returns:
+            dict: The schema of the field, or ``None`` if the field does not exist.
+        """
+        if not path:
+            return self.schema
+        return self.__fields.get(path)
+
+    def type_of(self, path):
+        """Get the type of a field. For arrays, this is the type of the items.
+
+        Arguments:
+            path (str): The field, in dot notation.
+
+        Returns:
+            str: The type, or ``None`` if the field does not exist or has no type.
+        """
+        node = self.__fields.get(path)
+        if not isinstance(node, dict):
+            return None
+        if node.get("type") == "array" and isinstance(node.get("items"), dict):
+            return node["items"].get("type", "array")
+        return node.get("type")
+
+    def missing_part(self, path):
+        """Find the first part of a field path that does not exist.
+
+        Arguments:
+            path (str): The field, in dot notation.
+
+        Returns:
+            str: The first missing part of the path, or ``None`` if the field exists.
+        """
+        parts = path.split(".")
+        for i in range(len(parts)):
+            if ".".join(parts[:i+1]) not in self.__fields:
+                return parts[i]
+        return None
+
+    def fields(self, pattern=None):
+        """List the fields in the index.
+
+        Arguments:
+            pattern (str): Only list fields starting with this prefix, or, if the pattern
+                    contains wildcards (``*``, ``?``, ``[]``), matching this pattern.
+                    **Default:** ``None``, to list every field.
+
+        Returns:
+            list of str: The matching field paths, in order.
+        """
+        if not pattern:
+            return sorted(self.__fields.keys())
+        if any(char in pattern for char in "*?["):
+            return sorted(fnmatch.filter(self.__fields.keys(), pattern))
+        return sorted(path for path in self.__fields.keys() if path.startswith(pattern))
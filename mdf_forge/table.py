@@ -0,0 +1,369 @@
+from array import array
+import json
+
+
+# Fields stored as columns when no columns are requested
+DEFAULT_COLUMNS = ("mdf.source_id", "mdf.source_name", "mdf.scroll_id", "mdf.resource_type",
+                   "material.elements", "dc.publicationYear")
+
+
+def get_field(record, path):
+    """Get the value of a field from a record.
+    If the path passes through lists, the values from every item are collected into a list.
+
+    Arguments:
+        record (dict): The record.
+        path (str): The field, in dot notation.
+
+    Returns:
+        The value, or ``None`` if the field is not present.
+    """
+    values = [record]
+    in_list = False
+    for key in path.split("."):
+        next_values = []
+        for value in values:
+            if isinstance(value, list):
+                in_list = True
+                next_values.extend(item[key] for item in value
+                                   if isinstance(item, dict) and key in item)
+            elif isinstance(value, dict) and key in value:
+                next_values.append(value[key])
+        values = next_values
+    if not values:
+        return None
+    # Lists at the end of the path are collected too
+    if in_list or isinstance(values[0], list):
+        flat = []
+        for value in values:
+            if isinstance(value, list):
+                flat.extend(value)
+            else:
+                flat.append(value)
+        return flat
+    return values[0]
+
+
+def make_projection(fields):
+    """Build a projection from a list of fields, for use with ``project()``.
+
+    Arguments:
+        fields (list of str): The fields to keep, in dot notation.
+                Fields inside lists may be written as ``"files.url"`` or ``"files[].url"``.
+
+    Returns:
+        dict: The projection, as a tree of field names.
+                A value of ``None`` keeps the entire field.
+    """
+    if isinstance(fields, str):
+        fields = [fields]
+    tree = {}
+    for field in fields:
+        parts = field.replace("[]", "").split(".")
+        node = tree
+        for part in parts[:-1]:
+            if part in node and node[part] is None:
+                # The entire parent field is already kept
+                break
+            node = node.setdefault(part, {})
+        else:
+            node[parts[-1]] = None
+    return tree
+
+
+def project(record, projection):
+    """Remove all fields not in a projection from a record.
+
+    Arguments:
+        record: The record, or part of a record.
+        projection (dict): The projection, from ``make_projection()``.
+
+    Returns:
+        A new record, with only the fields in the projection.
+    """
+    if projection is None:
+        return record
+    if isinstance(record, list):
+        return [project(item, projection) for item in record]
+    if isinstance(record, dict):
+        return {key: project(record[key], subtree) for key, subtree in projection.items()
+                if key in record}
+    return record
+
+
+def _make_column(values):
+    """Store a column's values compactly.
+    Integers are stored in an integer array, numbers with missing values in a
+    floating-point array (with missing values as ``nan``), and anything else in a list.
+    """
+    present = [value for value in values if value is not None]
+    if present and all(isinstance(value, int) and not isinstance(value, bool)
+                       for value in present):
+        if len(present) == len(values):
+            return array("q", values)
+        return array("d", [float("nan") if value is None else value for value in values])
+    if present and all(isinstance(value, (int, float)) and not isinstance(value, bool)
+                       for value in present):
+        return array("d", [float("nan") if value is None else value for value in values])
+    return list(values)
+
+
+class Mask(list):
+    """A list of bools selecting records from a ``ResultTable``, such as from
+    ``ResultTable.equals()``. Masks can be combined element-wise with ``&`` (and),
+    ``|`` (or), and ``~`` (not), the same as NumPy and pandas masks.
+    """
+    def __combine(self, other, op):
+        if len(other) != len(self):
+            raise ValueError("Cannot combine masks with {} and {} values"
+                             .format(len(self), len(other)))
+        return Mask(op(bool(a), bool(b)) for a, b in zip(self, other))
+
+    def __and__(self, other):
+        return self.__combine(other, lambda a, b: a and b)
+
+    def __or__(self, other):
+        return self.__combine(other, lambda a, b: a or b)
+
+    def __xor__(self, other):
+        return self.__combine(other, lambda a, b: a != b)
+
+    __rand__ = __and__
+    __ror__ = __or__
+    __rxor__ = __xor__
+
+    def __invert__(self):
+        return Mask(not value for value in self)
+
+
+def _as_number(value):
+    """Convert a numeric string, such as a year, to a number.
+    Other strings become ``None``, and other values are unchanged.
+    """
+    if not isinstance(value, str):
+        return value
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+class ResultTable:
+    """A compact, column-oriented container for Search results.
+    The requested fields are stored as columns, in typed arrays where possible.
+    The full records are kept as compact JSON, and are only decoded when requested.
+
+    **Example usage**::
+
+        table = forge.match_source_names("oqmd").aggregate(as_table=True)
+        table = table.filter(table.contains("material.elements", "Al")
+                             & ~table.equals("mdf.resource_type", "dataset"))
+        df = table.to_pandas()
+    """
+    def __init__(self, records=(), columns=None):
+        """Create a ResultTable.
+
+        Arguments:
+            records (iterable of dict): The records to store. Records are read one at a time,
+                    so a generator (such as from ``iter_aggregate()``) is never held in
+                    memory all at once.
+            columns (list of str): The fields to store as columns, in dot notation.
+                    **Default:** ``DEFAULT_COLUMNS``.
+        """
+        self.columns = list(columns or DEFAULT_COLUMNS)
+        values = {column: [] for column in self.columns}
+        self.__records = []
+        for record in records:
+            for column in self.columns:
+                value = get_field(record, column)
+                # Lists are stored as tuples, which are smaller and hashable
+                values[column].append(tuple(value) if isinstance(value, list) else value)
+            self.__records.append(json.dumps(record, separators=(",", ":")).encode("utf-8"))
+        self.__data = {column: _make_column(values[column]) for column in self.columns}
+
+    @classmethod
+    def _from_parts(cls, columns, data, records):
+        table = cls.__new__(cls)
+        table.columns = list(columns)
+        table.__data = data
+        table.__records = records
+        return table
+
+    def __len__(self):
+        return len(self.__records)
+
+    def __iter__(self):
+        return self.records()
+
+    def __getitem__(self, column):
+        return self.column(column)
+
+    def column(self, column):
+        """Get the values of a column.
+
+        Arguments:
+            column (str): The column.
+
+        Returns:
+            array or list: The values, in record order.
+        """
+        if column not in self.__data.keys():
+            raise KeyError("Column '{}' not in table. Available columns: {}"
+                           .format(column, self.columns))
+        return self.__data[column]
+
+    def record(self, i):
+        """Get a full record.
+
+        Arguments:
+            i (int): The position of the record.
+
+        Returns:
+            dict: The record.
+        """
+        return json.loads(self.__records[i].decode("utf-8"))
+
+    def records(self):
+        """Yield every full record, decoding one at a time.
+
+        Yields:
+            dict: Each record.
+        """
+        for i in range(len(self)):
+            yield self.record(i)
+
+    # ***********************************************
+    # * Filtering
+    # ***********************************************
+
+    def filter(self, mask):
+        """Select records.
+
+        Arguments:
+            mask (sequence of bool): ``True`` for each record to keep, such as
+                    a ``Mask`` from ``equals()``, ``isin()``, ``contains()``, or ``between()``
+                    (which can be combined with ``&``, ``|``, and ``~``), or a NumPy array.
+
+        Returns:
+            ResultTable: A new table with only the selected records.
+        """
+        if len(mask) != len(self):
+            raise ValueError("Mask has {} values, but table has {} records"
+                             .format(len(mask), len(self)))
+        keep = [i for i, selected in enumerate(mask) if selected]
+        data = {}
+        for column, values in self.__data.items():
+            if isinstance(values, array):
+                data[column] = array(values.typecode, [values[i] for i in keep])
+            else:
+                data[column] = [values[i] for i in keep]
+        return ResultTable._from_parts(self.columns, data, [self.__records[i] for i in keep])
+
+    def equals(self, column, value):
+        """Find records where a column equals a value.
+
+        Returns:
+            Mask: The mask.
+        """
+        return Mask(cell == value for cell in self.column(column))
+
+    def isin(self, column, values):
+        """Find records where a column equals any of some values.
+
+        Returns:
+            Mask: The mask.
+        """
+        values = set(values)
+        return Mask(cell in values for cell in self.column(column))
+
+    def contains(self, column, value):
+        """Find records where a list column contains a value.
+
+        Returns:
+            Mask: The mask.
+        """
+        return Mask(cell is not None and value in cell for cell in self.column(column))
+
+    def between(self, column, start=None, stop=None):
+        """Find records where a column is between two values (inclusive).
+        If the bounds are numbers, numeric strings (such as ``dc.publicationYear``)
+        are compared as numbers, and other strings never match.
+
+        Returns:
+            Mask: The mask.
+        """
+        cells = self.column(column)
+        if any(isinstance(bound, (int, float)) and not isinstance(bound, bool)
+               for bound in (start, stop)):
+            cells = (_as_number(cell) for cell in cells)
+        return Mask(cell is not None and cell == cell
+                    and (start is None or cell >= start) and (stop is None or cell <= stop)
+                    for cell in cells)
+
+    # ***********************************************
+    # * Conversion
+    # ***********************************************
+
+    def to_dict(self):
+        """Get the columns as lists.
+
+        Returns:
+            dict: ``column: list of values`` pairs.
+        """
+        return {column: [list(cell) if isinstance(cell, tuple) else cell for cell in values]
+                for column, values in self.__data.items()}
+
+    def to_pandas(self, include_records=False):
+        """Convert the table to a pandas DataFrame. Requires ``pandas``.
+
+        Arguments:
+            include_records (bool): If ``True``, will add a ``record`` column with the full
+                    records. **Default:** ``False``.
+
+        Returns:
+            pandas.DataFrame: The table.
+        """
+        try:
+            import pandas
+        except ImportError:
+            raise ImportError("pandas is required for to_pandas(). "
+                              "Install it with 'pip install pandas'.")
+        df = pandas.DataFrame({column: (values if isinstance(values, array) else
+                                        [list(cell) if isinstance(cell, tuple) else cell
+                                         for cell in values])
+                               for column, values in self.__data.items()},
+                              columns=self.columns)
+        if include_records:
+            df["record"] = list(self.records())
+        return df
+
+    def to_arrow(self, include_records=False):
+        """Convert the table to an Arrow Table. Requires ``pyarrow``.
+
+        Arguments:
+            include_records (bool): If ``True``, will add a ``record`` column with the full
+                    records, as JSON strings. **Default:** ``False``.
+
+        Returns:
+            pyarrow.Table: The table.
+        """
+        try:
+            import pyarrow
+        except ImportError:
+            raise ImportError("pyarrow is required for to_arrow(). "
+                              "Install it with 'pip install pyarrow'.")
+        arrays = []
+        for column in self.columns:
+            values = self.__data[column]
+            if isinstance(values, array):
+                arrays.append(pyarrow.array(values.tolist(), from_pandas=True,
+                                            type=(pyarrow.int64() if values.typecode == "q"
+                                                  else pyarrow.float64())))
+            else:
+                arrays.append(pyarrow.array([list(cell) if isinstance(cell, tuple) else cell
+                                             for cell in values]))
+        names = list(self.columns)
+        if include_records:
+            arrays.append(pyarrow.array([rec.decode("utf-8") for rec in self.__records]))
+            names.append("record")
+        return pyarrow.Table.from_arrays(arrays, names=names)
@@ -0,0 +1,342 @@
+from datetime import datetime
+import os
+import time
+
+import globus_sdk
+import mdf_toolbox
+from tqdm import tqdm
+
+
+# Default number of seconds to wait between checking Transfer status
+DEFAULT_INTERVAL = 1 * 60  # 1 minute, in seconds
+# Default number of seconds a Transfer may go without progress before being cancelled
+DEFAULT_INACTIVITY_TIME = 1 * 60 * 60  # 1 hour, in seconds
+# Number of seconds to wait before the first status check when polling adaptively
+DEFAULT_POLL_START = 0.5
+# Transfer statuses that will not change
+FINISHED_STATUSES = ("SUCCEEDED", "FAILED")
+
+
+def _new_deadline(inactivity_time):
+    return datetime.utcfromtimestamp(int(time.time()) + inactivity_time)
+
+
+def _confirm(prompt):
+    user_cont = input(prompt)
+    return user_cont.strip().lower() == "y" or user_cont.strip().lower() == "yes"
+
+
+def poll_schedule(interval=DEFAULT_INTERVAL, start=DEFAULT_POLL_START, factor=2):
+    """Yield the time to wait between Transfer status checks, starting short
+    and growing exponentially until reaching ``interval``.
+    Short Transfers are noticed almost immediately, while long Transfers are
+    checked no more often than every ``interval`` seconds.
+
+    Arguments:
+        interval (int): The maximum number of seconds to wait between checks.
+                **Default:** ``DEFAULT_INTERVAL``.
+        start (float): The number of seconds to wait before the first check.
+                **Default:** ``DEFAULT_POLL_START``.
+        factor (float): The amount to multiply the wait by after each check.
+                **Default:** ``2``.
+
+    Yields:
+        float: The number of seconds to wait before the next check.
+    """
+    delay = min(start, interval)
+    while True:
+        yield delay
+        delay = min(delay * factor, interval)
+
+
+def submit_transfer(transfer_client, source_ep, dest_ep, path_list,
+                    inactivity_time=DEFAULT_INACTIVITY_TIME):
+    """Submit a Globus Transfer without waiting for it to finish.
+    Paths are checked and added the same way as ``mdf_toolbox.custom_transfer()``.
+
+    Arguments:
+        transfer_client (TransferClient): An authenticated Transfer client.
+        source_ep (str): The source Globus Endpoint ID.
+        dest_ep (str): The destination Globus Endpoint ID.
+        path_list (list of tuple of 2 str): A list of tuples containing the paths to transfer as
+                ``(source, destination)``.
+        inactivity_time (int): Number of seconds the Transfer is allowed to go without progress
+                before being cancelled. **Default:** ``DEFAULT_INACTIVITY_TIME``.
+
+    Returns:
+        str: The task ID of the Transfer.
+
+    Raises:
+        globus_sdk.GlobusError: If a path is invalid or the Transfer was not accepted.
+    """
+    tdata = globus_sdk.TransferData(transfer_client, source_ep, dest_ep,
+                                    deadline=_new_deadline(inactivity_time),
+                                    verify_checksum=True)
+    for source_path, dest_path in path_list:
+        # Ensure paths are POSIX
+        source_path = mdf_toolbox.posixify_path(source_path)
+        dest_path = mdf_toolbox.posixify_path(dest_path)
+        # Check if source path is directory or missing
+        source_res = mdf_toolbox.globus_check_directory(transfer_client, source_ep, source_path,
+                                                        allow_missing=False)
+        if not source_res["success"]:
+            raise globus_sdk.GlobusError(source_res["error"])
+        source_is_dir = source_res["is_dir"]
+
+        # Check if dest path is directory
+        dest_res = mdf_toolbox.globus_check_directory(transfer_client, dest_ep, dest_path,
+                                                      allow_missing=True)
+        if not dest_res["success"]:
+            raise globus_sdk.GlobusError(dest_res["error"])
+        dest_exists = dest_res["exists"]
+        dest_is_dir = dest_res["is_dir"]
+
+        # Transfer dir
+        if source_is_dir and (not dest_exists or dest_is_dir):
+            tdata.add_item(source_path, dest_path, recursive=True)
+        # Transfer non-dir
+        elif not source_is_dir and (not dest_exists or not dest_is_dir):
+            tdata.add_item(source_path, dest_path)
+        # Transfer non-dir into dir
+        elif not source_is_dir and (dest_exists and dest_is_dir):
+            tdata.add_item(source_path, os.path.join(dest_path, os.path.basename(source_path)))
+        # Malformed - Cannot transfer dir into non-dir
+        else:
+            raise globus_sdk.GlobusError("Cannot transfer a directory into a file: "
+                                         + str((source_path, dest_path)))
+
+    res = transfer_client.submit_transfer(tdata)
+    if res["code"] != "Accepted":
+        raise globus_sdk.GlobusError("Failed to transfer files: Transfer " + res["code"])
+    return res["task_id"]
+
+
+class TransferBatch:
+    """A handle on a group of Globus Transfers submitted together, one per source endpoint.
+    The Transfers run in the background; the handle can be used to check on, wait for,
+    or cancel them.
+
+    **Example usage**::
+
+        batch = forge.globus_download(results, wait=False)
+        # Do other work
+        batch.wait()
+        print(batch.summary())
+    """
+    def __init__(self, transfer_client, task_ids, errors=None,
+                 inactivity_time=DEFAULT_INACTIVITY_TIME):
+        """Create a TransferBatch for already-submitted Transfers.
+
+        Arguments:
+            transfer_client (TransferClient): An authenticated Transfer client.
+            task_ids (dict): ``source_ep: task_id`` pairs for the submitted Transfers.
+            errors (dict): ``source_ep: message`` pairs for Transfers that could not be submitted.
+                    **Default:** No errors.
+            inactivity_time (int): Number of seconds a Transfer is allowed to go without progress
+                    before being cancelled. The deadline is moved forward whenever progress
+                    is made while the batch is being checked.
+                    **Default:** ``DEFAULT_INACTIVITY_TIME``.
+        """
+        self.__transfer_client = transfer_client
+        self.__inactivity_time = inactivity_time
+        self.task_ids = dict(task_ids)
+        self.errors = dict(errors or {})
+        self.__tasks = {}
+        self.__progress = {ep: 0 for ep in self.task_ids.keys()}
+        self.__faults = {ep: 0 for ep in self.task_ids.keys()}
+        self.__error_timestamps = {ep: set() for ep in self.task_ids.keys()}
+
+    @property
+    def active(self):
+        """dict: ``source_ep: task_id`` pairs for the Transfers that have not finished."""
+        return {ep: task_id for ep, task_id in self.task_ids.items()
+                if self.__tasks.get(ep, {}).get("status") not in FINISHED_STATUSES}
+
+    @property
+    def done(self):
+        """bool: ``True`` if every Transfer has finished (as of the last status check)."""
+        return not self.active
+
+    def status(self, interactive=False):
+        """Check on every unfinished Transfer once.
+        New Transfer errors are printed when found.
+
+        Arguments:
+            interactive (bool): If ``True``, errors will prompt for continuation confirmation,
+                    and the user may cancel the Transfer with the error.
+                    **Default:** ``False``.
+
+        Returns:
+            dict: ``source_ep: task`` pairs, where ``task`` is the latest Transfer task document,
+            with ``success`` added when the Transfer has finished.
+        """
+        for ep, task_id in self.active.items():
+            task = self.__transfer_client.get_task(task_id).data
+            # Report new errors
+            if task.get("faults", 0) > self.__faults[ep]:
+                self.__faults[ep] = task["faults"]
+                for event in self.__transfer_client.task_event_list(task_id):
+                    if event["is_error"] and event["time"] not in self.__error_timestamps[ep]:
+                        self.__error_timestamps[ep].add(event["time"])
+                        print("Error: {} - {}".format(event["code"], event["description"]))
+                        # Allow user to abort transfer if interactive
+                        if (interactive and task["status"] not in FINISHED_STATUSES
+                                and not _confirm("Continue Transfer (y/n)?\n")):
+                            self.__transfer_client.cancel_task(task_id)
+                            break
+            # If progress has been made, move deadline forward
+            done = task.get("files_transferred", 0) + task.get("files_skipped", 0)
+            if done > self.__progress[ep] and task["status"] not in FINISHED_STATUSES:
+                self.__transfer_client.update_task(task_id, {
+                    "DATA_TYPE": "task",
+                    "deadline": str(_new_deadline(self.__inactivity_time))
+                })
+            self.__progress[ep] = done
+
+            if task["status"] in FINISHED_STATUSES:
+                task["success"] = (task["status"] == "SUCCEEDED")
+                if not task["success"]:
+                    print("Error transferring with endpoint '{}': {} - "
+                          "{}".format(ep, task["status"],
+                                      task.get("nice_status_short_description")))
+            self.__tasks[ep] = task
+        return dict(self.__tasks)
+
+    def wait(self, timeout=None, interval=DEFAULT_INTERVAL, verbose=True, interactive=False,
+             schedule=None):
+        """Wait for the Transfers to finish, checking on all of them together.
+        Progress is shown as a single bar covering every Transfer.
+
+        Arguments:
+            timeout (int): The maximum number of seconds to wait. The Transfers are not
+                    cancelled when the timeout is reached.
+                    **Default:** ``None``, to wait until every Transfer has finished.
+            interval (int): The maximum number of seconds to wait between checking
+                    Transfer status. **Default:** ``DEFAULT_INTERVAL``.
+            verbose (bool): If ``True``, a progress bar will be shown.
+                    **Default:** ``True``.
+            interactive (bool): If ``True``, errors will prompt for continuation confirmation,
+                    and the user may cancel the Transfers.
+                    If ``False``, errors are printed and the Transfers always continue.
+                    **Default:** ``False``.
+            schedule (iterable of float): The number of seconds to wait before each successive
+                    status check. Once exhausted, ``interval`` is used.
+                    **Default:** ``poll_schedule(interval)``, which starts sub-second and
+                    backs off to ``interval``.
+
+        Returns:
+            bool: ``True`` if every Transfer has finished, ``False`` if the timeout was reached.
+        """
+        start = time.monotonic()
+        delays = iter(schedule if schedule is not None else poll_schedule(interval))
+        with tqdm(desc="Transferring data", unit="files", disable=(not verbose)) as bar:
+            while not self.done:
+                failed = set(ep for ep, task in self.__tasks.items()
+                             if task.get("success") is False)
+                self.status(interactive=interactive)
+                # Allow cancellation of remaining Transfers if a Transfer has failed
+                newly_failed = set(ep for ep, task in self.__tasks.items()
+                                   if task.get("success") is False) - failed
+                if (interactive and newly_failed and self.active
+                        and not _confirm("Continue Transfer (y/n)?\n")):
+                    self.cancel()
+
+                # Update the combined progress display
+                summary = self.summary()
+                bar.total = summary["files"] or None
+                bar.n = summary["files_transferred"] + summary["files_skipped"]
+                bar.set_postfix_str("{} of {} transfers finished, {}B moved".format(
+                                        summary["succeeded"] + summary["failed"],
+                                        summary["transfers"],
+                                        tqdm.format_sizeof(summary["bytes_transferred"])))
+                bar.refresh()
+                if self.done:
+                    break
+                delay = next(delays, interval)
+                if timeout is not None:
+                    remaining = timeout - (time.monotonic() - start)
+                    if remaining <= 0:
+                        return False
+                    delay = min(delay, remaining)
+                time.sleep(delay)
+        return True
+
+    def cancel(self):
+        """Cancel every unfinished Transfer.
+
+        Returns:
+            list of str: The task IDs cancelled.
+        """
+        cancelled = []
+        for task_id in self.active.values():
+            self.__transfer_client.cancel_task(task_id)
+            cancelled.append(task_id)
+        return cancelled
+
+    def progress(self):
+        """Get per-Transfer progress, as of the last status check.
+
+        Returns:
+            dict: ``source_ep: progress`` pairs, where ``progress`` contains the
+            ``task_id``, ``status``, ``files``, ``files_transferred``, ``files_skipped``,
+            and ``bytes_transferred`` of the Transfer.
+        """
+        return {
+            ep: {
+                "task_id": task_id,
+                "status": self.__tasks.get(ep, {}).get("status"),
+                "files": self.__tasks.get(ep, {}).get("files", 0),
+                "files_transferred": self.__tasks.get(ep, {}).get("files_transferred", 0),
+                "files_skipped": self.__tasks.get(ep, {}).get("files_skipped", 0),
+                "bytes_transferred": self.__tasks.get(ep, {}).get("bytes_transferred", 0)
+            } for ep, task_id in self.task_ids.items()
+        }
+
+    def transferred_files(self):
+        """Yield every file transferred so far, for all Transfers.
+        Skipped files and directories are not included.
+
+        Yields:
+            dict: The ``source_ep``, ``task_id``, ``source_path``, and ``destination_path``
+            for each transferred file.
+        """
+        for ep, task_id in self.task_ids.items():
+            marker = None
+            while True:
+                if marker is not None:
+                    res = self.__transfer_client.task_successful_transfers(task_id,
+                                                                           marker=marker)
+                else:
+                    res = self.__transfer_client.task_successful_transfers(task_id)
+                for item in res["DATA"]:
+                    yield {
+                        "source_ep": ep,
+                        "task_id": task_id,
+                        "source_path": item["source_path"],
+                        "destination_path": item["destination_path"]
+                    }
+                marker = res.get("next_marker")
+                if not marker:
+                    break
+
+    def summary(self):
+        """Summarize the Transfers, as of the last status check.
+
+        Returns:
+            dict: The counts of ``transfers`` submitted, ``succeeded``, ``failed``
+            (including Transfers that could not be submitted), and ``active``, and the totals of
+            ``files``, ``files_transferred``, ``files_skipped``, and ``bytes_transferred``.
+        """
+        finished = [task for task in self.__tasks.values() if "success" in task]
+        succeeded = len([task for task in finished if task["success"]])
+        progress = self.progress().values()
+        return {
+            "transfers": len(self.task_ids) + len(self.errors),
+            "succeeded": succeeded,
+            "failed": len(finished) - succeeded + len(self.errors),
+            "active": len(self.active),
+            "files": sum(prog["files"] for prog in progress),
+            "files_transferred": sum(prog["files_transferred"] for prog in progress),
+            "files_skipped": sum(prog["files_skipped"] for prog in progress),
+            "bytes_transferred": sum(prog["bytes_transferred"] for prog in progress)
+        }
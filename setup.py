@@ -22,6 +22,10 @@ setup(
         "requests>=2.18.4",
         "tqdm>=4.19.4"
     ],
+    extras_require={
+        "parquet": ["pyarrow>=1.0.0"],
+        "pandas": ["pandas>=0.23.0"]
+    },
     python_requires=">=3.4",
     classifiers=[
         "Development Status :: 3 - Alpha",
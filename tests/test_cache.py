@@ -0,0 +1,63 @@
+import os
+import time
+
+from mdf_forge.cache import CACHE_NAME, SearchCache
+
+
+def test_search_cache(tmpdir):
+    cache = SearchCache(str(tmpdir))
+    assert os.path.exists(os.path.join(str(tmpdir), CACHE_NAME))
+    key = SearchCache.make_key("index", {"q": "mdf.source_name:foo", "limit": 10})
+    # Whitespace is normalized
+    assert key == SearchCache.make_key("index", {"q": " mdf.source_name:foo  ", "limit": 10})
+    assert key != SearchCache.make_key("index", {"q": "mdf.source_name:foo", "limit": 20})
+    assert key != SearchCache.make_key("other", {"q": "mdf.source_name:foo", "limit": 10})
+
+    assert cache.get(key) is None
+    cache.put(key, [{"a": 1}], source_names=["foo"])
+    assert cache.get(key) == [{"a": 1}]
+
+    # Persistent
+    assert SearchCache(str(tmpdir)).get(key) == [{"a": 1}]
+
+    # Invalidation by source
+    other_key = SearchCache.make_key("index", {"q": "bar", "limit": 10})
+    cache.put(other_key, [], source_names=["bar"])
+    cache.invalidate("foo")
+    assert cache.get(key) is None
+    assert cache.get(other_key) == []
+    cache.invalidate()
+    assert cache.get(other_key) is None
+
+
+def test_search_cache_ttl(tmpdir):
+    cache = SearchCache(str(tmpdir), ttl=0.1)
+    cache.put("key", "value")
+    assert cache.get("key") == "value"
+    time.sleep(0.2)
+    assert cache.get("key") is None
+    # Expired results are kept for when Search is unavailable
+    assert cache.get("key", allow_expired=True) == "value"
+
+
+def test_search_cache_lru(tmpdir):
+    cache = SearchCache(str(tmpdir), max_size=25)
+    cache.put("a", "x" * 8)
+    cache.put("b", "x" * 8)
+    # Using "a" makes "b" the least recently used
+    time.sleep(0.01)
+    cache.get("a")
+    cache.put("c", "x" * 8)
+    assert cache.get("a") is not None
+    assert cache.get("b") is None
+    assert cache.get("c") is not None
+
+
+def test_search_cache_versions(tmpdir):
+    cache = SearchCache(str(tmpdir))
+    cache.put("key", "value", source_names=["foo"])
+    assert cache.check_version("foo", 1) is False
+    assert cache.check_version("foo", 1) is False
+    assert cache.get("key") == "value"
+    assert cache.check_version("foo", 2) is True
+    assert cache.get("key") is None
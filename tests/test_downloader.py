@@ -0,0 +1,445 @@
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+import asyncio
+import hashlib
+import io
+import os
+import tarfile
+import threading
+import time
+
+import pytest
+
+from mdf_forge import Forge
+from mdf_forge.downloader import (amap, DownloadManifest, file_matches, HostScheduler,
+                                  HTTPDownloader)
+
+
+# Files served by the local test server
+test_files = {
+    "/test/test_fetch.txt": b"This is a test document for Forge testing. Please do not remove.\n",
+    "/test/test_multifetch.txt": (b"This is a second test document for Forge testing. "
+                                  b"Please do not remove.\n")
+}
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class FileHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.server.requests.append((self.path, dict(self.headers)))
+        # Refuse requests while throttled
+        if self.server.throttle > 0:
+            self.server.throttle -= 1
+            self.send_response(429)
+            self.send_header("Retry-After", "0")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = test_files.get(self.path)
+        if body is None:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        # Support "bytes=start-" ranges only
+        start = 0
+        if self.headers.get("Range"):
+            start = int(self.headers["Range"].split("=")[1].rstrip("-"))
+            if start >= len(body):
+                self.send_response(416)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", "bytes {}-{}/{}".format(start, len(body) - 1,
+                                                                      len(body)))
+        else:
+            self.send_response(200)
+        self.send_header("Content-Length", str(len(body) - start))
+        self.end_headers()
+        # Drop the connection partway through the body
+        if self.server.truncate:
+            self.wfile.write(body[start:start + self.server.truncate])
+            self.server.truncate = 0
+            self.close_connection = True
+            return
+        self.wfile.write(body[start:])
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), FileHandler)
+    httpd.requests = []
+    httpd.throttle = 0
+    httpd.truncate = 0
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def url_for(server, path):
+    return "http://127.0.0.1:{}{}".format(server.server_address[1], path)
+
+
+def run_async(coro):
+    # asyncio.run() is only available from Python 3.7
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+def test_download(server, tmpdir, capsys):
+    dl = HTTPDownloader()
+    files = [{
+        "url": url_for(server, path),
+        "local_path": os.path.join(str(tmpdir), os.path.basename(path))
+    } for path in test_files.keys()]
+    files.append({
+        "url": url_for(server, "/test/should_not_exist.txt"),
+        "local_path": os.path.join(str(tmpdir), "should_not_exist.txt")
+    })
+    statuses = dl.download(files, max_workers=3, verbose=False)
+
+    # Statuses are in input order
+    assert [s["url"] for s in statuses] == [f["url"] for f in files]
+    assert [s["success"] for s in statuses] == [True, True, False]
+    for path, body in test_files.items():
+        with open(os.path.join(str(tmpdir), os.path.basename(path)), "rb") as f:
+            assert f.read() == body
+
+    # Missing file
+    assert statuses[2]["status_code"] == 404
+    assert not os.path.exists(os.path.join(str(tmpdir), "should_not_exist.txt"))
+    assert not os.path.exists(os.path.join(str(tmpdir), "should_not_exist.txt.part"))
+    out, err = capsys.readouterr()
+    assert "Error 404 when attempting to access" in out
+
+
+def test_chunked_download(server, tmpdir):
+    test_files["/test/large.bin"] = os.urandom(100000)
+    dl = HTTPDownloader()
+    local_path = os.path.join(str(tmpdir), "large.bin")
+    written = []
+    try:
+        status = dl.fetch(url_for(server, "/test/large.bin"), local_path, chunk_size=4096,
+                          progress=written.append)
+        assert status["success"] is True
+        assert status["bytes"] == 100000
+        # Written in chunks, and moved into place once complete
+        assert max(written) <= 4096
+        assert sum(written) == 100000
+        assert not os.path.exists(local_path + ".part")
+        with open(local_path, "rb") as f:
+            assert f.read() == test_files["/test/large.bin"]
+    finally:
+        test_files.pop("/test/large.bin")
+
+
+def test_resume(server, tmpdir):
+    dl = HTTPDownloader()
+    body = test_files["/test/test_fetch.txt"]
+    local_path = os.path.join(str(tmpdir), "test_fetch.txt")
+    url = url_for(server, "/test/test_fetch.txt")
+
+    # Finish a partial file
+    with open(local_path + ".part", "wb") as f:
+        f.write(body[:10])
+    status = dl.fetch(url, local_path, resume=True, length=len(body))
+    assert status["success"] is True
+    assert status["status_code"] == 206
+    assert status["resumed_from"] == 10
+    assert status["bytes"] == len(body) - 10
+    assert server.requests[-1][1]["Range"] == "bytes=10-"
+    with open(local_path, "rb") as f:
+        assert f.read() == body
+
+    # Partial file that cannot be finished is restarted
+    with open(local_path + ".part", "wb") as f:
+        f.write(body + b"extra")
+    status = dl.fetch(url, local_path, resume=True)
+    assert status["success"] is True
+    assert status["status_code"] == 200
+    assert status["resumed_from"] == 0
+    with open(local_path, "rb") as f:
+        assert f.read() == body
+
+    # Without resume, partial files are ignored
+    with open(local_path + ".part", "wb") as f:
+        f.write(b"garbage")
+    status = dl.fetch(url, local_path)
+    assert status["status_code"] == 200
+    with open(local_path, "rb") as f:
+        assert f.read() == body
+
+    # Wrong length is an error
+    status = dl.fetch(url, local_path, length=5)
+    assert status["success"] is False
+    assert "Expected 5 bytes" in status["error"]
+    assert not os.path.exists(local_path + ".part")
+
+    # A file cut short is kept to finish later, if resuming
+    status = dl.fetch(url, local_path, length=len(body) + 5, resume=True)
+    assert status["success"] is False
+    assert os.path.getsize(local_path + ".part") == len(body)
+    status = dl.fetch(url, local_path, length=len(body) + 5)
+    assert not os.path.exists(local_path + ".part")
+
+    # A partial file is kept when resuming, even if the old one was not used
+    os.remove(local_path)
+    with open(local_path + ".part", "wb") as f:
+        f.write(b"garbage")
+    server.truncate = 10
+    status = dl.fetch(url, local_path, chunk_size=1, resume=True, restart=True)
+    assert status["success"] is False
+    assert "Range" not in server.requests[-1][1]
+    with open(local_path + ".part", "rb") as f:
+        assert f.read() == body[:10]
+
+
+def test_forge_resume(server, tmpdir):
+    forge = Forge(services=[], search_client=object())
+    body = test_files["/test/test_fetch.txt"]
+    url = url_for(server, "/test/test_fetch.txt")
+    record = {
+        "mdf": {"resource_type": "record"},
+        "files": [{"url": url, "length": len(body)}]
+    }
+    local_path = os.path.join(str(tmpdir), "test_fetch.txt")
+
+    # The first run fails partway through the file
+    server.truncate = 10
+    res = forge.http_download(record, dest=str(tmpdir), resume=True, verbose=False,
+                              chunk_size=1)
+    assert res["success"] is False
+    assert os.path.getsize(local_path + ".part") == 10
+
+    # The next run finishes it
+    res = forge.http_download(record, dest=str(tmpdir), resume=True, verbose=False)
+    assert res["success"] is True
+    assert res["files"][0]["resumed_from"] == 10
+    assert server.requests[-1][1]["Range"] == "bytes=10-"
+    with open(local_path, "rb") as f:
+        assert f.read() == body
+
+
+def test_manifest(server, tmpdir):
+    dl = HTTPDownloader()
+    body = test_files["/test/test_fetch.txt"]
+    url = url_for(server, "/test/test_fetch.txt")
+    missing_url = url_for(server, "/test/should_not_exist.txt")
+    manifest = DownloadManifest(str(tmpdir))
+    dl.download([{"url": url, "local_path": os.path.join(str(tmpdir), "test_fetch.txt"),
+                  "length": len(body)},
+                 {"url": missing_url,
+                  "local_path": os.path.join(str(tmpdir), "should_not_exist.txt")}],
+                manifest=manifest, verbose=False)
+
+    # Reload from disk
+    manifest = DownloadManifest(str(tmpdir))
+    entry = manifest.get(url)
+    assert entry["complete"] is True
+    assert entry["length"] == len(body)
+    assert entry["local_path"] == os.path.join(str(tmpdir), "test_fetch.txt")
+    assert manifest.get(missing_url)["complete"] is False
+    assert manifest.get("https://example.com/other.txt") is None
+
+
+def test_file_matches(tmpdir):
+    path = os.path.join(str(tmpdir), "file.txt")
+    with open(path, "wb") as f:
+        f.write(b"foobar")
+    sha512 = hashlib.sha512(b"foobar").hexdigest()
+    assert file_matches(path, length=6)
+    assert file_matches(path, sha512=sha512)
+    assert file_matches(path, length=6, sha512=sha512.upper())
+    assert not file_matches(path, length=7, sha512=sha512)
+    assert not file_matches(path, sha512=hashlib.sha512(b"baz").hexdigest())
+    # No information is not a match
+    assert not file_matches(path)
+    assert not file_matches(path + "x", length=6)
+
+
+def test_throttled(server, tmpdir):
+    dl = HTTPDownloader(max_retries=3)
+    url = url_for(server, "/test/test_fetch.txt")
+    local_path = os.path.join(str(tmpdir), "test_fetch.txt")
+
+    # Retried until the server accepts
+    server.throttle = 2
+    status = dl.fetch(url, local_path)
+    assert status["success"] is True
+    assert len(server.requests) == 3
+
+    # Give up after max_retries
+    server.throttle = 10
+    status = dl.fetch(url, local_path)
+    assert status["success"] is False
+    assert status["status_code"] == 429
+    assert len(server.requests) == 7
+
+
+def test_many_files(server, tmpdir):
+    dl = HTTPDownloader(rate_limit=None, host_concurrency=4)
+    files = [{
+        "url": url_for(server, "/test/test_fetch.txt"),
+        "local_path": os.path.join(str(tmpdir), "test_fetch{}.txt".format(i))
+    } for i in range(200)]
+    statuses = dl.download(files, max_workers=16, verbose=False)
+    assert all(status["success"] for status in statuses)
+    assert len(os.listdir(str(tmpdir))) == 200
+
+
+def test_host_scheduler():
+    # Rate limit
+    scheduler = HostScheduler(rate=20)
+    start = time.monotonic()
+    for i in range(5):
+        scheduler.wait()
+    assert time.monotonic() - start >= 0.19
+
+    # Back off
+    scheduler = HostScheduler(rate=None)
+    scheduler.backoff(0.2)
+    start = time.monotonic()
+    scheduler.wait()
+    assert time.monotonic() - start >= 0.19
+
+    # Concurrency
+    scheduler = HostScheduler(concurrency=2)
+    active = []
+    peak = []
+
+    def work():
+        with scheduler:
+            active.append(1)
+            peak.append(len(active))
+            time.sleep(0.05)
+            active.pop()
+
+    threads = [threading.Thread(target=work) for i in range(6)]
+    [t.start() for t in threads]
+    [t.join() for t in threads]
+    assert max(peak) <= 2
+
+
+def test_amap():
+    def slow(n):
+        time.sleep(n / 100)
+        return n * 2
+
+    async def collect(ordered):
+        res = []
+        async for item in amap(slow, [5, 1, 3], max_workers=3, ordered=ordered):
+            res.append(item)
+        return res
+
+    assert run_async(collect(True)) == [(0, 10), (1, 2), (2, 6)]
+    assert run_async(collect(False)) == [(1, 2), (2, 6), (0, 10)]
+
+
+def test_adownload(server, tmpdir):
+    dl = HTTPDownloader()
+    files = [{
+        "url": url_for(server, path),
+        "local_path": os.path.join(str(tmpdir), os.path.basename(path))
+    } for path in test_files.keys()]
+
+    async def collect():
+        res = []
+        async for item in dl.adownload(files, ordered=True):
+            res.append(item)
+        return res
+
+    res = run_async(collect())
+    assert [i for i, status in res] == [0, 1]
+    assert all(status["success"] for i, status in res)
+    for path, body in test_files.items():
+        with open(os.path.join(str(tmpdir), os.path.basename(path)), "rb") as f:
+            assert f.read() == body
+
+
+def test_read(server, capsys):
+    dl = HTTPDownloader()
+    body = test_files["/test/test_fetch.txt"]
+    assert dl.read(url_for(server, "/test/test_fetch.txt")) == body.decode()
+    assert dl.read(url_for(server, "/test/test_fetch.txt"), binary=True) == body
+    assert dl.read(url_for(server, "/test/should_not_exist.txt")) is None
+    out, err = capsys.readouterr()
+    assert "Error 404 when attempting to access" in out
+
+
+def test_open(server, capsys):
+    # Build a small tar archive to stream
+    archive = io.BytesIO()
+    with tarfile.open(fileobj=archive, mode="w:gz") as tar:
+        body = test_files["/test/test_fetch.txt"]
+        info = tarfile.TarInfo("test_fetch.txt")
+        info.size = len(body)
+        tar.addfile(info, io.BytesIO(body))
+    test_files["/test/archive.tar.gz"] = archive.getvalue()
+    dl = HTTPDownloader()
+    try:
+        with dl.open(url_for(server, "/test/archive.tar.gz")) as stream:
+            with tarfile.open(fileobj=stream, mode="r|*") as tar:
+                member = tar.next()
+                assert member.name == "test_fetch.txt"
+                assert tar.extractfile(member).read() == body
+    finally:
+        test_files.pop("/test/archive.tar.gz")
+
+    with dl.open(url_for(server, "/test/should_not_exist.txt")) as stream:
+        assert stream is None
+    out, err = capsys.readouterr()
+    assert "Error 404 when attempting to access" in out
+
+
+def test_session_reuse(server):
+    dl = HTTPDownloader()
+    url = url_for(server, "/test/test_fetch.txt")
+    assert dl.get(url).status_code == 200
+    assert dl.get(url).status_code == 200
+    assert dl._session("127.0.0.1:{}".format(server.server_address[1])) is \
+        dl._session("127.0.0.1:{}".format(server.server_address[1]))
+
+
+def test_unreachable(tmpdir, capsys):
+    dl = HTTPDownloader()
+    status = dl.fetch("http://127.0.0.1:1/nothing.txt", os.path.join(str(tmpdir), "nothing.txt"))
+    assert status["success"] is False
+    assert status["status_code"] is None
+    out, err = capsys.readouterr()
+    assert "Error when attempting to access" in out
+
+
+def test_forge_stream_close(server, tmpdir):
+    forge = Forge(services=[], search_client=object(), http_host_concurrency=1)
+    record = {
+        "mdf": {"resource_type": "record"},
+        "files": [{"url": url_for(server, path)} for path in test_files.keys()]
+    }
+    gen = forge.http_stream(record, binary=True)
+    res, file_info, stream = next(gen)
+    assert stream.read(4) == b"This"
+    # Closing the generator releases the host's only download slot
+    gen.close()
+    assert stream.closed
+    done = threading.Event()
+
+    def download():
+        forge.http_download(record, dest=str(tmpdir), verbose=False)
+        done.set()
+
+    threading.Thread(target=download, daemon=True).start()
+    assert done.wait(10)
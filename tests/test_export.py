@@ -0,0 +1,117 @@
+import json
+import os
+
+import pytest
+
+from mdf_forge.export import leaf_fields, RecordExporter, schema_fields
+from mdf_forge.schema import FieldIndex
+
+
+schema = {
+    "type": "object",
+    "properties": {
+        "mdf": {
+            "type": "object",
+            "properties": {
+                "source_name": {"type": "string"},
+                "scroll_id": {"type": "integer"}
+            }
+        },
+        "material": {
+            "type": "object",
+            "properties": {
+                "elements": {"type": "array", "items": {"type": "string"}}
+            }
+        },
+        "files": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "url": {"type": "string"},
+                    "length": {"type": "integer"}
+                }
+            }
+        },
+        "extra": {"type": "object"}
+    }
+}
+records = [
+    {
+        "mdf": {"source_name": "set_a", "scroll_id": 0},
+        "material": {"elements": ["Al", "Cu"]},
+        "files": [{"url": "https://example.com/0", "length": 10}],
+        "extra": {"temperature": 300}
+    },
+    {
+        "mdf": {"source_name": "set_b", "scroll_id": "1"}
+    },
+    {
+        "mdf": {"scroll_id": 2}
+    }
+]
+
+
+def test_fields():
+    assert leaf_fields(records) == ["extra.temperature", "files.length", "files.url",
+                                    "material.elements", "mdf.scroll_id", "mdf.source_name"]
+    assert schema_fields(FieldIndex(schema)) == ["extra", "files.length", "files.url",
+                                                 "material.elements", "mdf.scroll_id",
+                                                 "mdf.source_name"]
+
+
+def test_export_jsonl(tmpdir):
+    path = os.path.join(str(tmpdir), "records.jsonl")
+    with RecordExporter(path, format="jsonl") as exporter:
+        exporter.write(records[:2])
+        exporter.write(records[2:])
+    assert exporter.count == 3
+    assert exporter.files == [path]
+    with open(path) as f:
+        assert [json.loads(line) for line in f] == records
+
+    # Partitioned
+    path = os.path.join(str(tmpdir), "partitioned")
+    with RecordExporter(path, format="jsonl", partition_by="mdf.source_name") as exporter:
+        exporter.write(records)
+        exporter.write(records[:1])
+    assert [os.path.relpath(f, path) for f in exporter.files] == [
+        os.path.join("source_name=__HIVE_DEFAULT_PARTITION__", "part-0.jsonl"),
+        os.path.join("source_name=set_a", "part-0.jsonl"),
+        os.path.join("source_name=set_b", "part-0.jsonl")
+    ]
+    with open(os.path.join(path, "source_name=set_a", "part-0.jsonl")) as f:
+        assert len(f.readlines()) == 2
+
+    with pytest.raises(ValueError):
+        RecordExporter(path, format="csv")
+
+
+def test_export_parquet(tmpdir):
+    pytest.importorskip("pyarrow")
+    import pyarrow.parquet
+
+    # Types from the schema
+    path = os.path.join(str(tmpdir), "records.parquet")
+    with RecordExporter(path, field_index=FieldIndex(schema)) as exporter:
+        exporter.write(records[:1])
+        exporter.write(records[1:])
+    parquet = pyarrow.parquet.ParquetFile(path)
+    assert parquet.num_row_groups == 2
+    table = parquet.read()
+    assert str(table.schema.field("mdf.scroll_id").type) == "int64"
+    assert pyarrow.types.is_list(table.schema.field("files.url").type)
+    assert table.column("mdf.scroll_id").to_pylist() == [0, 1, 2]
+    assert table.column("material.elements").to_pylist() == [["Al", "Cu"], None, None]
+    assert json.loads(table.column("extra").to_pylist()[0]) == {"temperature": 300}
+
+    # Types from the first page, partitioned
+    path = os.path.join(str(tmpdir), "partitioned")
+    with RecordExporter(path, partition_by="mdf.source_name",
+                        columns=["mdf.source_name", "mdf.scroll_id", "files.length"]) as exporter:
+        exporter.write(records[:1])
+        exporter.write(records[1:])
+    assert len(exporter.files) == 3
+    table = pyarrow.parquet.read_table(os.path.join(path, "source_name=set_b"))
+    assert table.column("mdf.scroll_id").to_pylist() == [1]
+    assert table.column("files.length").to_pylist() == [None]
@@ -1,3 +1,4 @@
+import asyncio
 import os
 import re
 import types
@@ -5,7 +6,7 @@ import types
 import mdf_toolbox
 import pytest
 
-from mdf_forge import Forge
+from mdf_forge import Forge, TransferBatch
 
 
 #github specific declarations
@@ -416,8 +417,11 @@ def test_forge_fetch_datasets_from_results():
 
 def test_forge_http_download(capsys):
     # Simple case
-    f.http_download(example_result1)
+    res = f.http_download(example_result1)
     assert os.path.exists("./test_fetch.txt")
+    assert res["success"] is True
+    assert res["files"][0]["local_path"] == os.path.normpath("./test_fetch.txt")
+    assert res["files"][0]["status_code"] == 200
 
     # Test conflicting filenames
     f.http_download(example_result1)
@@ -435,8 +439,9 @@ def test_forge_http_download(capsys):
     os.remove(os.path.join(dest_path, "test", "test_fetch.txt"))
     os.rmdir(os.path.join(dest_path, "test"))
 
-    # With multiple files
-    f.http_download(example_result2, dest=dest_path)
+    # With multiple files, downloaded concurrently
+    res = f.http_download(example_result2, dest=dest_path, max_workers=2)
+    assert [status["success"] for status in res["files"]] == [True, True]
     assert os.path.exists(os.path.join(dest_path, "test_fetch.txt"))
     assert os.path.exists(os.path.join(dest_path, "test_multifetch.txt"))
     # assert os.path.exists(os.path.join(dest_path, "petrel_fetch.txt"))
@@ -456,13 +461,36 @@ def test_forge_http_download(capsys):
     # os.remove(os.path.join(dest_path, "petrel_fetch.txt"))
     # os.remove(os.path.join(dest_path, "petrel_multifetch.txt"))
 
-    # Too many files
-    assert f.http_download(list(range(10001)))["success"] is False
-    out, err = capsys.readouterr()
-    assert "Too many results supplied. Use globus_download()" in out
+    # Many results are allowed
+    res = f.http_download([example_result1] * 60, dest=dest_path, verbose=False)
+    assert res["success"] is True
+    assert len(res["files"]) == 60
+    for status in res["files"]:
+        os.remove(status["local_path"])
+
+    # Skip and resume files already downloaded
+    res = f.http_download(example_result1, dest=dest_path, skip_existing=True)
+    assert res["files"][0]["skipped"] is False
+    assert os.path.exists(os.path.join(dest_path, ".mdf_download_manifest.json"))
+    res = f.http_download(example_result1, dest=dest_path, skip_existing=True)
+    assert res["files"][0]["skipped"] is True
+    assert not os.path.exists(os.path.join(dest_path, "test_fetch(1).txt"))
+    with open(os.path.join(dest_path, "test_fetch.txt"), "rb") as fetched:
+        content = fetched.read()
+    with open(os.path.join(dest_path, "test_fetch.txt.part"), "wb") as partial:
+        partial.write(content[:10])
+    res = f.http_download(example_result1, dest=dest_path, resume=True)
+    assert res["files"][0]["resumed_from"] == 10
+    assert not os.path.exists(os.path.join(dest_path, "test_fetch(1).txt"))
+    with open(os.path.join(dest_path, "test_fetch.txt"), "rb") as fetched:
+        assert fetched.read() == content
+    os.remove(os.path.join(dest_path, "test_fetch.txt"))
+    os.remove(os.path.join(dest_path, ".mdf_download_manifest.json"))
 
     # "Missing" files
-    f.http_download(example_result_missing)
+    res = f.http_download(example_result_missing)
+    assert res["success"] is False
+    assert res["files"][0]["status_code"] == 404
     out, err = capsys.readouterr()
     assert not os.path.exists("./should_not_exist.txt")
     assert ("Error 404 when attempting to access "
@@ -508,6 +536,14 @@ def test_forge_globus_download():
     os.remove(os.path.join(dest_path, "test_fetch.txt"))
     os.remove(os.path.join(dest_path, "test_multifetch.txt"))
 
+    # Without waiting
+    batch = f.globus_download(example_result1, dest=dest_path, wait=False)
+    assert isinstance(batch, TransferBatch)
+    assert batch.wait(verbose=False)
+    assert batch.summary()["succeeded"] == 1
+    assert os.path.exists(os.path.join(dest_path, "test_fetch.txt"))
+    os.remove(os.path.join(dest_path, "test_fetch.txt"))
+
 
 def test_forge_http_stream(capsys):
     # Simple case
@@ -526,13 +562,21 @@ def test_forge_http_stream(capsys):
     assert next(res3) == "This is a test document for Forge testing. Please do not remove.\n"
     assert next(res3) == "This is a second test document for Forge testing. Please do not remove.\n"
 
-    # Too many results
-    res4 = f.http_stream(list(range(10001)))
-    assert next(res4)["success"] is False
-    out, err = capsys.readouterr()
-    assert "Too many results supplied. Use globus_download()" in out
+    # Many results are allowed
+    res4 = f.http_stream([example_result1] * 60)
+    assert len(list(res4)) == 60
+
+    # Byte streams
+    res5 = f.http_stream(example_result3, binary=True)
+    record, file_info, stream = next(res5)
+    assert record == example_result3
+    assert file_info == example_result3["files"][0]
+    assert stream.read() == b"This is a test document for Forge testing. Please do not remove.\n"
+    record, file_info, stream = next(res5)
+    assert file_info == example_result3["files"][1]
+    assert stream.read(4) == b"This"
     with pytest.raises(StopIteration):
-        next(res4)
+        next(res5)
 
     # "Missing" files
     assert next(f.http_stream(example_result_missing)) is None
@@ -542,6 +586,60 @@ def test_forge_http_stream(capsys):
             "'https://data.materialsdatafacility.org/test/should_not_exist.txt'") in out
 
 
+def run_async(coro):
+    # asyncio.run() is only available from Python 3.7
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+def test_forge_ahttp_download():
+    dest_path = os.path.expanduser("~/mdf")
+
+    async def collect(**kwargs):
+        res = []
+        async for status in f.ahttp_download(example_result2, dest=dest_path, **kwargs):
+            res.append(status)
+        return res
+
+    res = run_async(collect(ordered=True))
+    assert [status["success"] for status in res] == [True, True]
+    assert res[0]["local_path"] == os.path.join(dest_path, "test_fetch.txt")
+    assert res[1]["local_path"] == os.path.join(dest_path, "test_multifetch.txt")
+    os.remove(os.path.join(dest_path, "test_fetch.txt"))
+    os.remove(os.path.join(dest_path, "test_multifetch.txt"))
+
+    # Completion order
+    res = run_async(collect())
+    assert sorted(status["local_path"] for status in res) == [
+        os.path.join(dest_path, "test_fetch.txt"),
+        os.path.join(dest_path, "test_multifetch.txt")
+    ]
+    os.remove(os.path.join(dest_path, "test_fetch.txt"))
+    os.remove(os.path.join(dest_path, "test_multifetch.txt"))
+
+
+def test_forge_ahttp_stream():
+    async def collect(results, **kwargs):
+        res = []
+        async for item in f.ahttp_stream(results, **kwargs):
+            res.append(item)
+        return res
+
+    res = run_async(collect(example_result3, ordered=True))
+    assert res[0][0] == example_result3
+    assert res[0][1] == example_result3["files"][0]
+    assert res[0][2] == "This is a test document for Forge testing. Please do not remove.\n"
+    assert res[1][2] == ("This is a second test document for Forge testing. "
+                         "Please do not remove.\n")
+
+    # Missing files
+    res = run_async(collect(example_result_missing))
+    assert res[0][2] is None
+
+
 def test_forge_chaining():
     f.match_field("source_name", "cip")
     f.match_field("material.elements", "Al")
@@ -588,6 +686,14 @@ def test_get_dataset_version():
         f.get_dataset_version('notreal')
 
 
+def test_get_dataset_versions():
+    versions, info = f.get_dataset_versions(["oqmd", "notreal"], info=True)
+    assert versions["oqmd"] == f.get_dataset_version("oqmd")
+    assert versions["notreal"] is None
+    assert info["missing"] == ["notreal"]
+    assert info["ambiguous"] == []
+
+
 # def test_describe_field(capsys):
 #     f = Forge()
 #     # Basic usage (raw=True for ease of testing)
@@ -0,0 +1,108 @@
+import time
+
+import pytest
+
+from mdf_forge import LocalIndex, Query
+
+
+def make_record(source_name, scroll_id, elements, year, organizations=(), doi=None):
+    record = {
+        "mdf": {
+            "source_name": source_name,
+            "source_id": source_name + "_v1.1",
+            "scroll_id": scroll_id,
+            "resource_type": "record",
+            "organizations": list(organizations)
+        },
+        "material": {"elements": elements},
+        "dc": {"publicationYear": year}
+    }
+    if doi:
+        record["dc"]["identifier"] = {"identifier": doi, "identifierType": "DOI"}
+    return record
+
+
+records = [
+    make_record("set_a", 0, ["Fe", "O"], 2014, ["MDF Open"]),
+    make_record("set_a", 1, ["Fe", "O", "Al"], "2016", ["MDF Open", "NIST"]),
+    make_record("set_a", 2, ["Fe"], 2018),
+    make_record("set_b", 0, ["O", "H"], 2017, doi="10.1234/abc"),
+    make_record("set_b", 1, ["Fe", "O"], 2019)
+]
+
+
+def scroll_ids(results):
+    return [(rec["mdf"]["source_name"], rec["mdf"]["scroll_id"]) for rec in results]
+
+
+def test_local_index(tmpdir):
+    path = str(tmpdir.join("index.sqlite"))
+    index = LocalIndex(path)
+    assert index.add(records) == 5
+    assert len(index) == 5
+    # Records added again replace the old copies
+    assert index.add(records[:2]) == 2
+    assert len(index) == 5
+
+    assert scroll_ids(index.match_elements(["Fe", "O"]).match_years(start=2015, stop=2018)
+                      .search()) == [("set_a", 1)]
+    assert scroll_ids(index.match_elements(["Fe", "H"], match_all=False)
+                      .match_source_names("set_b_v1.1").search()) == [("set_b", 0), ("set_b", 1)]
+    assert scroll_ids(index.match_years([2014, "2019"]).search()) == [("set_a", 0), ("set_b", 1)]
+    assert scroll_ids(index.match_years(start=2017, inclusive=False).search()) == [
+        ("set_a", 2), ("set_b", 1)]
+    assert scroll_ids(index.match_organizations(["MDF Open", "NIST"]).search()) == [("set_a", 1)]
+    assert scroll_ids(index.match_dois("10.1234/abc").search()) == [("set_b", 0)]
+    assert len(index.match_resource_types("record").search()) == 5
+    assert index.match_source_names("set_c").search() == []
+
+    res, info = index.match_elements("Fe").search(limit=2, info=True)
+    assert len(res) == 2
+    assert info["total_query_matches"] == 4
+    assert res[1] == records[1]
+
+    # Query is kept if requested
+    index.match_elements("Al")
+    assert len(index.search(reset_query=False)) == 1
+    assert index.initialized
+    index.reset_query()
+    with pytest.raises(AttributeError):
+        index.search()
+    with pytest.raises(ValueError):
+        index.match_query(Query().match_titles("Title"))
+    with pytest.raises(ValueError):
+        index.match_elements("Fe").match_query(Query().match_titles("Title"))
+    # Nothing from an invalid query is added
+    assert len(index.search()) == 4
+    with pytest.raises(AttributeError):
+        index.match_years(start="last year")
+
+    # The same Query can be run on the index and on Search
+    query = Query().match_elements(["Fe", "O"]).match_years(start=2015, stop=2018)
+    index.match_source_names("set_b")
+    assert scroll_ids(index.search(query)) == [("set_a", 1)]
+    assert scroll_ids(index.search()) == [("set_b", 0), ("set_b", 1)]
+    assert scroll_ids(index.match_query(Query().match_source_names(["set_a", "set_b"]))
+                      .match_dois("10.1234/abc").search()) == [("set_b", 0)]
+    with pytest.raises(ValueError):
+        index.search(Query().match_field("material.elements", "Fe"))
+    with pytest.raises(ValueError):
+        index.search(Query("material.elements:Fe"))
+
+    # Index is saved to disk
+    index.close()
+    index = LocalIndex(path)
+    assert len(index) == 5
+    assert len(index.match_source_names("set_a").search()) == 3
+
+
+def test_local_index_speed():
+    index = LocalIndex()
+    index.add(make_record("set_{}".format(i % 50), i, ["Fe", "O"] if i % 7 else ["H"],
+                          2000 + i % 20) for i in range(20000))
+    start = time.perf_counter()
+    for _ in range(10):
+        res = index.match_elements("H").match_years(start=2005, stop=2006).search()
+    assert len(res) > 0
+    # Indexed queries stay fast on large indexes
+    assert (time.perf_counter() - start) / 10 < 0.05
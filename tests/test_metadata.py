@@ -0,0 +1,177 @@
+from http.server import BaseHTTPRequestHandler, HTTPServer
+import copy
+import json
+import threading
+
+import pytest
+import requests
+
+from mdf_forge import Forge
+from mdf_forge.metadata import MetadataCache
+
+
+# Metadata served by the local test server
+test_metadata = {
+    "/schemas/record": {"schema": {"properties": {"mdf": {"properties": {
+        "source_name": {"type": "string", "description": "The source name."}}}}}},
+    "/organizations/list": {"organization_list": ["MDF Open"]},
+    "/organizations/MDF%20Open": {"organization": {"canonical_name": "MDF Open",
+                                                   "description": "Open data."}}
+}
+
+
+class MetadataHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.requests.append((self.path, dict(self.headers)))
+        body = test_metadata.get(self.path)
+        if self.server.failing:
+            self.send_response(503)
+            body = {"error": "Unavailable"}
+        elif body is None:
+            self.send_response(404)
+            body = {"error": "Not found"}
+        elif self.headers.get("If-None-Match") == self.server.etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        else:
+            self.send_response(200)
+            self.send_header("ETag", self.server.etag)
+        data = json.dumps(body).encode()
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = HTTPServer(("127.0.0.1", 0), MetadataHandler)
+    httpd.requests = []
+    httpd.etag = '"v1"'
+    httpd.failing = False
+    httpd.stopped = False
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    if not httpd.stopped:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+def base_url(server):
+    return "http://127.0.0.1:{}".format(server.server_address[1])
+
+
+def test_metadata_cache(server, tmpdir):
+    url = base_url(server) + "/schemas/record"
+    cache = MetadataCache(str(tmpdir))
+    res = cache.get(url)
+    assert res["status_code"] == 200
+    assert res["json"] == test_metadata["/schemas/record"]
+    # Memoized, and copies are returned
+    res["json"]["schema"] = None
+    assert cache.get(url)["json"] == test_metadata["/schemas/record"]
+    assert len(server.requests) == 1
+    # Unless the JSON is shared
+    assert cache.get(url, copy_json=False)["json"] is cache.get(url, copy_json=False)["json"]
+
+    # Revalidated from disk
+    cache = MetadataCache(str(tmpdir))
+    assert cache.get(url)["json"] == test_metadata["/schemas/record"]
+    assert len(server.requests) == 2
+    assert server.requests[-1][1]["If-None-Match"] == '"v1"'
+
+    # Errors are not cached
+    missing = base_url(server) + "/schemas/missing"
+    assert cache.get(missing)["status_code"] == 404
+    assert cache.get(missing)["status_code"] == 404
+    assert len(server.requests) == 4
+
+    # Saved responses are used when the server fails
+    server.failing = True
+    res = MetadataCache(str(tmpdir)).get(url)
+    assert res["status_code"] == 200
+    assert res["json"] == test_metadata["/schemas/record"]
+    assert len(server.requests) == 5
+    assert MetadataCache().get(url)["status_code"] == 503
+    server.failing = False
+
+    # Saved responses are used offline
+    server.shutdown()
+    server.server_close()
+    server.stopped = True
+    assert MetadataCache(str(tmpdir)).get(url)["json"] == test_metadata["/schemas/record"]
+    with pytest.raises(requests.RequestException):
+        MetadataCache().get(url)
+
+
+def test_metadata_snapshot(server, tmpdir, capsys):
+    f = Forge(services=[], search_client=object())
+    f._schemas_url = base_url(server) + "/schemas/"
+    f._organizations_url = base_url(server) + "/organizations/"
+    path = str(tmpdir.join("snapshot.json"))
+    urls = f.export_metadata(path, resource_types=["record"])
+    assert len(urls) == 3
+
+    # Imported metadata is used without contacting the server
+    server.requests = []
+    f2 = Forge(services=[], search_client=object())
+    f2._schemas_url = f._schemas_url
+    f2._organizations_url = f._organizations_url
+    assert f2.import_metadata(path) == urls
+    res = f2.describe_field("record", field="mdf.source_name", raw=True)
+    assert res["success"] is True
+    assert res["schema"]["type"] == "string"
+    res = f2.describe_organization("MDF Open", raw=True)
+    assert res["organization"]["description"] == "Open data."
+    f2.describe_organization("MDF Open", summary=True)
+    f2.describe_organization("MDF Open", summary=True)
+    out, err = capsys.readouterr()
+    assert out.count("MDF Open") == 2
+    assert server.requests == []
+
+    with open(path, "w") as snapshot:
+        json.dump({"snapshot_version": 0, "entries": []}, snapshot)
+    with pytest.raises(ValueError):
+        f2.import_metadata(path)
+
+
+def test_describe_field(server, capsys, monkeypatch):
+    f = Forge(services=[], search_client=object())
+    f._schemas_url = base_url(server) + "/schemas/"
+    res = f.describe_field("record", field="mdf.source_name", raw=True)
+    assert res["success"] is True
+    assert res["status_code"] == 200
+    assert res["schema"] == {"type": "string", "description": "The source name."}
+    # Copies are returned
+    res["schema"]["type"] = None
+    assert f.describe_field("record", field="mdf.source_name", raw=True)["schema"]["type"] \
+        == "string"
+    # Only the field is copied, not the whole schema
+    copied = []
+    deepcopy = copy.deepcopy
+    monkeypatch.setattr(copy, "deepcopy", lambda obj: copied.append(obj) or deepcopy(obj))
+    f.describe_field("record", field="mdf.source_name", raw=True)
+    assert copied == [{"type": "string", "description": "The source name."}]
+    monkeypatch.undo()
+
+    res = f.describe_field("record", field="mdf.foo.bar", raw=True)
+    assert res["success"] is False
+    assert res["error"] == ("Error: Field 'foo' (from 'mdf.foo.bar') not found in schema for "
+                            "resource_type 'record'")
+    f.describe_field("record", field="mdf.foo")
+    out, err = capsys.readouterr()
+    assert "Error: Field 'foo' (from 'mdf.foo') not found" in out
+    assert f.describe_field("missing", raw=True)["status_code"] == 404
+
+    assert f.list_fields("record") == ["mdf", "mdf.source_name"]
+    assert f.list_fields("record", "*.source_name") == ["mdf.source_name"]
+    assert f.validate_fields(["mdf.source_name", "mdf.foo"], resource_types=["record"]) \
+        == ["mdf.foo"]
+    # The schema is only fetched once
+    assert len([req for req in server.requests if req[0] == "/schemas/record"]) == 1
+    with pytest.raises(ValueError):
+        f.list_fields("missing")
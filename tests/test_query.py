@@ -0,0 +1,140 @@
+import pytest
+
+from mdf_forge import Forge, Query
+from mdf_forge.query import compact_terms, field_values, or_batches, quote_value
+
+
+def test_quote_value():
+    assert quote_value("oqmd") == "oqmd"
+    assert quote_value("foo bar") == '"foo bar"'
+    assert quote_value("10.1234/abc") == '"10.1234/abc"'
+    # Already quoted, or ranges
+    assert quote_value('"foo bar"') == '"foo bar"'
+    assert quote_value("[1 TO 5]") == "[1 TO 5]"
+    assert quote_value(5) == "5"
+
+
+def test_or_batches():
+    batches = list(or_batches("mdf.source_name", ["a", "b c"]))
+    assert batches == [('(mdf.source_name:a OR mdf.source_name:"b c")', ["a", "b c"])]
+
+    batches = list(or_batches("mdf.source_name", ["a"], base="mdf.resource_type:dataset"))
+    assert batches == [("(mdf.resource_type:dataset) AND (mdf.source_name:a)", ["a"])]
+
+    # Split under the limit, keeping every value
+    names = ["source_{}".format(i) for i in range(100)]
+    batches = list(or_batches("mdf.source_name", names, base="mdf.resource_type:dataset",
+                              limit=200))
+    assert len(batches) > 1
+    assert all(len(query) <= 200 for query, batch in batches)
+    assert [name for query, batch in batches for name in batch] == names
+    # As few queries as possible
+    assert all(len(query) + len(" OR mdf.source_name:source_00") > 200
+               for query, batch in batches[:-1])
+
+    # Values longer than the limit are still matched
+    assert list(or_batches("f", ["x" * 20], limit=10)) == [("(f:" + "x" * 20 + ")", ["x" * 20])]
+    assert list(or_batches("f", [])) == []
+
+
+def test_query():
+    base = Query().match_source_names("oqmd_v1.1")
+    query = base.match_elements(["Fe", "O"]).match_years(start=2015, stop=2018)
+    # Each helper returns a new query
+    assert base.q == "(mdf.source_name:oqmd)"
+    assert query.q == ("(mdf.source_name:oqmd) AND (material.elements:Fe AND "
+                       "material.elements:O) AND (dc.publicationYear:[2015 TO 2018])")
+    assert query.advanced
+    assert str(query) == query.q
+    with pytest.raises(AttributeError):
+        query.advanced = False
+    with pytest.raises(AttributeError):
+        query._q = ""
+
+    # Equal queries have equal hashes
+    assert query == Query().match_source_names("oqmd").match_elements(["Fe", "O"]).match_years(
+                        start="2015", stop="2018")
+    assert query != base
+    assert len({query, base, base.match_elements(["Fe", "O"]).match_years(start=2015,
+                                                                          stop=2018)}) == 2
+    assert Query("a OR b", advanced=True).q == "(a OR b)"
+
+    assert not Query().initialized
+    assert Query().match_elements([]).q == ""
+    assert Query("mdf.source_name:a OR mdf.source_name:b").match_field("x", 1).q == (
+        "(mdf.source_name:a OR mdf.source_name:b AND x:1)")
+    assert (Query().match_field("x", "a b").exclude_range("y", 1, None).match_not_exists("z")
+            .q == '(x:"a b" AND  NOT y:[1 TO *] AND  NOT z:*)')
+
+
+def test_query_matches_forge():
+    # Query builds exactly the same queries as Forge
+    def check(build):
+        forge = build(Forge(services=[], search_client=object()))
+        query = build(Query())
+        assert forge.current_query() == query.q
+        assert forge._SearchHelper__query["advanced"] == query.advanced
+        # Forge can also add a Query to its own query
+        assert (Forge(services=[], search_client=object()).match_query(query)
+                .current_query() == query.q)
+
+    check(lambda q: q.match_source_names(["a_v1.1", "b"]).match_records("c_v2", [1, 2]))
+    check(lambda q: q.match_elements(["Fe", "O"], match_all=False).match_titles("A title"))
+    check(lambda q: q.match_years([2015, "2016"]).match_resource_types(["record", "dataset"]))
+    check(lambda q: q.match_years(start=2010, inclusive=False).match_dois("10.1/a"))
+    check(lambda q: q.match_organizations(["MDF Open", "NIST"]).match_years([]))
+    check(lambda q: q.match_field("a.b", "x y").match_range("c", 1, 2, required=False)
+          .match_exists("d", new_group=True).exclude_field("e", "f").match_source_names("g"))
+
+    forge = Forge(services=[], search_client=object()).match_elements("Fe")
+    query = forge.to_query()
+    assert query == Query().match_elements("Fe")
+    assert forge.current_query() == query.q
+    # Later changes to the query do not change the Query
+    forge.match_source_names("a")
+    assert query.q == "(material.elements:Fe)"
+
+
+def test_compact_terms():
+    assert compact_terms(["a", "b c", "a"]) == ["a", '"b c"']
+    assert (compact_terms([5, 1, 2, 3, 4, 7, 9, 10, 3], ranges=True)
+            == ["[1 TO 5]", "7", "9", "10"])
+    # Ranges are only used for integers
+    assert compact_terms(["1", "2", "3"], ranges=True) == ["1", "2", "3"]
+
+    assert field_values('(mdf.source_name:a) AND (mdf.source_name:(b OR "c d"))',
+                        "mdf.source_name") == ["a", "b", "c d"]
+    assert field_values("(mdf.source_name:a)", "mdf.scroll_id") == []
+
+
+def test_query_split():
+    query = Query().match_records("src", list(range(0, 100, 2)))
+    # Consecutive values are compacted, and other values matched in one group
+    assert Query().match_records("src", list(range(10))).q == (
+        "(mdf.source_name:src) AND (mdf.scroll_id:[0 TO 9])")
+    assert query.q.startswith("(mdf.source_name:src) AND (mdf.scroll_id:(0 OR 2 OR 4")
+    assert query.split() == [query]
+
+    parts = query.split(100)
+    assert len(parts) > 1
+    assert all(len(part.q) <= 100 for part in parts)
+    assert all(part.q.startswith("(mdf.source_name:src) AND (mdf.scroll_id:") for part in parts)
+    assert [val for part in parts for val in field_values(part.q, "mdf.scroll_id")] == [
+        str(i) for i in range(0, 100, 2)]
+
+    # Several groups are split in turn, keeping the rest of the query
+    query = (Query().match_source_names(["src_{}".format(i) for i in range(20)])
+             .match_elements("Fe").match_years(list(range(1990, 2020, 2))))
+    parts = query.split(200)
+    assert all(len(part.q) <= 200 for part in parts)
+    assert all("(material.elements:Fe)" in part.q for part in parts)
+    combos = {(name, year) for part in parts
+              for name in field_values(part.q, "mdf.source_name")
+              for year in field_values(part.q, "dc.publicationYear")}
+    assert len(combos) == 20 * 15
+    # Split queries can be split again
+    assert all(subpart.q == part.q for part in parts for subpart in part.split(200))
+
+    # Queries without groups are not split
+    query = Query().match_field("x", "a" * 200)
+    assert query.split(100) == [query]
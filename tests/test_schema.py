@@ -0,0 +1,63 @@
+from mdf_forge.schema import FieldIndex
+
+
+schema = {
+    "type": "object",
+    "properties": {
+        "mdf": {
+            "type": "object",
+            "properties": {
+                "source_name": {"type": "string"},
+                "scroll_id": {"type": "integer"}
+            }
+        },
+        "material": {
+            "type": "object",
+            "properties": {
+                "elements": {"type": "array", "items": {"type": "string"}},
+                "composition": {"type": "string"}
+            }
+        },
+        "files": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "url": {"type": "string"},
+                    "length": {"type": "integer"}
+                }
+            }
+        }
+    }
+}
+
+
+def test_field_index():
+    index = FieldIndex(schema)
+    assert len(index) == 9
+    assert "mdf.source_name" in index
+    assert "mdf.foo" not in index
+    assert index.get("mdf.scroll_id") == {"type": "integer"}
+    assert index.get(None) == schema
+    assert index.get("mdf.foo") is None
+
+    # Array items are indexed by the array path
+    assert index.get("files.url") == {"type": "string"}
+    assert index.type_of("files") == "object"
+    assert index.type_of("material.elements") == "string"
+    assert index.type_of("mdf") == "object"
+    assert index.type_of("mdf.foo") is None
+
+    assert index.missing_part("mdf.foo.bar") == "foo"
+    assert index.missing_part("foo") == "foo"
+    assert index.missing_part("mdf.source_name") is None
+
+
+def test_field_index_fields():
+    index = FieldIndex(schema)
+    assert index.fields()[:3] == ["files", "files.length", "files.url"]
+    assert index.fields("material.") == ["material.composition", "material.elements"]
+    assert index.fields("mdf") == ["mdf", "mdf.scroll_id", "mdf.source_name"]
+    assert index.fields("*.url") == ["files.url"]
+    assert index.fields("*.s*") == ["mdf.scroll_id", "mdf.source_name"]
+    assert index.fields("foo") == []
@@ -0,0 +1,609 @@
+import functools
+import re
+import threading
+import types
+
+import pytest
+
+from mdf_forge import Forge, Query, ResultTable
+import mdf_forge.forge
+import mdf_forge.query
+
+
+# Tokens of the Globus Search query syntax that Forge generates
+TOKEN_RE = re.compile(r'\(|\)|"[^"]*"|\[[^\]]*\]|[^\s()"\[]+')
+
+
+def get_values(record, field):
+    """Get every value of a dotted field path from a record."""
+    values = [record]
+    for key in field.split("."):
+        next_values = []
+        for val in values:
+            if isinstance(val, dict) and key in val:
+                val = val[key]
+                next_values.extend(val if isinstance(val, list) else [val])
+        values = next_values
+    return values
+
+
+def value_matches(values, raw):
+    """Check if any of the values match a raw query value."""
+    for op in (">=", "<=", ">", "<"):
+        if raw.startswith(op):
+            bound = float(raw[len(op):])
+            return any({">=": v >= bound, "<=": v <= bound,
+                        ">": v > bound, "<": v < bound}[op] for v in values)
+    if raw.startswith("["):
+        start, stop = raw[1:-1].split(" TO ")
+        return any((start == "*" or v >= float(start)) and (stop == "*" or v <= float(stop))
+                   for v in values)
+    if raw == "*":
+        return bool(values)
+    raw = raw.strip('"')
+    return any(str(v) == raw for v in values)
+
+
+class QueryParser:
+    """Evaluate a Search query against a record."""
+    def __init__(self, q):
+        self.tokens = TOKEN_RE.findall(q)
+
+    def matches(self, record):
+        self.pos = 0
+        self.record = record
+        return self.or_expr()
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def take(self):
+        self.pos += 1
+        return self.tokens[self.pos - 1]
+
+    def or_expr(self):
+        res = self.and_expr()
+        while self.peek() == "OR":
+            self.take()
+            res = self.and_expr() or res
+        return res
+
+    def and_expr(self):
+        res = self.not_expr()
+        while self.peek() == "AND":
+            self.take()
+            res = self.not_expr() and res
+        return res
+
+    def not_expr(self):
+        if self.peek() == "NOT":
+            self.take()
+            return not self.not_expr()
+        return self.atom()
+
+    def atom(self):
+        token = self.take()
+        if token == "(":
+            res = self.or_expr()
+            self.take()
+            return res
+        field, sep, raw = token.partition(":")
+        if not sep:
+            return raw == "*" or token.strip('"') in str(self.record)
+        values = get_values(self.record, field)
+        if raw:
+            return value_matches(values, raw)
+        # Value is the next token, or a group of values
+        if self.peek() == "(":
+            self.take()
+            res = False
+            while self.peek() != ")":
+                token = self.take()
+                if token != "OR":
+                    res = value_matches(values, token) or res
+            self.take()
+            return res
+        return value_matches(values, self.take())
+
+
+class FakeSearchClient:
+    """Answers Search queries from a list of records.
+    Like Globus Search, at most ``max_results`` records are returned from a single query.
+    """
+    def __init__(self, records, max_results=10000):
+        self.records = records
+        self.max_results = max_results
+        self.queries = []
+
+    def post_search(self, index, query):
+        self.queries.append(query)
+        parser = QueryParser(query["q"])
+        matches = [rec for rec in self.records if parser.matches(rec)]
+        for sort in reversed(query.get("sort", [])):
+            matches.sort(key=lambda rec: get_values(rec, sort["field_name"])[0],
+                         reverse=(sort.get("order") == "desc"))
+        offset = query.get("offset", 0)
+        limit = min(query.get("limit", 10), self.max_results)
+        res = {
+            "gmeta": [{"entries": [{"content": rec}]}
+                      for rec in matches[offset:offset+limit]],
+            "total": len(matches)
+        }
+        if query.get("facets"):
+            res["facet_results"] = []
+            for facet in query["facets"]:
+                counts = {}
+                for rec in matches:
+                    for value in set(get_values(rec, facet["field_name"])):
+                        counts[str(value)] = counts.get(str(value), 0) + 1
+                buckets = sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+                res["facet_results"].append({
+                    "name": facet["name"],
+                    "buckets": [{"value": value, "count": count}
+                                for value, count in buckets[:facet.get("size", 10)]]
+                })
+        return res
+
+
+def make_record(source_name, scroll_id, **extra):
+    record = {
+        "mdf": {
+            "source_name": source_name,
+            "source_id": source_name + "_v1.1",
+            "scroll_id": scroll_id,
+            "resource_type": "record"
+        }
+    }
+    record.update(extra)
+    return record
+
+
+def make_records():
+    records = [make_record("big_set", i) for i in range(45)]
+    records.extend(make_record("small_set", i) for i in range(5))
+    return records
+
+
+@pytest.fixture
+def forge(monkeypatch):
+    # Aggregate with a small result limit so scrolling can be tested locally
+    monkeypatch.setattr(mdf_forge.forge, "SEARCH_LIMIT", 10)
+    client = FakeSearchClient(make_records(), max_results=10)
+    return Forge(services=[], search_client=client)
+
+
+def test_fake_search(forge):
+    # The fake client understands the queries Forge builds
+    res = forge.match_source_names("small_set").search()
+    assert len(res) == 5
+    res, info = forge.match_source_names(["small_set", "big_set"]).search(limit=0, info=True)
+    assert info["total_query_matches"] == 50
+    assert len(forge.search("mdf.scroll_id:>=40", advanced=True)) == 5
+
+
+def test_aggregate(forge):
+    res = forge.aggregate_sources("big_set")
+    assert isinstance(res, list)
+    assert sorted(rec["mdf"]["scroll_id"] for rec in res) == list(range(45))
+
+    # Several sources with overlapping scroll_ids
+    res = forge.aggregate_sources(["big_set", "small_set"])
+    assert len(res) == 50
+    assert len(set((rec["mdf"]["source_name"], rec["mdf"]["scroll_id"]) for rec in res)) == 50
+
+    # Small results do not need to scroll
+    assert len(forge.aggregate("mdf.source_name:small_set")) == 5
+
+
+def test_iter_aggregate(forge):
+    client = forge._SearchHelper__search_client
+    res = forge.iter_aggregate_sources("big_set")
+    assert isinstance(res, types.GeneratorType)
+    # Query is captured and reset immediately
+    assert not forge.initialized
+    assert client.queries == []
+
+    # Records are fetched one page at a time
+    first = next(res)
+    assert first["mdf"]["source_name"] == "big_set"
+    assert len(client.queries) == 2
+    assert len(list(res)) == 44
+
+    # Pages
+    pages = list(forge.match_source_names("big_set").iter_aggregate(pages=True))
+    assert [len(page) for page in pages] == [10, 10, 10, 10, 5]
+
+    res = forge.match_source_names("small_set").aggregate(stream=True)
+    assert isinstance(res, types.GeneratorType)
+    assert len(list(res)) == 5
+
+    with pytest.raises(AttributeError):
+        forge.iter_aggregate()
+
+
+def test_as_table(forge):
+    table = forge.aggregate_sources("big_set", as_table=True)
+    assert isinstance(table, ResultTable)
+    assert len(table) == 45
+    assert sorted(table["mdf.scroll_id"]) == list(range(45))
+
+    table, info = forge.match_source_names("small_set").search(
+                    info=True, as_table=True, columns=["mdf.scroll_id"])
+    assert table.columns == ["mdf.scroll_id"]
+    assert len(table) == info["total_query_matches"] == 5
+    assert table.record(0)["mdf"]["source_name"] == "small_set"
+
+    with pytest.raises(AttributeError):
+        forge.aggregate("mdf.source_name:small_set", stream=True, as_table=True)
+
+
+def test_fields(forge):
+    res = forge.aggregate_sources("big_set", fields=["mdf.scroll_id"])
+    assert len(res) == 45
+    assert all(list(rec.keys()) == ["mdf"] and list(rec["mdf"].keys()) == ["scroll_id"]
+               for rec in res)
+    res = forge.aggregate_sources(["big_set", "small_set"], max_workers=2,
+                                  fields=["mdf.source_name"])
+    assert len(res) == 50
+    assert res[0] == {"mdf": {"source_name": res[0]["mdf"]["source_name"]}}
+
+    res, info = forge.match_source_names("small_set").search(info=True, fields=["mdf.source_id"])
+    assert res[0] == {"mdf": {"source_id": "small_set_v1.1"}}
+    assert info["total_query_matches"] == 5
+
+    table = forge.aggregate("mdf.source_name:small_set", as_table=True, fields=["mdf"])
+    assert sorted(table["mdf.scroll_id"]) == list(range(5))
+
+
+def test_export_records(forge, tmpdir):
+    client = forge._SearchHelper__search_client
+    path = str(tmpdir.join("out"))
+    res = forge.export_records("mdf.source_name:big_set OR mdf.source_name:small_set", path,
+                               format="jsonl", partition_by="mdf.source_name")
+    assert res["records"] == 50
+    assert [f[len(path)+1:] for f in res["files"]] == ["source_name=big_set/part-0.jsonl",
+                                                       "source_name=small_set/part-0.jsonl"]
+    with open(res["files"][0]) as f:
+        assert len(f.readlines()) == 45
+
+    # Records given directly are not searched for
+    records = forge.aggregate_sources("small_set")
+    client.queries = []
+    path = str(tmpdir.join("out.jsonl"))
+    assert forge.export_records(iter(records), path, format="jsonl")["files"] == [path]
+    assert client.queries == []
+
+    pytest.importorskip("pyarrow")
+    import pyarrow.parquet
+    path = str(tmpdir.join("out.parquet"))
+    res = forge.match_source_names("big_set").export_records(None, path, resource_type=None)
+    assert res["records"] == 45
+    table = pyarrow.parquet.read_table(path)
+    assert sorted(table.column("mdf.scroll_id").to_pylist()) == list(range(45))
+
+
+def test_build_local_index(forge):
+    client = forge._SearchHelper__search_client
+    index = forge.build_local_index(["big_set", "small_set"])
+    assert len(index) == 50
+    client.queries = []
+    res = index.match_source_names("small_set").match_resource_types("record").search()
+    assert sorted(rec["mdf"]["scroll_id"] for rec in res) == list(range(5))
+    assert client.queries == []
+
+
+def test_search_many(forge, monkeypatch):
+    client = forge._SearchHelper__search_client
+    post_search = client.post_search
+
+    def failing_search(index, query):
+        if "fail" in query["q"]:
+            raise RuntimeError("Search failed")
+        return post_search(index, query)
+    monkeypatch.setattr(client, "post_search", failing_search)
+
+    builder = Forge(services=[], search_client=client).match_source_names("small_set")
+    forge.match_source_names("big_set")
+    res = forge.search_many(["mdf.scroll_id:>=40", "mdf.source_name:fail", builder,
+                             "mdf.source_name:small_set AND mdf.scroll_id:<2"], max_workers=4)
+    assert [r["success"] for r in res] == [True, False, True, True]
+    assert [len(r["results"]) for r in res] == [5, 0, 5, 2]
+    assert res[0]["info"]["total_query_matches"] == 5
+    assert res[1]["info"] is None
+    assert "Search failed" in res[1]["error"]
+    assert res[2]["query"] == builder.current_query()
+    # The current query is not used or changed
+    assert forge.current_query() == "(mdf.source_name:big_set)"
+
+    empty = Forge(services=[], search_client=client)
+    res = forge.search_many([empty], limit=1)
+    assert not res[0]["success"]
+    assert forge.search_many([]) == []
+
+
+def test_query_objects(forge):
+    client = forge._SearchHelper__search_client
+    # One shared client runs queries from many threads
+    base = Query().match_source_names("big_set")
+    queries = [base.match_range("mdf.scroll_id", i * 5, i * 5 + 4) for i in range(9)]
+    res = forge.search_many(queries + [Query()], max_workers=8)
+    assert [len(r["results"]) for r in res] == [5] * 9 + [0]
+    assert not res[-1]["success"]
+    assert all(r["query"] == q.q for r, q in zip(res, queries))
+    assert not forge.initialized
+
+    assert len(forge.search(Query().match_source_names("small_set"))) == 5
+    assert len(forge.aggregate(base)) == 45
+    assert client.queries[-1]["advanced"]
+
+
+def test_iter_search(forge, monkeypatch):
+    client = forge._SearchHelper__search_client
+    monkeypatch.setattr(mdf_forge.forge, "SEARCH_LIMIT", 40)
+    client.queries = []
+    res = list(forge.match_source_names("big_set").iter_search(page_size=7, prefetch=3))
+    assert not forge.initialized
+    # Only the first SEARCH_LIMIT results, in order
+    assert [rec["mdf"]["scroll_id"] for rec in res] == list(range(40))
+    assert sorted(sent.get("offset", 0) for sent in client.queries) == list(range(0, 40, 7))
+    assert all(sent["limit"] <= 7 for sent in client.queries)
+
+    # Pages, with the same information as search()
+    query = Query().match_source_names("small_set")
+    pages = list(forge.iter_search(query, page_size=2, pages=True, info=True))
+    assert [len(page) for page, info in pages] == [2, 2, 1]
+    assert all(info["total_query_matches"] == 5 for page, info in pages)
+    assert [info.get("offset", 0) for page, info in pages] == [0, 2, 4]
+    assert set(pages[0][1]) == set(forge.search(query, info=True)[1])
+    res = list(forge.iter_search(query, page_size=2, info=True, fields=["mdf.scroll_id"]))
+    assert res[4] == ({"mdf": {"scroll_id": 4}}, pages[2][1])
+
+    res = list(forge.iter_search("mdf.source_name:big_set", advanced=True, page_size=5,
+                                 prefetch=0, limit=12))
+    assert [rec["mdf"]["scroll_id"] for rec in res] == list(range(12))
+
+    # The next page is requested before the first page is used
+    requested = threading.Event()
+    post_search = client.post_search
+
+    def watched_search(index, query):
+        if query.get("offset"):
+            requested.set()
+        return post_search(index, query)
+    monkeypatch.setattr(client, "post_search", watched_search)
+    gen = forge.iter_search(query, page_size=2, prefetch=1, pages=True)
+    assert len(next(gen)) == 2
+    assert requested.wait(2)
+    gen.close()
+    monkeypatch.setattr(client, "post_search", post_search)
+
+    # Stopping early does not fetch every page
+    client.queries = []
+    gen = forge.iter_search("mdf.resource_type:record", advanced=True, page_size=5, prefetch=1,
+                            pages=True)
+    assert len(next(gen)) == 5
+    gen.close()
+    assert len(client.queries) <= 3
+
+    with pytest.raises(AttributeError):
+        forge.iter_search()
+
+
+def test_count_and_facets(forge):
+    client = forge._SearchHelper__search_client
+    client.records.append(make_record("small_set", 5, material={"elements": ["Fe", "O"]}))
+    client.queries = []
+    assert forge.match_source_names(["big_set", "small_set"]).count() == 51
+    assert not forge.initialized
+    assert forge.count(Query().match_elements("Fe")) == 1
+    # No records are fetched
+    assert all(sent["limit"] == 0 for sent in client.queries)
+
+    facets = forge.match_resource_types("record").facets(["mdf.source_name",
+                                                          "material.elements"])
+    assert not forge.initialized
+    assert facets == {
+        "mdf.source_name": {"big_set": 45, "small_set": 6},
+        "material.elements": {"Fe": 1, "O": 1}
+    }
+    assert list(facets["mdf.source_name"]) == ["big_set", "small_set"]
+    assert client.queries[-1]["limit"] == 0
+
+    facets, info = forge.facets("material.elements", q=Query().match_source_names("small_set"),
+                                size=1, info=True)
+    assert facets == {"material.elements": {"Fe": 1}}
+    assert info["total_query_matches"] == 6
+    assert info["query"] == "(mdf.source_name:small_set)"
+
+    with pytest.raises(AttributeError):
+        forge.facets("mdf.source_name")
+
+
+def test_split_queries(forge, monkeypatch):
+    client = forge._SearchHelper__search_client
+    monkeypatch.setattr(mdf_forge.forge, "QUERY_LENGTH_LIMIT", 80)
+    # Every third record, so no ranges can be used
+    scroll_ids = list(range(0, 45, 3))
+    query = Query().match_records("big_set", scroll_ids)
+    assert len(query.q) > 80
+
+    client.queries = []
+    res, info = forge.search(query, limit=100, info=True)
+    assert sorted(rec["mdf"]["scroll_id"] for rec in res) == scroll_ids
+    assert len(client.queries) > 1
+    assert all(len(sent["q"]) <= 80 for sent in client.queries)
+    assert info["total_query_matches"] == 15
+    assert info["query"] == client.queries[0]["q"]
+    assert len(info["split_queries"]) == len(client.queries)
+    assert len(forge.search(query, limit=4)) == 4
+
+    # The current query is split too, and then reset
+    res = forge.match_records("big_set", scroll_ids).search(limit=100)
+    assert len(res) == 15
+    assert not forge.initialized
+
+    # Queries in search_many() are split the same way, including builders' queries
+    client.queries = []
+    builder = Forge(services=[], search_client=client).match_records("big_set", scroll_ids)
+    res = forge.search_many([query, builder], limit=100)
+    assert all(r["success"] for r in res)
+    assert [len(r["results"]) for r in res] == [15, 15]
+    assert len(client.queries) > 2
+    assert all(len(sent["q"]) <= 80 for sent in client.queries)
+    assert res[0]["query"] == query.q
+
+    # Records matched by more than one part are only returned once
+    names = ["big_set", "small_set"] + ["other_set_{}".format(i) for i in range(10)]
+    query = Query().match_source_names(names).match_source_names(names)
+    res = forge.aggregate(query)
+    assert len(res) == 50
+    assert len(set((rec["mdf"]["source_name"], rec["mdf"]["scroll_id"]) for rec in res)) == 50
+
+
+def test_parallel_aggregate(forge):
+    client = forge._SearchHelper__search_client
+    # Several sources are split per source, with no overfull ranges
+    res = forge.aggregate_sources(["big_set", "small_set"], max_workers=4)
+    assert len(res) == 50
+    assert len(set((rec["mdf"]["source_name"], rec["mdf"]["scroll_id"]) for rec in res)) == 50
+    range_queries = [query["q"] for query in client.queries if "scroll_id:>=" in query["q"]]
+    assert len(range_queries) == 6
+    assert all(q.count("mdf.source_name:") == 1 for q in range_queries)
+
+    # Overfull ranges are split until complete
+    client.queries = []
+    res = forge.aggregate("mdf.source_name:big_set OR mdf.source_name:small_set",
+                          max_workers=3, scroll_size=10)
+    assert len(res) == 50
+    assert len(set((rec["mdf"]["source_name"], rec["mdf"]["scroll_id"]) for rec in res)) == 50
+
+    # Streaming
+    pages = list(forge.match_source_names("big_set").iter_aggregate(pages=True, max_workers=2))
+    assert sorted(len(page) for page in pages) == [5, 10, 10, 10, 10]
+    res = forge.iter_aggregate_sources(["big_set", "small_set"], max_workers=2)
+    assert isinstance(res, types.GeneratorType)
+    assert not forge.initialized
+    assert len(list(res)) == 50
+
+
+def test_search_cache(tmpdir):
+    records = make_records()
+    dataset = make_record("small_set", 0)
+    dataset["mdf"]["resource_type"] = "dataset"
+    dataset["mdf"]["version"] = 1
+    records.append(dataset)
+    client = FakeSearchClient(records)
+    forge = Forge(services=[], search_client=client, cache_dir=str(tmpdir))
+
+    res = forge.match_source_names("small_set").match_resource_types("record").search()
+    assert len(res) == 5
+    assert len(client.queries) == 1
+    # Repeated queries are answered locally
+    res2, info = forge.match_source_names("small_set").match_resource_types("record").search(
+                    info=True)
+    assert res2 == res
+    assert info["total_query_matches"] == 5
+    assert len(client.queries) == 1
+    # Different limits are different queries
+    assert len(forge.match_source_names("small_set").match_resource_types("record").search(
+                limit=2)) == 2
+    assert len(client.queries) == 2
+    facets = forge.facets("mdf.source_name", q=Query().match_resource_types("record"))
+    assert facets == {"mdf.source_name": {"big_set": 45, "small_set": 5}}
+    assert forge.facets("mdf.source_name", q=Query().match_resource_types("record")) == facets
+    assert len(client.queries) == 3
+
+    # Cached results are used when Search cannot be reached
+    def unavailable(index, query):
+        raise ConnectionError("Search unavailable")
+    forge = Forge(services=[], search_client=client, cache_dir=str(tmpdir), cache_ttl=0)
+    client.post_search, post_search = unavailable, client.post_search
+    with pytest.warns(RuntimeWarning):
+        res3 = forge.match_source_names("small_set").match_resource_types("record").search()
+    assert res3 == res
+    with pytest.warns(RuntimeWarning):
+        assert forge.facets("mdf.source_name", q=Query().match_resource_types("record")) \
+            == facets
+    client.post_search = post_search
+
+    # A new dataset version removes cached results
+    forge = Forge(services=[], search_client=client, cache_dir=str(tmpdir))
+    assert forge.get_dataset_version("small_set") == 1
+    forge.match_source_names("small_set").match_resource_types("record").search()
+    queries = len(client.queries)
+    # Version checks are never cached
+    assert forge.get_dataset_version("small_set") == 1
+    assert len(client.queries) == queries + 1
+    forge.match_source_names("small_set").match_resource_types("record").search()
+    assert len(client.queries) == queries + 1
+    dataset["mdf"]["version"] = 2
+    assert forge.get_dataset_version("small_set") == 2
+    forge.match_source_names("small_set").match_resource_types("record").search()
+    assert len(client.queries) == queries + 3
+
+
+def test_get_dataset_versions(monkeypatch):
+    # Short queries, so batching can be tested with few datasets
+    monkeypatch.setattr(mdf_forge.forge, "or_batches",
+                        functools.partial(mdf_forge.query.or_batches, limit=150))
+    records = []
+    for i in range(10):
+        dataset = make_record("set_{}".format(i), 0)
+        dataset["mdf"]["resource_type"] = "dataset"
+        dataset["mdf"]["version"] = i
+        records.append(dataset)
+    # Ambiguous dataset
+    records.append(dict(records[3]))
+    client = FakeSearchClient(records)
+    forge = Forge(services=[], search_client=client)
+
+    names = ["set_{}".format(i) for i in range(10)] + ["missing"]
+    versions, info = forge.get_dataset_versions(names, info=True)
+    assert versions == {"set_0": 0, "set_1": 1, "set_2": 2, "set_3": None, "set_4": 4,
+                        "set_5": 5, "set_6": 6, "set_7": 7, "set_8": 8, "set_9": 9,
+                        "missing": None}
+    assert info == {"missing": ["missing"], "ambiguous": ["set_3"]}
+    # Batched into few queries
+    assert 1 < len(client.queries) < 5
+    assert all(len(query["q"]) <= 150 for query in client.queries)
+
+    # Remembered
+    queries = len(client.queries)
+    assert forge.get_dataset_versions("set_5") == {"set_5": 5}
+    assert len(client.queries) == queries
+    assert forge.get_dataset_versions("set_5", refresh=True) == {"set_5": 5}
+    assert len(client.queries) == queries + 1
+
+
+def test_fetch_datasets_from_results(monkeypatch):
+    monkeypatch.setattr(mdf_forge.forge, "or_batches",
+                        functools.partial(mdf_forge.query.or_batches, limit=150))
+    records = []
+    datasets = []
+    for i in range(10):
+        dataset = make_record("set_{}".format(i), 0)
+        dataset["mdf"]["resource_type"] = "dataset"
+        datasets.append(dataset)
+        records.extend(make_record("set_{}".format(i), j + 1) for j in range(3))
+    client = FakeSearchClient(records + datasets)
+    forge = Forge(services=[], search_client=client)
+
+    # Any iterable of records, read once
+    res = forge.fetch_datasets_from_results(rec for rec in records)
+    assert sorted(res, key=lambda ds: ds["mdf"]["source_name"]) == datasets
+    # In several short queries
+    assert 1 < len(client.queries) < 10
+    assert all(len(query["q"]) <= 150 for query in client.queries)
+
+    # Single records and search results with info
+    assert forge.fetch_datasets_from_results(records[0]) == [datasets[0]]
+    assert forge.fetch_datasets_from_results((records[:4], {})) == datasets[:2]
+
+    # Current query terms also apply
+    forge.match_field("mdf.source_name", "set_1")
+    assert forge.fetch_datasets_from_results(records) == [datasets[1]]
+    assert not forge.initialized
+
+    with pytest.raises(ValueError):
+        forge.fetch_datasets_from_results(iter([]))
+    assert forge.fetch_datasets_from_results({"mdf": {"resource_type": "unknown"}}) == []
@@ -0,0 +1,125 @@
+from array import array
+
+import pytest
+
+from mdf_forge.table import get_field, make_projection, project, ResultTable
+
+
+records = [
+    {
+        "mdf": {"source_name": "set_a", "scroll_id": 0},
+        "material": {"elements": ["Al", "Cu"]},
+        "files": [{"url": "https://example.com/0", "length": 10},
+                  {"url": "https://example.com/1", "length": 20}],
+        "value": 1.5
+    },
+    {
+        "mdf": {"source_name": "set_a", "scroll_id": 1},
+        "material": {"elements": ["Fe"]},
+        "value": 2
+    },
+    {
+        "mdf": {"source_name": "set_b", "scroll_id": 2},
+        "material": {"elements": ["Al"]}
+    }
+]
+columns = ["mdf.source_name", "mdf.scroll_id", "material.elements", "files.url", "value"]
+
+
+def test_get_field():
+    assert get_field(records[0], "mdf.source_name") == "set_a"
+    assert get_field(records[0], "material.elements") == ["Al", "Cu"]
+    assert get_field(records[0], "files.length") == [10, 20]
+    assert get_field(records[1], "files.url") is None
+    assert get_field(records[1], "mdf.nothing") is None
+
+
+def test_project():
+    projection = make_projection(["mdf.source_name", "files[].url", "material"])
+    assert projection == {"mdf": {"source_name": None}, "files": {"url": None},
+                          "material": None}
+    assert project(records[0], projection) == {
+        "mdf": {"source_name": "set_a"},
+        "material": {"elements": ["Al", "Cu"]},
+        "files": [{"url": "https://example.com/0"}, {"url": "https://example.com/1"}]
+    }
+    assert project(records[1], projection) == {
+        "mdf": {"source_name": "set_a"},
+        "material": {"elements": ["Fe"]}
+    }
+    # A whole field overrides its subfields, in any order
+    assert make_projection(["mdf", "mdf.source_name"]) == {"mdf": None}
+    assert make_projection(["mdf.source_name", "mdf"]) == {"mdf": None}
+    assert project(records[2], make_projection("mdf.scroll_id")) == {"mdf": {"scroll_id": 2}}
+
+
+def test_result_table():
+    table = ResultTable(iter(records), columns=columns)
+    assert len(table) == 3
+    assert table.columns == columns
+    # Columns are stored in typed arrays where possible
+    assert table["mdf.scroll_id"] == array("q", [0, 1, 2])
+    assert table["value"].typecode == "d"
+    assert table["value"][:2] == array("d", [1.5, 2])
+    assert table["value"][2] != table["value"][2]
+    assert table["mdf.source_name"] == ["set_a", "set_a", "set_b"]
+    assert table["files.url"] == [("https://example.com/0", "https://example.com/1"),
+                                  None, None]
+    with pytest.raises(KeyError):
+        table.column("dc.titles")
+
+    # Full records are still available
+    assert table.record(1) == records[1]
+    assert list(table) == records
+
+    # Filtering
+    assert table.equals("mdf.source_name", "set_b") == [False, False, True]
+    assert table.isin("mdf.scroll_id", [0, 2]) == [True, False, True]
+    assert table.between("value", 1, 1.9) == [True, False, False]
+    filtered = table.filter(table.contains("material.elements", "Al"))
+    assert len(filtered) == 2
+    assert filtered["mdf.scroll_id"] == array("q", [0, 2])
+    assert list(filtered) == [records[0], records[2]]
+    assert len(table) == 3
+    with pytest.raises(ValueError):
+        table.filter([True])
+
+    # Masks are combined element-wise
+    al = table.contains("material.elements", "Al")
+    set_a = table.equals("mdf.source_name", "set_a")
+    assert (al & set_a) == [True, False, False]
+    assert (al | set_a) == [True, True, True]
+    assert ~al == [False, True, False]
+    assert (al & [False, False, True]) == [False, False, True]
+    assert list(table.filter(al & ~set_a)) == [records[2]]
+    with pytest.raises(ValueError):
+        al & [True]
+
+    # Numeric strings are compared as numbers
+    years = ResultTable([{"year": "2017"}, {"year": "2019"}, {"year": "n/a"}, {}],
+                        columns=["year"])
+    assert years.between("year", 2018) == [False, True, False, False]
+    assert years.between("year", 2016, 2018.5) == [True, False, False, False]
+    assert years.between("year", "2018") == [False, True, True, False]
+
+    assert table.to_dict()["material.elements"] == [["Al", "Cu"], ["Fe"], ["Al"]]
+
+    empty = ResultTable()
+    assert len(empty) == 0
+    assert empty["mdf.source_name"] == []
+
+
+def test_to_pandas():
+    pandas = pytest.importorskip("pandas")
+    df = ResultTable(records, columns=columns).to_pandas(include_records=True)
+    assert isinstance(df, pandas.DataFrame)
+    assert list(df.columns) == columns + ["record"]
+    assert list(df["mdf.scroll_id"]) == [0, 1, 2]
+
+
+def test_to_arrow():
+    pytest.importorskip("pyarrow")
+    arrow = ResultTable(records, columns=columns).to_arrow()
+    assert arrow.num_rows == 3
+    assert arrow.column("mdf.scroll_id").to_pylist() == [0, 1, 2]
+    assert arrow.column("value").to_pylist()[2] is None
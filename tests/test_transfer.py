@@ -0,0 +1,124 @@
+import itertools
+import time
+
+from mdf_forge.transfer import poll_schedule, TransferBatch
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self.data = data
+
+
+class FakeTransferClient:
+    """Simulates Transfer tasks that each finish after a number of status checks."""
+    def __init__(self, tasks):
+        # task_id: (polls until finished, final status, number of files)
+        self.tasks = tasks
+        self.polls = {task_id: 0 for task_id in tasks.keys()}
+        self.poll_log = []
+        self.updated = []
+        self.cancelled = []
+
+    def get_task(self, task_id):
+        self.polls[task_id] += 1
+        self.poll_log.append(task_id)
+        polls_needed, final_status, files = self.tasks[task_id]
+        done = min(self.polls[task_id], polls_needed)
+        status = final_status if done >= polls_needed else "ACTIVE"
+        return FakeResponse({
+            "task_id": task_id,
+            "status": status,
+            "files": files,
+            "files_transferred": files * done // polls_needed,
+            "files_skipped": 0,
+            "bytes_transferred": 100 * done,
+            "faults": 0,
+            "nice_status_short_description": "bad" if status == "FAILED" else "OK"
+        })
+
+    def update_task(self, task_id, data):
+        self.updated.append(task_id)
+
+    def cancel_task(self, task_id):
+        self.cancelled.append(task_id)
+
+    def task_event_list(self, task_id):
+        return []
+
+    def task_successful_transfers(self, task_id, marker=None):
+        # Two pages of one file each
+        if marker is None:
+            return {"DATA": [{"source_path": "/a", "destination_path": "/b"}],
+                    "next_marker": "next"}
+        return {"DATA": [{"source_path": "/c", "destination_path": "/d"}]}
+
+
+def test_transfer_batch(capsys):
+    tc = FakeTransferClient({
+        "t1": (3, "SUCCEEDED", 6),
+        "t2": (1, "SUCCEEDED", 2),
+        "t3": (2, "FAILED", 2)
+    })
+    batch = TransferBatch(tc, {"ep1": "t1", "ep2": "t2", "ep3": "t3"},
+                          errors={"ep4": "Bad path"})
+    assert not batch.done
+    assert batch.wait(interval=0, verbose=False) is True
+    assert batch.done
+
+    finished = batch.status()
+    assert finished["ep1"]["success"] is True
+    assert finished["ep2"]["success"] is True
+    assert finished["ep3"]["success"] is False
+    # All tasks are checked together, not one after another
+    assert tc.poll_log[:3] == ["t1", "t2", "t3"]
+    # Each task stops being checked once finished
+    assert tc.polls == {"t1": 3, "t2": 1, "t3": 2}
+    # Deadline extended only while tasks were active
+    assert "t1" in tc.updated and "t2" not in tc.updated
+    assert batch.cancel() == []
+    assert tc.cancelled == []
+    out, err = capsys.readouterr()
+    assert "Error transferring with endpoint 'ep3': FAILED - bad" in out
+
+    assert batch.summary() == {
+        "transfers": 4,
+        "succeeded": 2,
+        "failed": 2,
+        "active": 0,
+        "files": 10,
+        "files_transferred": 10,
+        "files_skipped": 0,
+        "bytes_transferred": 600
+    }
+    assert batch.progress()["ep1"]["files_transferred"] == 6
+    assert len(list(batch.transferred_files())) == 6
+
+
+def test_transfer_batch_timeout():
+    tc = FakeTransferClient({"t1": (100, "SUCCEEDED", 1), "t2": (1, "SUCCEEDED", 1)})
+    batch = TransferBatch(tc, {"ep1": "t1", "ep2": "t2"})
+    assert batch.wait(timeout=0.05, interval=0.01, verbose=False) is False
+    assert list(batch.active.keys()) == ["ep1"]
+    assert batch.summary()["active"] == 1
+    assert batch.cancel() == ["t1"]
+    assert tc.cancelled == ["t1"]
+
+
+def test_poll_schedule():
+    assert list(itertools.islice(poll_schedule(interval=5, start=0.5), 6)) == [0.5, 1, 2, 4, 5, 5]
+    assert list(itertools.islice(poll_schedule(interval=1, start=3), 2)) == [1, 1]
+
+
+def test_transfer_batch_schedule():
+    # A quick Transfer is noticed without waiting for the full interval
+    tc = FakeTransferClient({"t1": (3, "SUCCEEDED", 1)})
+    batch = TransferBatch(tc, {"ep1": "t1"})
+    start = time.monotonic()
+    assert batch.wait(interval=60, verbose=False, schedule=poll_schedule(60, start=0.01))
+    assert time.monotonic() - start < 1
+
+    # Custom schedule, falling back to the interval
+    tc = FakeTransferClient({"t1": (4, "SUCCEEDED", 1)})
+    batch = TransferBatch(tc, {"ep1": "t1"})
+    assert batch.wait(interval=0, verbose=False, schedule=[0.01, 0.01])
+    assert tc.polls["t1"] == 4